@@ -32,11 +32,7 @@ if not exist "%APP_DIR%\requirements.txt" (
         echo numpy>=1.24.0
         echo scipy>=1.11.3
         echo faster-whisper>=0.9.0
-        echo tqdm>=4.66.1
         echo mutagen>=1.47.0
-        echo torch>=2.1.1
-        echo torchvision>=0.16.1
-        echo torchaudio>=2.1.1
         echo av>=14.0.1
         echo ctranslate2>=4.5.0
         echo huggingface-hub>=0.27.0
@@ -46,7 +42,7 @@ if not exist "%APP_DIR%\requirements.txt" (
 :: Check installed packages
 echo Checking installed packages...
 set "MISSING_PACKAGES="
-for %%p in (customtkinter sounddevice numpy scipy torch faster-whisper) do (
+for %%p in (customtkinter sounddevice numpy scipy faster-whisper) do (
     "%PIP_PATH%" show "%%p" >nul 2>&1
     if errorlevel 1 (
         set "MISSING_PACKAGES=!MISSING_PACKAGES! %%p"
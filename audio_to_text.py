@@ -1,34 +1,2260 @@
 import os
+import sys
 os.environ['PYTHONPATH'] = os.path.dirname(os.path.abspath(__file__))
 import threading
-import sounddevice as sd
 import numpy as np
-from scipy.io.wavfile import write
 import customtkinter as ctk
 from tkinter import filedialog
 from datetime import datetime
 import time
-from faster_whisper import WhisperModel
-from tqdm import tqdm
 import json
 import wave
-import mutagen
-from mutagen.mp3 import MP3
-from mutagen.wave import WAVE
-import torch
+import copy
+import queue
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from collections import namedtuple
+# Тяжёлые библиотеки (faster_whisper, sounddevice, scipy, mutagen)
+# импортируются при первом использовании, чтобы окно открывалось быстрее
+
+# Папка с данными приложения (модели, записи, настройки)
+USER_DATA_DIR = os.path.join(os.path.expanduser("~"), "Documents", "VoiceScribePro")
+
+# Каталог моделей по умолчанию; рабочая копия хранится в settings/models.json.
+# Запись описывает модель CTranslate2: "repo" на Hugging Face Hub или "path"
+# к локально сконвертированной модели, "english_only" для моделей *.en,
+# "measured" - замеры benchmark.py (RTF и пиковая память по устройствам).
+# "params" - подпись для окна моделей, "weights_mb" - размер весов float16
+# в МБ, по которому оцениваются память и скорость моделей без замеров.
+DEFAULT_MODEL_CATALOG = {
+    "Tiny (быстрая, менее точная)": {
+        "name": "tiny",
+        "repo": "Systran/faster-whisper-tiny",
+        "params": "78M",
+        "weights_mb": 78,
+        "vram": "~1 GB",
+        "speed": "~10x быстрее large"
+    },
+    "Base (средняя)": {
+        "name": "base",
+        "repo": "Systran/faster-whisper-base",
+        "params": "148M",
+        "weights_mb": 148,
+        "vram": "~1 GB",
+        "speed": "~7x быстрее large"
+    },
+    "Small (точная)": {
+        "name": "small",
+        "repo": "Systran/faster-whisper-small",
+        "params": "488M",
+        "weights_mb": 488,
+        "vram": "~2 GB",
+        "speed": "~4x быстрее large"
+    },
+    "Medium (очень точная)": {
+        "name": "medium",
+        "repo": "Systran/faster-whisper-medium",
+        "params": "1538M",
+        "weights_mb": 1538,
+        "vram": "~5 GB",
+        "speed": "~2x быстрее large"
+    },
+    "Large (самая точная)": {
+        "name": "large-v3",
+        "repo": "Systran/faster-whisper-large-v3",
+        "params": "3158M",
+        "weights_mb": 3158,
+        "vram": "~10 GB",
+        "speed": "базовая скорость"
+    },
+    "Turbo (быстрая и точная)": {
+        "name": "turbo",
+        "repo": "mobiuslabsgmbh/faster-whisper-large-v3-turbo",
+        "params": "1618M",
+        "weights_mb": 1618,
+        "vram": "~6 GB",
+        "speed": "~8x быстрее large"
+    },
+    "Distil Large-v3 (быстрая, английский лучше всего)": {
+        "name": "distil-large-v3",
+        "repo": "Systran/faster-distil-whisper-large-v3",
+        "params": "~1512M",
+        "weights_mb": 1512,
+        "vram": "~4 GB",
+        "speed": "~6x быстрее large"
+    },
+    "Tiny.en (только английский)": {
+        "name": "tiny.en",
+        "repo": "Systran/faster-whisper-tiny.en",
+        "params": "78M",
+        "weights_mb": 78,
+        "vram": "~1 GB",
+        "speed": "~10x быстрее large",
+        "english_only": True
+    },
+    "Base.en (только английский)": {
+        "name": "base.en",
+        "repo": "Systran/faster-whisper-base.en",
+        "params": "148M",
+        "weights_mb": 148,
+        "vram": "~1 GB",
+        "speed": "~7x быстрее large",
+        "english_only": True
+    },
+    "Small.en (только английский)": {
+        "name": "small.en",
+        "repo": "Systran/faster-whisper-small.en",
+        "params": "488M",
+        "weights_mb": 488,
+        "vram": "~2 GB",
+        "speed": "~4x быстрее large",
+        "english_only": True
+    },
+    "Distil Small.en (только английский)": {
+        "name": "distil-small.en",
+        "repo": "Systran/faster-distil-whisper-small.en",
+        "params": "~332M",
+        "weights_mb": 332,
+        "vram": "~1 GB",
+        "speed": "~9x быстрее large",
+        "english_only": True
+    },
+    "Distil Medium.en (только английский)": {
+        "name": "distil-medium.en",
+        "repo": "Systran/faster-distil-whisper-medium.en",
+        "params": "~788M",
+        "weights_mb": 788,
+        "vram": "~2 GB",
+        "speed": "~6x быстрее large",
+        "english_only": True
+    }
+}
+
+# Модели Whisper с информацией (заполняется из каталога load_model_catalog)
+AVAILABLE_MODELS = copy.deepcopy(DEFAULT_MODEL_CATALOG)
+
+
+def load_model_catalog(settings_dir):
+    """Загрузка каталога моделей из settings/models.json
+
+    При первом запуске файл создаётся из каталога по умолчанию. Записи без
+    "name" или без "repo"/"path" пропускаются. Каталог обновляется на месте
+    в AVAILABLE_MODELS и возвращается.
+    """
+    catalog_file = os.path.join(settings_dir, "models.json")
+    try:
+        with open(catalog_file, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        catalog = copy.deepcopy(DEFAULT_MODEL_CATALOG)
+        save_model_catalog(settings_dir, catalog)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка чтения каталога моделей, используется каталог по умолчанию: {str(e)}")
+        catalog = copy.deepcopy(DEFAULT_MODEL_CATALOG)
+
+    AVAILABLE_MODELS.clear()
+    for label, info in catalog.items():
+        if not info.get("name") or not (info.get("repo") or info.get("path")):
+            print(f"⚠️ Запись каталога «{label}» пропущена: нужны name и repo или path")
+            continue
+        # Подпись "params" в других единицах (например, число параметров)
+        # вводит в заблуждение в окне моделей; оценки берутся из weights_mb
+        params = parse_size_text(info.get("params"))
+        if info.get("weights_mb") and params and not 0.75 <= params / info["weights_mb"] <= 1.33:
+            print(f"⚠️ Запись каталога «{label}»: params {info['params']} не совпадает с weights_mb "
+                  f"{info['weights_mb']} (ожидается размер весов float16 в МБ), используется weights_mb")
+        AVAILABLE_MODELS[label] = {"params": "Н/Д", "vram": "Н/Д", "speed": "Н/Д", **info, "installed": False}
+    return AVAILABLE_MODELS
+
+
+def save_model_catalog(settings_dir, catalog):
+    """Сохранение каталога моделей (без служебных полей)"""
+    catalog_file = os.path.join(settings_dir, "models.json")
+    data = {
+        label: {key: value for key, value in info.items() if key != "installed"}
+        for label, info in catalog.items()
+    }
+    with open(catalog_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def get_model_entry(model_name):
+    """Запись каталога по имени модели или None"""
+    for info in AVAILABLE_MODELS.values():
+        if info["name"] == model_name:
+            return info
+    return None
+
+
+# Языки распознавания в настройках ("auto" - определять автоматически)
+LANGUAGES = {
+    "auto": "Авто (определять)",
+    "ru": "Русский",
+    "en": "English",
+    "uk": "Українська",
+    "be": "Беларуская",
+    "kk": "Қазақша",
+    "de": "Deutsch",
+    "fr": "Français",
+    "es": "Español",
+    "it": "Italiano",
+    "pt": "Português",
+    "pl": "Polski",
+    "tr": "Türkçe",
+    "zh": "中文",
+    "ja": "日本語"
+}
+
+# Минимальная уверенность, с которой определённый язык запоминается для папки
+LANGUAGE_MEMORY_MIN_PROBABILITY = 0.8
+
+# Каскад: быстрая модель распознаёт всё, неуверенные фрагменты - точная
+CASCADE_DEFAULTS = {
+    "enabled": False,
+    "fast_model": "base",
+    "min_avg_logprob": -0.8,
+    "max_compression_ratio": 2.4,
+    "max_no_speech_prob": 0.6
+}
+
+# Защита от зацикливания: одна и та же фраза подряд или тянущийся участок
+# без речи (тишина, музыка) обрываются, распознавание продолжается дальше
+# без контекста предыдущего текста
+LOOP_GUARD_DEFAULTS = {
+    "enabled": True,
+    "max_repeats": 3,  # Повторов фразы подряд до обрыва
+    "window": 4,  # Окно, в котором ищется чередование двух фраз (A B A B)
+    "min_loop_chars": 12,  # Более короткие фразы («Да.») - повтор, только если декодер не уверен
+    "max_compression_ratio": 2.4,
+    "max_no_speech_prob": 0.6,
+    "min_avg_logprob": -0.8,  # Без речи считается сегмент и с низкой уверенностью текста
+    "max_no_speech_run": 3,  # Сегментов без речи подряд до обрыва
+    "skip_s": 1.0  # Насколько перескочить после оборванного участка
+}
+
+# Черновик: быстрый проход показывается сразу, затем заменяется точным
+PREVIEW_DEFAULTS = {
+    "enabled": False,
+    "model": "tiny"
+}
+
+# Параметры записи: "device" - имя устройства ввода (пусто - по умолчанию),
+# "blocksize" - кадров на блок (0 - на усмотрение PortAudio), "latency" - "low",
+# "high" или задержка в секундах
+RECORDING_DEFAULTS = {
+    "sample_rate": 44100,
+    "channels": 1,
+    "bit_depth": 16,
+    "device": "",
+    "blocksize": 0,
+    "latency": "high"
+}
+RECORDING_LATENCIES = {
+    "high": "Высокая (устойчива к нагрузке CPU)",
+    "low": "Низкая"
+}
+
+# Предобработка перед распознаванием: тихие и «бубнящие» записи чаще
+# уходят в повторное декодирование с повышенной температурой
+PREPROCESS_DEFAULTS = {
+    "enabled": False,
+    "highpass_hz": 80,  # Срез фильтра верхних частот (гул сети, ветер, удары)
+    "target_db": -20.0,  # Целевая громкость речи, дБ от полной шкалы
+    "max_gain_db": 30.0  # Предел усиления, чтобы не вытягивать шум
+}
+PREPROCESS_CHUNK_S = 30  # Длина куска обработки, с
+PREPROCESS_BLOCK_S = 0.4  # Блок оценки громкости, с
+PREPROCESS_GATE_DB = -60.0  # Более тихие блоки (паузы) не учитываются в громкости
+
+# Кэш декодированного аудио и лог-мел признаков для повторных запусков того же файла
+FEATURE_CACHE_DEFAULTS = {
+    "enabled": False,
+    "max_size_mb": 2048  # При превышении удаляются давно не использованные записи
+}
+
+# Диктовка: запись режется на фразы по паузам, фразы распознаются по ходу записи
+DICTATION_DEFAULTS = {
+    "enabled": False,
+    "silence_threshold": 0.01,  # Уровень (RMS) ниже этого считается тишиной
+    "min_silence_s": 0.7,  # Пауза, завершающая фразу
+    "min_utterance_s": 0.3,  # Более короткие звуки (щелчки, стук) отбрасываются
+    "max_utterance_s": 30.0  # Речь без пауз режется принудительно
+}
+
+# Файлы, без которых снимок модели CTranslate2 считается неполным
+MODEL_REQUIRED_FILES = ["model.bin", "config.json", "tokenizer.json"]
+MODEL_VOCABULARY_FILES = ["vocabulary.txt", "vocabulary.json"]
+# Файлы снимка, которые нужны faster_whisper
+MODEL_FILE_PATTERNS = ["config.json", "preprocessor_config.json", "model.bin", "tokenizer.json", "vocabulary.*"]
+MODEL_MANIFEST_FILE = ".voicescribe_manifest.json"
+MODEL_DOWNLOAD_MARKER = ".downloading"
+
+
+def get_model_repo(model_name):
+    """Репозиторий модели на Hugging Face Hub по её имени"""
+    entry = get_model_entry(model_name)
+    if entry is None:
+        # Неизвестное имя передаём как есть (например, "org/repo")
+        return model_name
+    return entry.get("repo")
+
+
+def get_model_cache_dir(models_dir, repo_id):
+    """Папка модели в кэше Hugging Face внутри models_dir"""
+    return os.path.join(models_dir, "models--" + repo_id.replace("/", "--"))
+
+
+def read_model_manifest(snapshot_dir):
+    """Манифест снимка, записанный после проверки хешей, или None (нет или повреждён)"""
+    try:
+        with open(os.path.join(snapshot_dir, MODEL_MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Файл читается, но его структура не та, что пишет загрузчик
+    files = manifest.get("files") if isinstance(manifest, dict) else None
+    if not isinstance(files, dict) or not all(
+            isinstance(name, str) and isinstance(file_info, dict) and isinstance(file_info.get("size"), int)
+            for name, file_info in files.items()):
+        return None
+    return manifest
+
+
+def is_complete_snapshot(snapshot_dir):
+    """Проверка, что в снимке есть все файлы модели"""
+    # Незавершённое скачивание
+    if os.path.exists(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER)):
+        return False
+
+    # Снимок от нашего загрузчика: сверяем файлы с манифестом
+    manifest = read_model_manifest(snapshot_dir)
+    if manifest is None and os.path.exists(os.path.join(snapshot_dir, MODEL_MANIFEST_FILE)):
+        # Повреждённый манифест: снимок считается неполным и будет скачан заново
+        return False
+    if manifest is not None:
+        for name, file_info in manifest["files"].items():
+            path = os.path.join(snapshot_dir, name)
+            if not os.path.isfile(path) or os.path.getsize(path) != file_info["size"]:
+                return False
+        return True
+
+    # Снимок, скачанный huggingface_hub: проверяем наличие файлов
+    for name in MODEL_REQUIRED_FILES:
+        path = os.path.join(snapshot_dir, name)
+        if not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return False
+    return any(os.path.isfile(os.path.join(snapshot_dir, name)) for name in MODEL_VOCABULARY_FILES)
+
+
+def find_model_snapshot(models_dir, model_name):
+    """Путь к проверенному локальному снимку модели или None"""
+    # Локально сконвертированная модель из каталога
+    entry = get_model_entry(model_name) or {}
+    if entry.get("path"):
+        return entry["path"] if is_complete_snapshot(entry["path"]) else None
+
+    cache_dir = get_model_cache_dir(models_dir, get_model_repo(model_name))
+    snapshots_dir = os.path.join(cache_dir, "snapshots")
+    if not os.path.isdir(snapshots_dir):
+        return None
+
+    # Сначала ревизия из refs/main, затем остальные скачанные
+    revisions = []
+    try:
+        with open(os.path.join(cache_dir, "refs", "main"), "r", encoding="utf-8") as f:
+            revisions.append(f.read().strip())
+    except OSError:
+        pass
+    revisions += [name for name in sorted(os.listdir(snapshots_dir)) if name not in revisions]
+
+    for revision in revisions:
+        snapshot_dir = os.path.join(snapshots_dir, revision)
+        if is_complete_snapshot(snapshot_dir):
+            return snapshot_dir
+    return None
+
+
+class ModelDownloader:
+    """Скачивание снимка модели с докачкой, проверкой хешей и прогрессом
+
+    Файлы качаются параллельно в *.incomplete с докачкой через HTTP Range
+    и проверяются по sha256 (файлы LFS) или git-хешу blob перед переносом
+    в снимок. Модель считается установленной только после записи манифеста.
+    Адрес сервера задаётся endpoint (по умолчанию HF_ENDPOINT или
+    huggingface.co), поэтому вместо хаба подойдёт локальный файловый сервер.
+    """
+
+    def __init__(self, models_dir, endpoint=None, max_workers=4, chunk_size=1024 * 1024,
+                 timeout=30, retries=3, progress_callback=None):
+        self.models_dir = models_dir
+        self.endpoint = (endpoint or os.environ.get("HF_ENDPOINT") or "https://huggingface.co").rstrip("/")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        self._downloaded = 0
+        self._total = 0
+
+    def _request(self, url, headers=None):
+        import urllib.request
+
+        request_headers = {"User-Agent": "VoiceScribePro"}
+        token = os.environ.get("HF_TOKEN")
+        if token:
+            request_headers["Authorization"] = f"Bearer {token}"
+        request_headers.update(headers or {})
+        return urllib.request.urlopen(urllib.request.Request(url, headers=request_headers), timeout=self.timeout)
+
+    def fetch_file_list(self, repo_id, revision="main"):
+        """Коммит ревизии и список нужных файлов с размерами и хешами"""
+        import fnmatch
+        from urllib.parse import quote
+
+        url = f"{self.endpoint}/api/models/{repo_id}/revision/{quote(revision, safe='')}?blobs=true"
+        with self._request(url) as response:
+            info = json.load(response)
+
+        files = []
+        for sibling in info.get("siblings", []):
+            name = sibling["rfilename"]
+            if not any(fnmatch.fnmatch(name, pattern) for pattern in MODEL_FILE_PATTERNS):
+                continue
+            lfs = sibling.get("lfs") or {}
+            files.append({
+                "name": name,
+                "size": lfs.get("size", sibling.get("size")),
+                "sha256": lfs.get("sha256"),
+                "git_sha1": None if lfs else sibling.get("blobId")
+            })
+        return info["sha"], files
+
+    def download(self, repo_id, revision="main"):
+        """Скачать снимок модели и вернуть путь к нему"""
+        commit, files = self.fetch_file_list(repo_id, revision)
+        cache_dir = get_model_cache_dir(self.models_dir, repo_id)
+        snapshot_dir = os.path.join(cache_dir, "snapshots", commit)
+
+        if read_model_manifest(snapshot_dir) is None or not is_complete_snapshot(snapshot_dir):
+            os.makedirs(snapshot_dir, exist_ok=True)
+            with open(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER), "w", encoding="utf-8") as f:
+                f.write(datetime.now().isoformat(timespec="seconds"))
+
+            self._downloaded = 0
+            self._total = sum(file_info["size"] or 0 for file_info in files)
+
+            from concurrent.futures import ThreadPoolExecutor
+
+            # Большие файлы первыми, чтобы они не оказались в хвосте очереди
+            files.sort(key=lambda file_info: file_info["size"] or 0, reverse=True)
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-download") as pool:
+                results = list(pool.map(
+                    lambda file_info: self._download_file(repo_id, commit, file_info, snapshot_dir),
+                    files
+                ))
+
+            manifest = {
+                "repo": repo_id,
+                "revision": commit,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "files": {name: file_info for name, file_info in results}
+            }
+            with open(os.path.join(snapshot_dir, MODEL_MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=4, ensure_ascii=False)
+            os.remove(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER))
+
+        os.makedirs(os.path.join(cache_dir, "refs"), exist_ok=True)
+        with open(os.path.join(cache_dir, "refs", revision), "w", encoding="utf-8") as f:
+            f.write(commit)
+        return snapshot_dir
+
+    def _report(self, size):
+        with self._lock:
+            self._downloaded += size
+            downloaded, total = self._downloaded, self._total
+        if self.progress_callback:
+            self.progress_callback(downloaded, total)
+
+    def _download_file(self, repo_id, commit, file_info, snapshot_dir):
+        """Скачивание одного файла с докачкой и проверкой хеша"""
+        import hashlib
+        import http.client
+        from urllib.parse import quote
+
+        name = file_info["name"]
+        target = os.path.join(snapshot_dir, name)
+        partial = target + ".incomplete"
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        url = f"{self.endpoint}/{repo_id}/resolve/{commit}/{quote(name)}"
+
+        for attempt in range(self.retries):
+            sha256 = hashlib.sha256()
+            git_sha1 = hashlib.sha1()
+            if file_info["size"] is not None:
+                git_sha1.update(f"blob {file_info['size']}\0".encode())
+
+            # Хешируем уже скачанную часть и докачиваем остаток
+            offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+            if file_info["size"] is not None and offset > file_info["size"]:
+                offset = 0
+            if offset:
+                with open(partial, "rb") as f:
+                    while chunk := f.read(self.chunk_size):
+                        sha256.update(chunk)
+                        git_sha1.update(chunk)
+                self._report(offset)
+
+            try:
+                if file_info["size"] is None or offset < file_info["size"]:
+                    headers = {"Range": f"bytes={offset}-"} if offset else {}
+                    with self._request(url, headers) as response:
+                        if offset and response.status != 206:
+                            # Сервер не поддерживает докачку - начинаем заново
+                            self._report(-offset)
+                            offset = 0
+                            sha256 = hashlib.sha256()
+                            git_sha1 = hashlib.sha1()
+                            if file_info["size"] is not None:
+                                git_sha1.update(f"blob {file_info['size']}\0".encode())
+                        with open(partial, "ab" if offset else "wb") as f:
+                            while chunk := response.read(self.chunk_size):
+                                f.write(chunk)
+                                sha256.update(chunk)
+                                git_sha1.update(chunk)
+                                self._report(len(chunk))
+            except (OSError, http.client.HTTPException) as e:
+                if attempt == self.retries - 1:
+                    raise RuntimeError(f"Не удалось скачать {name}: {str(e)}")
+                with self._lock:
+                    self._downloaded -= os.path.getsize(partial) if os.path.exists(partial) else 0
+                continue
+
+            size = os.path.getsize(partial)
+            if file_info["size"] is not None and size < file_info["size"]:
+                # Ответ оборвался - на следующей попытке докачиваем остаток
+                if attempt == self.retries - 1:
+                    raise RuntimeError(f"Не удалось скачать {name}: получено {size} из {file_info['size']} байт")
+                with self._lock:
+                    self._downloaded -= size
+                continue
+            valid = file_info["size"] is None or size == file_info["size"]
+            if file_info["sha256"]:
+                valid = valid and sha256.hexdigest() == file_info["sha256"]
+            elif file_info["git_sha1"]:
+                valid = valid and git_sha1.hexdigest() == file_info["git_sha1"]
+
+            if valid:
+                os.replace(partial, target)
+                return name, {"size": size, "sha256": sha256.hexdigest()}
+
+            # Повреждённый файл скачиваем с нуля
+            os.remove(partial)
+            self._report(-size)
+
+        raise RuntimeError(f"Контрольная сумма файла {name} не совпадает")
+
+
+MODEL_BUNDLE_MANIFEST = "bundle_manifest.json"
+
+
+def export_model_bundle(models_dir, bundle_path, model_names=None):
+    """Упаковка установленных моделей в один архив с манифестом и хешами
+
+    Архив не сжимается: веса моделей почти не жмутся, а распаковка
+    без декомпрессии упирается только в скорость диска.
+    """
+    import hashlib
+    import io
+    import tarfile
+
+    if model_names is None:
+        model_names = [info["name"] for info in AVAILABLE_MODELS.values()]
+
+    bundle_models = []
+    for model_name in model_names:
+        if get_model_repo(model_name) is None:
+            print(f"⚠️ Модель {model_name} задана локальным путём, пропускаем")
+            continue
+        snapshot_dir = find_model_snapshot(models_dir, model_name)
+        if snapshot_dir is None:
+            print(f"⚠️ Модель {model_name} не установлена, пропускаем")
+            continue
+
+        # Хеши из манифеста загрузчика уже проверены, остальные считаем
+        manifest = read_model_manifest(snapshot_dir) or {"files": {}}
+        files = {}
+        for name in sorted(os.listdir(snapshot_dir)):
+            path = os.path.join(snapshot_dir, name)
+            if name.startswith(".") or not os.path.isfile(path):
+                continue
+            file_info = manifest["files"].get(name)
+            if file_info is None or file_info["size"] != os.path.getsize(path):
+                sha256 = hashlib.sha256()
+                with open(path, "rb") as f:
+                    while chunk := f.read(4 * 1024 * 1024):
+                        sha256.update(chunk)
+                file_info = {"size": os.path.getsize(path), "sha256": sha256.hexdigest()}
+            files[name] = file_info
+
+        repo_id = get_model_repo(model_name)
+        bundle_models.append({
+            "name": model_name,
+            "repo": repo_id,
+            "revision": os.path.basename(snapshot_dir),
+            "files": files,
+            "_snapshot_dir": snapshot_dir
+        })
+
+    if not bundle_models:
+        raise RuntimeError("Нет установленных моделей для экспорта")
+
+    bundle_manifest = {
+        "format": 1,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "models": [{k: v for k, v in model.items() if not k.startswith("_")} for model in bundle_models]
+    }
+    manifest_data = json.dumps(bundle_manifest, indent=4, ensure_ascii=False).encode("utf-8")
+
+    with tarfile.open(bundle_path, "w", dereference=True) as tar:
+        # Манифест - первым, чтобы импорт мог читать архив потоком
+        manifest_member = tarfile.TarInfo(MODEL_BUNDLE_MANIFEST)
+        manifest_member.size = len(manifest_data)
+        manifest_member.mtime = int(time.time())
+        tar.addfile(manifest_member, io.BytesIO(manifest_data))
+
+        for model in bundle_models:
+            cache_name = os.path.basename(get_model_cache_dir(models_dir, model["repo"]))
+            for name in model["files"]:
+                tar.add(
+                    os.path.join(model["_snapshot_dir"], name),
+                    arcname=f"{cache_name}/snapshots/{model['revision']}/{name}"
+                )
+            print(f"✅ {model['name']} ({model['revision'][:10]}) упакована")
+
+    return bundle_manifest
+
+
+def is_safe_relative_path(path, allow_subdirs=True):
+    """Относительный путь без ".." и абсолютных частей (для путей из чужих манифестов)"""
+    if not isinstance(path, str) or not path or os.path.isabs(path) or os.path.splitdrive(path)[0]:
+        return False
+    parts = path.replace("\\", "/").split("/")
+    if path.startswith(("/", "\\")) or (not allow_subdirs and len(parts) > 1):
+        return False
+    return all(part not in ("", ".", "..") for part in parts)
+
+
+def ensure_inside(base_dir, path):
+    """Путь, если после разрешения ссылок он лежит внутри base_dir, иначе ошибка"""
+    base = os.path.realpath(base_dir)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([base, resolved]) != base:
+        raise RuntimeError(f"Путь за пределами папки моделей: {path}")
+    return path
+
+
+def import_model_bundle(models_dir, bundle_path, verify=True):
+    """Распаковка архива моделей в models_dir с проверкой хешей"""
+    import hashlib
+    import tarfile
+
+    with tarfile.open(bundle_path, "r|") as tar:
+        members = iter(tar)
+        first = next(members, None)
+        if first is None or first.name != MODEL_BUNDLE_MANIFEST:
+            raise RuntimeError("В архиве нет манифеста моделей")
+        bundle_manifest = json.load(tar.extractfile(first))
+
+        # Разрешённые пути архива -> (модель, имя файла)
+        expected = {}
+        snapshots = []
+        # Пути берутся из манифеста архива, поэтому проверяются до записи на диск
+        for model in bundle_manifest["models"]:
+            unsafe = [value for value in [model["repo"], model["revision"], *model["files"]]
+                      if not is_safe_relative_path(value)]
+            if unsafe or not is_safe_relative_path(model["revision"], allow_subdirs=False):
+                raise RuntimeError(f"Недопустимый путь в манифесте архива: {(unsafe or [model['revision']])[0]}")
+            cache_dir = ensure_inside(models_dir, get_model_cache_dir(models_dir, model["repo"]))
+            snapshot_dir = ensure_inside(models_dir, os.path.join(cache_dir, "snapshots", model["revision"]))
+            for name in model["files"]:
+                ensure_inside(snapshot_dir, os.path.join(snapshot_dir, name))
+
+        for model in bundle_manifest["models"]:
+            cache_dir = get_model_cache_dir(models_dir, model["repo"])
+            snapshot_dir = os.path.join(cache_dir, "snapshots", model["revision"])
+            os.makedirs(snapshot_dir, exist_ok=True)
+            with open(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER), "w", encoding="utf-8") as f:
+                f.write(datetime.now().isoformat(timespec="seconds"))
+            snapshots.append((model, cache_dir, snapshot_dir))
+            cache_name = os.path.basename(cache_dir)
+            for name in model["files"]:
+                expected[f"{cache_name}/snapshots/{model['revision']}/{name}"] = (model, snapshot_dir, name)
+
+        received = set()
+        for member in members:
+            if member.name not in expected or not member.isfile():
+                raise RuntimeError(f"Неожиданный файл в архиве: {member.name}")
+            model, snapshot_dir, name = expected[member.name]
+            file_info = model["files"][name]
+            target = ensure_inside(snapshot_dir, os.path.join(snapshot_dir, name))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            partial = target + ".incomplete"
+
+            sha256 = hashlib.sha256()
+            source = tar.extractfile(member)
+            with open(partial, "wb") as f:
+                while chunk := source.read(8 * 1024 * 1024):
+                    f.write(chunk)
+                    if verify:
+                        sha256.update(chunk)
+
+            if os.path.getsize(partial) != file_info["size"] or (verify and sha256.hexdigest() != file_info["sha256"]):
+                os.remove(partial)
+                raise RuntimeError(f"Контрольная сумма файла {member.name} не совпадает")
+            os.replace(partial, target)
+            received.add(member.name)
+
+        missing = set(expected) - received
+        if missing:
+            raise RuntimeError(f"В архиве не хватает файлов: {', '.join(sorted(missing))}")
+
+    # Снимки считаются установленными только после записи манифестов
+    for model, cache_dir, snapshot_dir in snapshots:
+        with open(os.path.join(snapshot_dir, MODEL_MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "repo": model["repo"],
+                "revision": model["revision"],
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "files": model["files"]
+            }, f, indent=4, ensure_ascii=False)
+        os.remove(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER))
+        os.makedirs(os.path.join(cache_dir, "refs"), exist_ok=True)
+        with open(os.path.join(cache_dir, "refs", "main"), "w", encoding="utf-8") as f:
+            f.write(model["revision"])
+        print(f"✅ {model['name']} ({model['revision'][:10]}) установлена")
+
+    return bundle_manifest
+
+
+def query_nvml():
+    """Сведения о видеокартах NVIDIA через NVML (без nvidia-smi и PyTorch)"""
+    import ctypes
+
+    if sys.platform == "win32":
+        candidates = [
+            "nvml.dll",
+            os.path.join(os.environ.get("ProgramFiles", r"C:\Program Files"),
+                         "NVIDIA Corporation", "NVSMI", "nvml.dll")
+        ]
+    else:
+        candidates = ["libnvidia-ml.so.1"]
+
+    nvml = None
+    for candidate in candidates:
+        try:
+            nvml = ctypes.CDLL(candidate)
+            break
+        except OSError:
+            continue
+    if nvml is None or nvml.nvmlInit_v2() != 0:
+        return None
+
+    try:
+        buffer = ctypes.create_string_buffer(96)
+        driver_version = None
+        if nvml.nvmlSystemGetDriverVersion(buffer, 96) == 0:
+            driver_version = buffer.value.decode(errors="replace")
+
+        class NvmlMemory(ctypes.Structure):
+            _fields_ = [("total", ctypes.c_ulonglong),
+                        ("free", ctypes.c_ulonglong),
+                        ("used", ctypes.c_ulonglong)]
+
+        count = ctypes.c_uint(0)
+        nvml.nvmlDeviceGetCount_v2(ctypes.byref(count))
+        gpu_names = []
+        gpu_memory = []
+        for index in range(count.value):
+            handle = ctypes.c_void_p()
+            if nvml.nvmlDeviceGetHandleByIndex_v2(index, ctypes.byref(handle)) != 0:
+                continue
+            if nvml.nvmlDeviceGetName(handle, buffer, 96) == 0:
+                gpu_names.append(buffer.value.decode(errors="replace"))
+            memory = NvmlMemory()
+            if nvml.nvmlDeviceGetMemoryInfo(handle, ctypes.byref(memory)) == 0:
+                gpu_memory.append({
+                    "total_mb": memory.total // (1024 * 1024),
+                    "free_mb": memory.free // (1024 * 1024)
+                })
+        return {"driver_version": driver_version, "gpu_names": gpu_names, "gpu_memory": gpu_memory}
+    finally:
+        nvml.nvmlShutdown()
+
+
+_device_probe = None
+_device_probe_lock = threading.Lock()
+
+
+def probe_devices(refresh=False):
+    """Доступные устройства для CTranslate2 (результат кэшируется)
+
+    Видеокарты ищутся через NVML, а пригодность для распознавания
+    проверяется по числу CUDA-устройств, которое видит сам CTranslate2.
+    """
+    global _device_probe
+    with _device_probe_lock:
+        if _device_probe is not None and not refresh:
+            return _device_probe
+
+        nvml_info = query_nvml() or {"driver_version": None, "gpu_names": []}
+        cuda_devices = 0
+        try:
+            import ctranslate2
+            cuda_devices = ctranslate2.get_cuda_device_count()
+        except Exception:
+            pass
+
+        _device_probe = {
+            "cuda_devices": cuda_devices,
+            "gpu_names": nvml_info["gpu_names"],
+            "driver_version": nvml_info["driver_version"]
+        }
+        return _device_probe
+
+
+CUDA_LIBRARIES = {
+    "cublas64_12.dll": "CUDA Runtime",
+    "cudart64_12.dll": "CUDA Runtime",
+    "cublasLt64_12.dll": "CUDA Runtime",
+    "cufft64_11.dll": "CUDA Runtime",
+    "curand64_10.dll": "CUDA Runtime",
+    "cusolver64_11.dll": "CUDA Runtime",
+    "cusparse64_12.dll": "CUDA Runtime",
+    "cudnn64_8.dll": "cuDNN",
+    "cudnn_ops_infer64_8.dll": "cuDNN",
+    "cudnn_ops_train64_8.dll": "cuDNN",
+    "cudnn_adv_infer64_8.dll": "cuDNN",
+    "cudnn_adv_train64_8.dll": "cuDNN",
+    "cudnn_cnn_infer64_8.dll": "cuDNN",
+    "cudnn_cnn_train64_8.dll": "cuDNN"
+}
+
+
+def find_missing_cuda_libraries():
+    """Поиск отсутствующих библиотек CUDA, сгруппированных по пакетам"""
+    import ctypes
+
+    missing_libs = {}
+    for lib, package in CUDA_LIBRARIES.items():
+        try:
+            ctypes.CDLL(lib)
+        except OSError:
+            missing_libs.setdefault(package, []).append(lib)
+    return missing_libs
+
+
+def environment_fingerprint():
+    """Отпечаток окружения: при его изменении проверка GPU повторяется"""
+    try:
+        from importlib.metadata import version
+        ctranslate2_version = version("ctranslate2")
+    except Exception:
+        ctranslate2_version = None
+    nvml_info = query_nvml() or {}
+    return {
+        "python": sys.executable,
+        "python_version": sys.version,
+        "ctranslate2": ctranslate2_version,
+        "driver_version": nvml_info.get("driver_version"),
+        "cuda_path": os.environ.get("CUDA_PATH")
+    }
+
+
+def probe_environment(cache_file, refresh=False):
+    """Проверка GPU и библиотек CUDA с кэшем между запусками
+
+    Результат сохраняется вместе с отпечатком окружения и переиспользуется,
+    пока отпечаток (интерпретатор, драйвер, CTranslate2, CUDA_PATH) не изменится.
+    """
+    global _device_probe
+    fingerprint = environment_fingerprint()
+
+    if not refresh:
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("fingerprint") == fingerprint:
+                with _device_probe_lock:
+                    _device_probe = cached["devices"]
+                return cached
+        except (OSError, ValueError, KeyError):
+            pass
+
+    devices = probe_devices(refresh=True)
+    missing_libs = {}
+    if devices["gpu_names"] and not devices["cuda_devices"]:
+        # Видеокарта есть, но CTranslate2 её не видит - проверяем библиотеки CUDA
+        missing_libs = find_missing_cuda_libraries()
+
+    environment = {
+        "fingerprint": fingerprint,
+        "checked": datetime.now().isoformat(timespec="seconds"),
+        "devices": devices,
+        "missing_cuda_libraries": missing_libs
+    }
+    try:
+        with open(cache_file, "w", encoding="utf-8") as f:
+            json.dump(environment, f, indent=4, ensure_ascii=False)
+    except OSError as e:
+        print(f"Ошибка сохранения проверки окружения: {str(e)}")
+    return environment
+
+
+# Значение настройки "model" для автоматического выбора модели
+AUTO_MODEL = "auto"
+AUTO_MODEL_LABEL = "Авто (подбор под компьютер)"
+AUTO_TARGET_RTF = 0.5  # Целевое отношение времени обработки к длительности аудио
+
+# Оценки для моделей без замеров benchmark.py по размеру весов float16 в МБ
+# (поле "weights_mb" каталога): int8 занимает вдвое меньше.
+# RTF на CPU оценивается как weights_mb / (потоки * AUTO_CPU_SPEED),
+# на GPU - как weights_mb / AUTO_GPU_SPEED.
+AUTO_MEMORY_OVERHEAD_MB = {"cpu": 500, "cuda": 700}
+AUTO_CPU_SPEED = 500
+AUTO_GPU_SPEED = 30000
+
+
+def get_memory_info():
+    """Общий и доступный объём оперативной памяти в МБ (None, если неизвестен)"""
+    if sys.platform == "win32":
+        import ctypes
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong),
+                        ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong),
+                        ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong),
+                        ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong),
+                        ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MemoryStatus()
+        status.dwLength = ctypes.sizeof(MemoryStatus)
+        if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return {"total_mb": status.ullTotalPhys // (1024 * 1024),
+                "available_mb": status.ullAvailPhys // (1024 * 1024)}
+
+    try:
+        values = {}
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                values[key] = int(value.split()[0]) // 1024
+        return {"total_mb": values["MemTotal"],
+                "available_mb": values.get("MemAvailable", values["MemFree"])}
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        return {"total_mb": page_size * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024),
+                "available_mb": page_size * os.sysconf("SC_AVPHYS_PAGES") // (1024 * 1024)}
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def get_system_resources():
+    """Ресурсы компьютера для выбора модели: память, потоки CPU, видеопамять"""
+    try:
+        cpu_threads = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_threads = getattr(os, "process_cpu_count", os.cpu_count)() or 1
+    nvml_info = query_nvml() or {}
+    return {
+        "memory": get_memory_info(),
+        "cpu_threads": cpu_threads,
+        "gpu_memory": nvml_info.get("gpu_memory", [])
+    }
+
+
+def parse_cpu_list(text):
+    """Список ядер из строки вида "0-3,8,10" """
+    cores = []
+    for part in str(text).replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            cores.extend(range(int(first), int(last) + 1))
+        else:
+            cores.append(int(part))
+    return sorted(set(cores))
+
+
+def set_cpu_affinity(cores):
+    """Привязка процесса к ядрам CPU, чтобы несколько экземпляров не мешали друг другу"""
+    if sys.platform == "win32":
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+        kernel32.SetProcessAffinityMask.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        mask = sum(1 << core for core in cores)
+        if not kernel32.SetProcessAffinityMask(kernel32.GetCurrentProcess(), mask):
+            raise OSError(f"SetProcessAffinityMask: ошибка {ctypes.GetLastError()}")
+    elif hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    else:
+        raise OSError("Привязка к ядрам не поддерживается в этой системе")
+
+
+def parse_size_text(text):
+    """Число из подписи размера ("~488M" -> 488.0) или None"""
+    value = str(text or "").strip().lstrip("~").upper().rstrip("M")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def parse_model_size(entry):
+    """Размер весов float16 в МБ: поле "weights_mb", без него - подпись "params" (или None)"""
+    if "weights_mb" in entry:
+        return float(entry["weights_mb"]) if entry["weights_mb"] else None
+    return parse_size_text(entry.get("params"))
+
+
+def estimate_model_memory(entry, device, compute_type):
+    """Память под модель в МБ: замер benchmark.py или оценка по размеру (None - неизвестно)"""
+    measured = entry.get("measured", {}).get(device, {})
+    if device == "cpu" and measured.get("peak_rss_mb"):
+        return measured["peak_rss_mb"]
+    size = parse_model_size(entry)
+    if size is None:
+        return None
+    factor = 1.0 if compute_type == "float16" else 0.5
+    return size * factor + AUTO_MEMORY_OVERHEAD_MB[device]
+
+
+def choose_auto_model(catalog, resources, device, target_rtf=AUTO_TARGET_RTF, language="auto"):
+    """Выбор модели, типа вычислений и числа потоков под ресурсы компьютера
+
+    Среди моделей, помещающихся в свободную память, выбирается самая крупная
+    (обычно самая точная), укладывающаяся в целевой RTF. Скорость берётся из
+    замеров benchmark.py, а при их отсутствии оценивается по размеру модели.
+    Если цель недостижима, выбирается самая быстрая подходящая модель.
+    """
+    threads = resources["cpu_threads"]
+    if device == "cuda":
+        gpu_memory = resources["gpu_memory"][0] if resources["gpu_memory"] else None
+        free_mb = gpu_memory["free_mb"] if gpu_memory else None
+        memory_text = (f"видеопамять: свободно {gpu_memory['free_mb'] / 1024:.1f} из "
+                       f"{gpu_memory['total_mb'] / 1024:.1f} ГБ" if gpu_memory
+                       else "объём видеопамяти неизвестен")
+    else:
+        memory = resources["memory"]
+        free_mb = memory["available_mb"] * 0.9 if memory else None
+        memory_text = (f"ОЗУ: свободно {memory['available_mb'] / 1024:.1f} из "
+                       f"{memory['total_mb'] / 1024:.1f} ГБ" if memory
+                       else "объём ОЗУ неизвестен")
+    memory_text += f", потоков CPU: {threads}"
+
+    candidates = []
+    for label, entry in catalog.items():
+        # Distil-модели обучены только на английской речи
+        if (entry.get("english_only") or entry["name"].startswith("distil-")) and language != "en":
+            continue
+        size = parse_model_size(entry)
+        measured = entry.get("measured", {}).get(device, {})
+
+        # Тип вычислений: float16 на GPU (int8_float16, если не помещается), int8 на CPU
+        compute_types = ["float16", "int8_float16"] if device == "cuda" else ["int8"]
+        for compute_type in compute_types:
+            required_mb = estimate_model_memory(entry, device, compute_type)
+            if free_mb is None or required_mb is None or required_mb <= free_mb:
+                break
+        else:
+            continue
+
+        if measured.get("rtf") is not None and measured.get("compute_type") == compute_type:
+            rtf, rtf_source = measured["rtf"], "замер"
+        elif size is not None:
+            speed = AUTO_GPU_SPEED if device == "cuda" else threads * AUTO_CPU_SPEED
+            rtf, rtf_source = size / speed, "оценка"
+        else:
+            continue
+        candidates.append({
+            "label": label,
+            "model": entry["name"],
+            "size": size or 0,
+            "compute_type": compute_type,
+            "rtf": rtf,
+            "rtf_source": rtf_source
+        })
+
+    if not candidates:
+        return {
+            "model": "tiny",
+            "device": device,
+            "compute_type": "float16" if device == "cuda" else "int8",
+            "cpu_threads": threads,
+            "rtf": None,
+            "reason": f"Авто: Tiny - ни одна модель не помещается в память ({memory_text})"
+        }
+
+    fast_enough = [c for c in candidates if c["rtf"] <= target_rtf]
+    if fast_enough:
+        best = max(fast_enough, key=lambda c: (c["size"], -c["rtf"]))
+        verdict = f"RTF {best['rtf']:.2f} ({best['rtf_source']}) ≤ {target_rtf}"
+    else:
+        best = min(candidates, key=lambda c: c["rtf"])
+        verdict = (f"ни одна модель не укладывается в RTF {target_rtf}, выбрана самая быстрая: "
+                   f"RTF {best['rtf']:.2f} ({best['rtf_source']})")
+    return {
+        "model": best["model"],
+        "device": device,
+        "compute_type": best["compute_type"],
+        "cpu_threads": threads,
+        "rtf": round(best["rtf"], 4),
+        "reason": f"Авто: {best['label']}, {best['compute_type']} на {device.upper()} - {verdict}; {memory_text}"
+    }
+
+
+MODEL_WATCH_INTERVAL_MS = 30000  # Период проверки простоя и свободной памяти
+IDLE_UNLOAD_MINUTES = 10  # Выгрузка моделей после простоя (0 - не выгружать)
+MIN_FREE_MEMORY_MB = 1024  # Порог свободной памяти, ниже которого модели выгружаются
+
+
+def get_free_memory_mb(device):
+    """Свободная память устройства в МБ: ОЗУ для CPU, видеопамять для CUDA"""
+    if device == "cuda":
+        gpu_memory = (query_nvml() or {}).get("gpu_memory")
+        return gpu_memory[0]["free_mb"] if gpu_memory else None
+    memory = get_memory_info()
+    return memory["available_mb"] if memory else None
+
+
+def release_model(model):
+    """Освобождение памяти модели CTranslate2, не дожидаясь сборщика мусора"""
+    try:
+        model.model.unload_model()
+    except Exception:
+        pass
+
+
+def find_smaller_model(catalog, model_name, device, compute_type, free_mb):
+    """Самая крупная модель меньше заданной, помещающаяся в free_mb (или None)"""
+    requested = get_model_entry(model_name) or {}
+    requested_size = parse_model_size(requested)
+    if requested_size is None:
+        return None
+    best = None
+    for entry in catalog.values():
+        size = parse_model_size(entry)
+        if size is None or size >= requested_size:
+            continue
+        if bool(entry.get("english_only")) != bool(requested.get("english_only")):
+            continue
+        if entry["name"].startswith("distil-") and not model_name.startswith("distil-"):
+            continue
+        required_mb = estimate_model_memory(entry, device, compute_type)
+        if required_mb is None or required_mb > free_mb:
+            continue
+        if best is None or size > parse_model_size(best):
+            best = entry
+    return best["name"] if best else None
+
+
+TranscriptSegment = namedtuple(
+    "TranscriptSegment",
+    ["start", "end", "text", "avg_logprob", "compression_ratio", "no_speech_prob", "speaker"],
+    defaults=[None]
+)
+
+
+def format_timestamp(seconds):
+    """Время в формате ЧЧ:ММ:СС"""
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def format_segment_line(segment):
+    """Строка расшифровки; у сегментов с говорящим - время и метка"""
+    if segment.speaker is None:
+        return segment.text.strip()
+    return f"[{format_timestamp(segment.start)}] {segment.speaker}: {segment.text.strip()}"
+
+
+def get_channel_count(path):
+    """Число каналов в аудиофайле"""
+    if path.lower().endswith(".wav"):
+        header = read_wav_header(path)
+        if header is not None:
+            return header["channels"]
+
+    import av
+
+    with av.open(path, metadata_errors="ignore") as container:
+        return container.streams.audio[0].channels
+
+
+# Форматы отсчётов WAV: (код формата, бит) -> тип numpy (24 бит собираются из байтов)
+WAV_FORMAT_PCM = 1
+WAV_FORMAT_FLOAT = 3
+WAV_FORMAT_EXTENSIBLE = 0xFFFE
+WAV_SAMPLE_TYPES = {
+    (WAV_FORMAT_PCM, 16): "<i2",
+    (WAV_FORMAT_PCM, 24): None,
+    (WAV_FORMAT_PCM, 32): "<i4",
+    (WAV_FORMAT_FLOAT, 32): "<f4",
+    (WAV_FORMAT_FLOAT, 64): "<f8"
+}
+WAV_READ_CHUNK_S = 30  # Длина куска потокового ресэмплинга, с
+
+
+def read_wav_header(path):
+    """Формат WAV-файла и положение данных или None, если формат не поддерживается"""
+    import struct
+
+    with open(path, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+        header = None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                f.seek(chunk_size % 2, 1)
+                if len(fmt) < 16:
+                    return None
+                audio_format, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+                if audio_format == WAV_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                    audio_format = struct.unpack("<H", fmt[24:26])[0]
+                header = {
+                    "format": audio_format,
+                    "channels": channels,
+                    "sample_rate": sample_rate,
+                    "bits": bits,
+                    "block_align": block_align
+                }
+            elif chunk_id == b"data":
+                if header is None or header["block_align"] == 0:
+                    return None
+                # Размер данных может быть не дописан (запись прервана) - берём по файлу
+                offset = f.tell()
+                size = min(chunk_size, os.path.getsize(path) - offset)
+                header["offset"] = offset
+                header["frames"] = size // header["block_align"]
+                break
+            else:
+                f.seek(chunk_size + chunk_size % 2, 1)
+
+    if (header["format"], header["bits"]) not in WAV_SAMPLE_TYPES:
+        return None
+    if header["block_align"] != header["channels"] * header["bits"] // 8:
+        return None
+    return header
+
+
+def read_wav(path, sampling_rate=16000, mono=True, chunk_s=WAV_READ_CHUNK_S):
+    """Чтение WAV через отображение в память с потоковым ресэмплингом
+
+    Файл не читается в память целиком: куски по chunk_s секунд берутся
+    из отображения без копирования, переводятся в float32, сводятся в моно
+    и ресэмплируются с перекрытием, поэтому результат совпадает с
+    ресэмплингом всего файла. Возвращает моно-массив или (каналы, отсчёты).
+    """
+    from math import gcd
+    from scipy.signal import resample_poly
+
+    header = read_wav_header(path)
+    if header is None:
+        raise ValueError(f"Неподдерживаемый формат WAV: {path}")
+    channels = header["channels"]
+    frames = header["frames"]
+    rate = header["sample_rate"]
+    bits = header["bits"]
+    output_channels = 1 if mono else channels
+
+    divisor = gcd(sampling_rate, rate)
+    up, down = sampling_rate // divisor, rate // divisor
+    output_frames = -(-frames * up // down)
+    output = np.empty((output_channels, output_frames), dtype=np.float32)
+    if frames == 0:
+        return output[0] if mono else output
+
+    raw = np.memmap(path, dtype=np.uint8, mode="r", offset=header["offset"],
+                    shape=(frames * header["block_align"],))
+    sample_type = WAV_SAMPLE_TYPES[(header["format"], bits)]
+    if sample_type is None:
+        samples = raw.reshape(frames, channels, 3)
+    else:
+        samples = raw.view(sample_type).reshape(frames, channels)
+
+    def to_float(part):
+        if sample_type is None:
+            part = (part[..., 0].astype(np.int32) << 8 | part[..., 1].astype(np.int32) << 16
+                    | part[..., 2].astype(np.int32) << 24)
+            return part.astype(np.float32) / np.float32(2 ** 31)
+        if header["format"] == WAV_FORMAT_PCM:
+            return part.astype(np.float32) / np.float32(2 ** (bits - 1))
+        return part.astype(np.float32)
+
+    # Куски кратны down, а перекрытие покрывает половину фильтра ресэмплинга
+    chunk = max(1, int(chunk_s * rate) // down) * down
+    context = -(-(10 * max(up, down) // up + 2) // down) * down
+    for start in range(0, frames, chunk):
+        end = min(start + chunk, frames)
+        low = max(0, start - context)
+        high = min(frames, end + context)
+        part = to_float(samples[low:high])
+        if mono:
+            part = part.mean(axis=1, keepdims=True)
+        if up != down:
+            part = resample_poly(part, up, down, axis=0)
+        output_start = start * up // down
+        output_end = output_frames if end == frames else end * up // down
+        first = (start - low) * up // down
+        output[:, output_start:output_end] = part[first:first + output_end - output_start].T
+    return output[0] if mono else output
+
+
+def load_audio(path, sampling_rate):
+    """Моно-аудио для распознавания: WAV - через отображение в память, остальное - через PyAV"""
+    if path.lower().endswith(".wav") and read_wav_header(path) is not None:
+        return read_wav(path, sampling_rate)
+    from faster_whisper import decode_audio
+    return decode_audio(path, sampling_rate=sampling_rate)
+
+
+def decode_channels(path, sampling_rate):
+    """Декодирование с ресэмплингом без сведения в моно: массив (каналы, отсчёты)"""
+    if path.lower().endswith(".wav") and read_wav_header(path) is not None:
+        return read_wav(path, sampling_rate, mono=False)
+
+    import av
+
+    chunks = []
+    with av.open(path, metadata_errors="ignore") as container:
+        stream = container.streams.audio[0]
+        channels = stream.channels
+        resampler = av.AudioResampler(format="fltp", layout=stream.layout, rate=sampling_rate)
+        for frame in container.decode(stream):
+            frame.pts = None
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray())
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray())
+    if not chunks:
+        return np.zeros((channels, 0), dtype=np.float32)
+    return np.concatenate(chunks, axis=1).astype(np.float32)
+
+
+def to_transcript_segment(segment, offset=0.0):
+    """Сегмент faster_whisper в независимую от версии запись со сдвигом времени"""
+    return TranscriptSegment(
+        start=segment.start + offset,
+        end=segment.end + offset,
+        text=segment.text,
+        avg_logprob=segment.avg_logprob,
+        compression_ratio=segment.compression_ratio,
+        no_speech_prob=segment.no_speech_prob
+    )
+
+
+def is_low_confidence(segment, thresholds):
+    """Сегмент, который стоит перераспознать более точной моделью"""
+    return (
+        segment.avg_logprob < thresholds["min_avg_logprob"]
+        or segment.compression_ratio > thresholds["max_compression_ratio"]
+        or segment.no_speech_prob > thresholds["max_no_speech_prob"]
+    )
+
+
+def find_low_confidence_ranges(segments, thresholds, merge_gap=0.5):
+    """Интервалы времени (начало, конец) с неуверенными сегментами
+
+    Соседние неуверенные сегменты объединяются, если между ними меньше
+    merge_gap секунд, чтобы точная модель получала связный фрагмент.
+    """
+    ranges = []
+    for segment in segments:
+        if not is_low_confidence(segment, thresholds):
+            continue
+        if ranges and segment.start - ranges[-1][1] <= merge_gap:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], segment.end))
+        else:
+            ranges.append((segment.start, segment.end))
+    return ranges
+
+
+def redecode_ranges(segments, ranges, model, audio, sampling_rate, on_refined=None, **transcribe_options):
+    """Перераспознать интервалы и вклеить результат вместо исходных сегментов
+
+    on_refined(начало, конец, сегменты) вызывается после каждого интервала.
+    """
+    def in_ranges(segment):
+        middle = (segment.start + segment.end) / 2
+        return any(start <= middle <= end for start, end in ranges)
+
+    result = [segment for segment in segments if not in_ranges(segment)]
+    for start, end in ranges:
+        chunk = audio[int(start * sampling_rate):int(end * sampling_rate)]
+        if len(chunk) == 0:
+            continue
+        refined, _ = model.transcribe(chunk, **transcribe_options)
+        refined = [to_transcript_segment(segment, offset=start) for segment in refined]
+        result.extend(refined)
+        if on_refined:
+            on_refined(start, end, refined)
+
+    result.sort(key=lambda segment: segment.start)
+    return result
+
+
+def normalize_text(text):
+    """Текст сегмента без регистра, знаков препинания и лишних пробелов"""
+    return " ".join("".join(char if char.isalnum() else " " for char in text.lower()).split())
+
+
+class LoopGuard:
+    """Обнаружение зацикливания декодера по мере поступления сегментов
+
+    Подозрительные сегменты придерживаются: повтор предыдущей фразы или
+    фраза, чередующаяся с другой на всём окне, а также сегменты с высокой
+    вероятностью отсутствия речи. Короткие фразы считаются повтором, только
+    если декодер в них не уверен, чтобы не резать обычный диалог («Да.»
+    «Нет.» «Да.»). Если серия прерывается нормальным сегментом, они
+    отдаются как есть; если серия достигает предела, участок считается
+    зацикливанием и отбрасывается.
+    """
+
+    def __init__(self, max_repeats=3, window=4, min_loop_chars=12, max_compression_ratio=2.4,
+                 max_no_speech_prob=0.6, min_avg_logprob=-0.8, max_no_speech_run=3, **_):
+        self.max_repeats = max_repeats
+        self.window = window
+        self.min_loop_chars = min_loop_chars
+        self.max_compression_ratio = max_compression_ratio
+        self.max_no_speech_prob = max_no_speech_prob
+        self.min_avg_logprob = min_avg_logprob
+        self.max_no_speech_run = max_no_speech_run
+        self.reset()
+
+    def reset(self):
+        self.recent = []  # Нормализованный текст последних принятых сегментов
+        self.pending = []
+        self.pending_reason = None
+
+    def feed(self, segment):
+        """Возвращает (принятые сегменты, причина обрыва или None)
+
+        При обрыве отброшенные сегменты остаются в self.pending.
+        """
+        text = normalize_text(segment.text)
+        if not text or (segment.no_speech_prob > self.max_no_speech_prob
+                        and segment.avg_logprob < self.min_avg_logprob):
+            reason, limit = "no_speech", self.max_no_speech_run
+        elif self.is_repetition(text, segment):
+            reason, limit = "repetition", self.max_repeats
+        else:
+            reason, limit = None, 0
+
+        if reason is None or (self.pending and reason != self.pending_reason):
+            accepted = self.flush()
+        else:
+            accepted = []
+        if reason is None:
+            accepted.append(segment)
+            self.recent.append(text)
+            return accepted, None
+
+        self.pending.append(segment)
+        self.pending_reason = reason
+        if len(self.pending) >= limit:
+            return accepted, reason
+        return accepted, None
+
+    def is_repetition(self, text, segment):
+        """Фраза повторяет предыдущую или чередуется с другой на всём окне"""
+        if (len(text) < self.min_loop_chars and segment.compression_ratio <= self.max_compression_ratio
+                and segment.avg_logprob >= self.min_avg_logprob):
+            return False
+        history = self.recent[-self.window:] + [normalize_text(item.text) for item in self.pending]
+        if history and text == history[-1]:
+            return True
+        # Чередование A B A B: на чётных местах окна эта фраза, на нечётных - одна и та же другая
+        if len(history) < self.window:
+            return False
+        others = {history[-offset] for offset in range(1, self.window + 1, 2)}
+        return len(others) == 1 and all(history[-offset] == text for offset in range(2, self.window + 1, 2))
+
+    def flush(self):
+        """Отдать придержанные сегменты (серия оказалась обычной речью)"""
+        accepted = self.pending
+        self.recent.extend(normalize_text(segment.text) for segment in accepted)
+        self.pending = []
+        self.pending_reason = None
+        return accepted
+
+
+def guard_segments(segments, model, audio, sampling_rate, options, suppressed, **transcribe_options):
+    """Сегменты распознавания с обрывом зацикливаний
+
+    segments - генератор первого вызова model.transcribe(audio). При
+    зацикливании генератор закрывается (декодирование оставшейся части
+    прекращается), а распознавание перезапускается с конца отброшенного
+    участка плюс skip_s без условия на предыдущий текст. Отброшенные
+    участки дописываются в suppressed. Выдаёт TranscriptSegment.
+    """
+    guard = LoopGuard(**options)
+    offset = 0.0
+    duration = len(audio) / sampling_rate
+    while segments is not None:
+        restart = None
+        for segment in segments:
+            accepted, reason = guard.feed(to_transcript_segment(segment, offset=offset))
+            yield from accepted
+            if reason:
+                dropped = guard.pending
+                restart = dropped[-1].end + options["skip_s"]
+                suppressed.append({
+                    "reason": reason,
+                    "start": round(dropped[0].start, 3),
+                    "end": round(min(restart, duration), 3),
+                    "segments": len(dropped),
+                    "text": dropped[-1].text.strip()
+                })
+                guard.reset()
+                break
+        if restart is None:
+            yield from guard.flush()
+            return
+        segments.close()
+        segments = None
+        if restart < duration:
+            offset = restart
+            segments, _ = model.transcribe(
+                audio[int(restart * sampling_rate):],
+                **{**transcribe_options, "condition_on_previous_text": False}
+            )
+
+
+class TranscriptView:
+    """Текст расшифровки, в котором черновые сегменты заменяются итоговыми
+
+    Изменения копятся и отрисовываются пачкой через schedule, чтобы
+    поток распознавания не перерисовывал окно на каждый сегмент.
+    """
+
+    def __init__(self, render, schedule):
+        self.render = render
+        self.schedule = schedule
+        self.items = []  # (сегмент, итоговый)
+        self.lock = threading.Lock()
+        self.render_pending = False
+
+    def _update(self, change):
+        """Изменить список сегментов и запланировать отрисовку"""
+        with self.lock:
+            self.items = change(self.items)
+            self.items.sort(key=lambda item: item[0].start)
+            schedule = not self.render_pending
+            self.render_pending = True
+        if schedule:
+            self.schedule(self._flush)
+
+    def _flush(self):
+        with self.lock:
+            self.render_pending = False
+            items = list(self.items)
+        self.render(items)
+
+    def clear(self):
+        self._update(lambda items: [])
+
+    def add_preview(self, segment):
+        """Черновой сегмент из быстрого прохода"""
+        self._update(lambda items: items + [(segment, False)])
+
+    def add_final(self, segment):
+        """Итоговый сегмент: заменяет черновые, закончившиеся до его конца"""
+        self._update(lambda items: [
+            (item, final) for item, final in items
+            if final or (item.start + item.end) / 2 > segment.end
+        ] + [(segment, True)])
+
+    def replace_range(self, start, end, segments):
+        """Заменить сегменты внутри интервала перераспознанными"""
+        self._update(lambda items: [
+            (item, final) for item, final in items
+            if not start <= (item.start + item.end) / 2 <= end
+        ] + [(segment, True) for segment in segments])
+
+
+def preprocess_audio(audio, sample_rate, highpass_hz=80, target_db=-20.0, max_gain_db=30.0,
+                     chunk_s=PREPROCESS_CHUNK_S):
+    """Удаление постоянной составляющей, фильтр верхних частот и нормализация громкости
+
+    Аудио обрабатывается кусками по chunk_s секунд: первый проход считает
+    постоянную составляющую, второй вычитает её, фильтрует (состояние фильтра
+    переносится между кусками) и измеряет громкость по блокам выше порога
+    тишины, затем применяется усиление с ограничением по пику.
+    Массив float32 изменяется на месте и возвращается.
+    """
+    from scipy.signal import butter, sosfilt
+
+    total = len(audio)
+    if total == 0:
+        return audio
+    block = max(1, int(PREPROCESS_BLOCK_S * sample_rate))
+    chunk = max(1, int(chunk_s * sample_rate) // block) * block
+
+    # Проход 1: постоянная составляющая
+    dc = sum(float(audio[start:start + chunk].sum(dtype=np.float64))
+             for start in range(0, total, chunk)) / total
+
+    # Проход 2: фильтрация и громкость по блокам
+    sos = butter(2, highpass_hz, btype="highpass", fs=sample_rate, output="sos") if highpass_hz else None
+    zi = np.zeros((sos.shape[0], 2)) if sos is not None else None
+    gate = 10 ** (PREPROCESS_GATE_DB / 10)
+    gated_energy = 0.0
+    gated_blocks = 0
+    peak = 0.0
+    for start in range(0, total, chunk):
+        part = audio[start:start + chunk] - np.float32(dc)
+        if sos is not None:
+            part, zi = sosfilt(sos, part, zi=zi)
+        audio[start:start + len(part)] = part
+        usable = len(part) // block * block
+        if usable:
+            energies = np.mean(np.square(part[:usable].reshape(-1, block), dtype=np.float64), axis=1)
+            loud = energies[energies > gate]
+            gated_energy += float(loud.sum())
+            gated_blocks += len(loud)
+        peak = max(peak, float(np.abs(part).max()))
+
+    if not gated_blocks or peak == 0:
+        return audio
+    loudness_db = 10 * np.log10(gated_energy / gated_blocks)
+    gain = min(10 ** (min(target_db - loudness_db, max_gain_db) / 20), 0.99 / peak)
+    for start in range(0, total, chunk):
+        audio[start:start + chunk] *= np.float32(gain)
+    return audio
+
+
+class UtteranceSegmenter:
+    """Нарезка потока записи на фразы по паузам
+
+    Блоки копятся с первого блока выше порога тишины; фраза закрывается
+    после min_silence_s тишины или по достижении max_utterance_s.
+    Один тихий блок перед фразой сохраняется, чтобы не обрезать её начало.
+    """
+
+    def __init__(self, sample_rate, silence_threshold=0.01, min_silence_s=0.7,
+                 min_utterance_s=0.3, max_utterance_s=30.0):
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.min_silence = int(min_silence_s * sample_rate)
+        self.min_voiced = int(min_utterance_s * sample_rate)
+        self.max_length = int(max_utterance_s * sample_rate)
+        self.position = 0  # Отсчётов с начала записи
+        self.blocks = []
+        self.start = 0
+        self.length = 0
+        self.voiced = 0
+        self.silence = 0
+        self.preroll = None
+
+    def feed(self, block):
+        """Добавить моно-блок; возвращает законченные фразы [(начало в секундах, аудио)]"""
+        is_voiced = len(block) > 0 and np.sqrt(np.mean(np.square(block))) >= self.silence_threshold
+        if not self.blocks and not is_voiced:
+            self.preroll = block
+            self.position += len(block)
+            return []
+        if not self.blocks and self.preroll is not None:
+            self.blocks.append(self.preroll)
+            self.length = len(self.preroll)
+        if len(self.blocks) <= 1 and self.voiced == 0:
+            self.start = self.position - self.length
+
+        self.blocks.append(block)
+        self.length += len(block)
+        self.position += len(block)
+        if is_voiced:
+            self.voiced += len(block)
+            self.silence = 0
+        else:
+            self.silence += len(block)
+
+        if self.silence >= self.min_silence or self.length >= self.max_length:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """Закрыть текущую фразу (в конце записи)"""
+        utterances = []
+        if self.blocks and self.voiced >= self.min_voiced:
+            utterances.append((self.start / self.sample_rate, np.concatenate(self.blocks)))
+        self.blocks = []
+        self.length = 0
+        self.voiced = 0
+        self.silence = 0
+        self.preroll = None
+        return utterances
+
+
+class FeatureCache:
+    """Кэш на диске: декодированное аудио и лог-мел признаки по хэшу содержимого файла
+
+    Записи хранятся в .npy и вытесняются по давности использования (время
+    изменения файла обновляется при каждом чтении), пока общий размер
+    не уложится в max_size_mb.
+    """
+
+    def __init__(self, cache_dir, max_size_mb=2048):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.file_keys = {}  # (путь, размер, время изменения) -> хэш содержимого
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def file_key(self, path):
+        """Хэш содержимого файла (в пределах сеанса не пересчитывается)"""
+        import hashlib
+
+        stat = os.stat(path)
+        identity = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        if identity not in self.file_keys:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            self.file_keys[identity] = digest.hexdigest()
+        return self.file_keys[identity]
+
+    def _path(self, key, name):
+        return os.path.join(self.cache_dir, f"{key}_{name}.npy")
+
+    def load(self, key, name):
+        """Массив из кэша или None"""
+        path = self._path(key, name)
+        try:
+            array = np.load(path)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return array
+
+    def save(self, key, name, array):
+        """Сохранить массив (через временный файл) и вытеснить старые записи"""
+        path = self._path(key, name)
+        temp_path = path + ".part"
+        try:
+            with open(temp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Ошибка записи кэша: {str(e)}")
+            return
+        self.evict()
+
+    def evict(self):
+        """Удаление давно не использованных записей сверх лимита"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+
+    @contextmanager
+    def features(self, model, audio, key, stats):
+        """Признаки из кэша на время вызова model.transcribe(audio)
+
+        faster_whisper не принимает готовые признаки, поэтому на время
+        вызова извлекатель признаков модели подменяется обёрткой. Из кэша
+        берутся только признаки именно этого массива audio; для других
+        входов (например, после VAD) вызывается исходный извлекатель.
+        """
+        import hashlib
+
+        extractor = model.feature_extractor
+        cache = self
+
+        class CachedExtractor:
+            def __getattr__(self, name):
+                return getattr(extractor, name)
+
+            def __call__(self, waveform, *args, **kwargs):
+                if waveform is not audio:
+                    stats.setdefault("feature_cache", "bypass")
+                    return extractor(waveform, *args, **kwargs)
+                parameters = repr((getattr(extractor, "mel_filters", np.empty((0,))).shape,
+                                   getattr(extractor, "hop_length", None),
+                                   getattr(extractor, "n_fft", None), args, sorted(kwargs.items())))
+                name = "mel_" + hashlib.blake2b(parameters.encode(), digest_size=8).hexdigest()
+                features = cache.load(key, name)
+                if features is not None:
+                    stats["feature_cache"] = "hit"
+                    return features
+                features = extractor(waveform, *args, **kwargs)
+                cache.save(key, name, features)
+                stats["feature_cache"] = "miss"
+                return features
+
+        model.feature_extractor = CachedExtractor()
+        try:
+            yield
+        finally:
+            model.feature_extractor = extractor
+
+
+def float_to_pcm(block, sample_width):
+    """Отсчёты float в диапазоне [-1, 1] в байты PCM заданной ширины (2, 3 или 4 байта)"""
+    block = np.clip(np.asarray(block, dtype=np.float64), -1.0, 1.0)
+    if sample_width == 2:
+        return (block * 32767).astype("<i2").tobytes()
+    samples = (block * 2147483647).astype("<i4")
+    if sample_width == 3:
+        # Старшие три байта каждого 32-битного отсчёта
+        return samples.view(np.uint8).reshape(-1, 4)[:, 1:].tobytes()
+    return samples.tobytes()
+
+
+class IncrementalWavWriter:
+    """WAV-файл, дописываемый по ходу записи в отдельном потоке
+
+    Блоки из обратного вызова PortAudio передаются через очередь и
+    пишутся пачками. Заголовок обновляется после каждой пачки, поэтому
+    файл остаётся корректным, даже если программа закроется посреди записи.
+    """
+
+    def __init__(self, path, sample_rate, channels, sample_width=2):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.sample_width = sample_width
+        self.frames = 0
+        self.queue = queue.Queue()
+        self.wav = wave.open(path, "wb")
+        self.wav.setnchannels(channels)
+        self.wav.setsampwidth(sample_width)
+        self.wav.setframerate(sample_rate)
+        self.thread = threading.Thread(target=self._run, name="wav-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, block):
+        """Добавить блок (можно вызывать из обратного вызова PortAudio)"""
+        self.queue.put(block)
+
+    def _run(self):
+        finished = False
+        while not finished:
+            blocks = [self.queue.get()]
+            while not self.queue.empty():
+                blocks.append(self.queue.get_nowait())
+            if blocks[-1] is None:
+                finished = True
+                blocks.pop()
+            if blocks:
+                self.wav.writeframes(b"".join(float_to_pcm(block, self.sample_width) for block in blocks))
+                self.frames += sum(len(block) for block in blocks)
+
+    def close(self):
+        """Дописать оставшиеся блоки и закрыть файл; возвращает число кадров"""
+        self.queue.put(None)
+        self.thread.join()
+        self.wav.close()
+        return self.frames
+
+
+@contextmanager
+def connect_database(path):
+    """Соединение SQLite с транзакцией: фиксируется при выходе, откатывается при ошибке
+
+    Соединение открывается на каждую операцию, поэтому базу можно
+    использовать из любого потока.
+    """
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA journal_mode = WAL")
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def fts_query(text):
+    """Запрос пользователя в синтаксис FTS5: все слова обязательны, "слово*" - по началу"""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*").replace('"', '""')
+        if term:
+            terms.append(f'"{term}"*' if prefix else f'"{term}"')
+    return " ".join(terms)
+
+
+class TranscriptIndex:
+    """Полнотекстовый индекс сегментов всех расшифровок (SQLite FTS5)
+
+    Каждая расшифровка - запись в documents (исходный файл, файл результата,
+    модель, язык), её сегменты с временем в миллисекундах - в segments.
+    Поиск идёт по внешней таблице FTS5, которую поддерживают триггеры.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            output TEXT NOT NULL UNIQUE,
+            model TEXT,
+            language TEXT,
+            duration_s REAL,
+            created TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS segments (
+            id INTEGER PRIMARY KEY,
+            document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            speaker TEXT,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS segments_document ON segments(document_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+            text, content='segments', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        CREATE TRIGGER IF NOT EXISTS segments_insert AFTER INSERT ON segments BEGIN
+            INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+        END;
+        CREATE TRIGGER IF NOT EXISTS segments_delete AFTER DELETE ON segments BEGIN
+            INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    def connect(self):
+        return connect_database(self.path)
+
+    def add(self, source, output, segments, model=None, language=None, duration_s=None):
+        """Проиндексировать расшифровку; прежняя запись для того же файла результата заменяется"""
+        with self.connect() as connection:
+            connection.execute("DELETE FROM documents WHERE output = ?", (os.path.abspath(output),))
+            document_id = connection.execute(
+                "INSERT INTO documents (source, output, model, language, duration_s, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(source), os.path.abspath(output), model, language, duration_s,
+                 datetime.now().isoformat(timespec="seconds"))
+            ).lastrowid
+            connection.executemany(
+                "INSERT INTO segments (document_id, start_ms, end_ms, speaker, text) VALUES (?, ?, ?, ?, ?)",
+                [(document_id, int(round(segment.start * 1000)), int(round(segment.end * 1000)),
+                  segment.speaker, segment.text.strip())
+                 for segment in segments if segment.text.strip()]
+            )
+        return document_id
+
+    def search(self, text, limit=50):
+        """Сегменты, содержащие все слова запроса, от самых релевантных
+
+        Возвращает словари: source, output, model, language, start_ms,
+        end_ms, speaker, text, snippet (найденные слова в [скобках]).
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        with self.connect() as connection:
+            connection.row_factory = sqlite3.Row
+            rows = connection.execute(
+                "SELECT d.source, d.output, d.model, d.language, s.start_ms, s.end_ms, s.speaker, s.text, "
+                "snippet(segments_fts, 0, '[', ']', '…', 16) AS snippet "
+                "FROM segments_fts JOIN segments s ON s.id = segments_fts.rowid "
+                "JOIN documents d ON d.id = s.document_id "
+                "WHERE segments_fts MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        """Число проиндексированных расшифровок и сегментов"""
+        with self.connect() as connection:
+            documents = connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            segments = connection.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return documents, segments
+
+
+def format_search_result(result):
+    """Строка результата поиска: файл, смещение в мс и время, фрагмент"""
+    speaker = f" {result['speaker']}:" if result["speaker"] else ""
+    return (f"{result['source']} @ {result['start_ms']} мс [{format_timestamp(result['start_ms'] / 1000)}]"
+            f"{speaker} {result['snippet']}")
+
+
+# Расширения, которые считаются аудиофайлами при обходе папок
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a", ".ogg", ".flac", ".opus", ".aac", ".wma", ".mp4", ".webm")
+
+# Отпечаток файла: хэш размера и этого числа байт из начала и конца
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+def file_fingerprint(path):
+    """Размер, время изменения и быстрый отпечаток содержимого файла
+
+    Читаются только начало и конец файла, поэтому отпечаток дешёвый даже
+    для многочасовых записей и не меняется при переименовании или переносе.
+    """
+    import hashlib
+
+    stat = os.stat(path)
+    digest = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if stat.st_size > 2 * FINGERPRINT_SAMPLE_BYTES:
+            f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read())
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "fingerprint": digest.hexdigest()}
+
+
+def find_audio_files(paths):
+    """Аудиофайлы из списка путей; папки обходятся рекурсивно"""
+    for path in paths:
+        if os.path.isdir(path):
+            for folder, _, names in os.walk(path):
+                for name in sorted(names):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        yield os.path.join(folder, name)
+        elif os.path.isfile(path):
+            yield path
+
+
+class JobLedger:
+    """Журнал задач распознавания: что, какой моделью, с какими настройками и чем кончилось
+
+    Хранится в той же базе, что и поисковый индекс. По отпечатку входного
+    файла можно быстро найти файлы, ещё не распознанные нужной моделью
+    или изменившиеся после распознавания.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            source TEXT,
+            size INTEGER,
+            mtime_ns INTEGER,
+            fingerprint TEXT,
+            model TEXT,
+            language TEXT,
+            settings TEXT,
+            output TEXT,
+            started TEXT NOT NULL,
+            total_s REAL,
+            audio_duration_s REAL,
+            rtf REAL,
+            outcome TEXT NOT NULL,
+            error TEXT,
+            metrics TEXT
+        );
+        CREATE INDEX IF NOT EXISTS jobs_source ON jobs(source, model, outcome);
+        CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs(fingerprint, model, outcome);
+        CREATE INDEX IF NOT EXISTS jobs_started ON jobs(started);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self.connect() as connection:
+            connection.executescript(self.SCHEMA)
+
+    def connect(self):
+        return connect_database(self.path)
+
+    def record(self, kind, metrics, source=None, source_info=None, model=None, settings=None, output=None):
+        """Записать задачу по её JobMetrics; outcome - "error", если в метриках есть ошибка"""
+        result = metrics.to_dict()
+        source_info = source_info or {}
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO jobs (job_id, kind, source, size, mtime_ns, fingerprint, model, language, "
+                "settings, output, started, total_s, audio_duration_s, rtf, outcome, error, metrics) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (metrics.job_id, kind, os.path.abspath(source) if source else None,
+                 source_info.get("size"), source_info.get("mtime_ns"), source_info.get("fingerprint"),
+                 model or result.get("model"), result.get("language"),
+                 json.dumps(settings, ensure_ascii=False) if settings is not None else None,
+                 os.path.abspath(output) if output else None,
+                 datetime.fromtimestamp(time.time() - result["total_s"]).isoformat(timespec="seconds"),
+                 result["total_s"], result.get("audio_duration_s") or result.get("dictated_audio_s"),
+                 result.get("rtf"), "error" if "error" in result else "ok", result.get("error"),
+                 json.dumps(result, ensure_ascii=False))
+            )
+
+    def recent(self, limit=20, outcome=None):
+        """Последние задачи (новые первыми), при необходимости только с данным исходом"""
+        query = "SELECT * FROM jobs"
+        parameters = []
+        if outcome:
+            query += " WHERE outcome = ?"
+            parameters.append(outcome)
+        query += " ORDER BY started DESC LIMIT ?"
+        parameters.append(limit)
+        with self.connect() as connection:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute(query, parameters)]
+
+    def pending(self, paths, model):
+        """Файлы, у которых нет успешной задачи этой моделью для текущего содержимого
+
+        Сначала сверяются путь, размер и время изменения (без чтения файла);
+        отпечаток считается только для новых, изменённых или перенесённых
+        файлов.
+        """
+        with self.connect() as connection:
+            for path in paths:
+                path = os.path.abspath(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                done = connection.execute(
+                    "SELECT 1 FROM jobs WHERE source = ? AND model = ? AND outcome = 'ok' "
+                    "AND size = ? AND mtime_ns = ? LIMIT 1",
+                    (path, model, stat.st_size, stat.st_mtime_ns)
+                ).fetchone()
+                if done:
+                    continue
+                try:
+                    fingerprint = file_fingerprint(path)["fingerprint"]
+                except OSError:
+                    continue
+                done = connection.execute(
+                    "SELECT 1 FROM jobs WHERE fingerprint = ? AND model = ? AND outcome = 'ok' LIMIT 1",
+                    (fingerprint, model)
+                ).fetchone()
+                if not done:
+                    yield path
+
+
+def format_job(job):
+    """Строка журнала задач: время, исход, модель, RTF, файл и ошибка"""
+    rtf = f"RTF {job['rtf']:.2f}" if job["rtf"] is not None else "RTF -"
+    line = f"{job['started']}  {job['outcome']:<5}  {job['kind']:<10}  {job['model'] or '-':<16}  {rtf:<9}  {job['source'] or ''}"
+    if job["error"]:
+        line += f"\n    ❌ {job['error']}"
+    return line
+
+
+class JobMetrics:
+    """Замер длительности этапов одной задачи распознавания"""
+
+    def __init__(self, source):
+        self.job_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.source = source
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.segment_times = []
+        self.first_segment = None
+        self.info = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Замер этапа; при повторном входе время суммируется"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def track_segments(self, segments):
+        """Обёртка над генератором сегментов с замером декодирования каждого"""
+        last = time.perf_counter()
+        for segment in segments:
+            now = time.perf_counter()
+            if self.first_segment is None:
+                self.first_segment = now - self.started
+            self.segment_times.append(now - last)
+            yield segment
+            last = time.perf_counter()
+
+    def to_dict(self):
+        total = time.perf_counter() - self.started
+        result = {
+            "job_id": self.job_id,
+            "source": self.source,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "total_s": round(total, 4),
+            "stages_s": {name: round(value, 4) for name, value in self.stages.items()},
+            "time_to_first_segment_s": round(self.first_segment, 4) if self.first_segment is not None else None,
+            "segments": {
+                "count": len(self.segment_times),
+                "total_s": round(sum(self.segment_times), 4),
+                "mean_s": round(sum(self.segment_times) / len(self.segment_times), 4) if self.segment_times else None,
+                "max_s": round(max(self.segment_times), 4) if self.segment_times else None
+            }
+        }
+        duration = self.info.get("audio_duration_s")
+        if duration:
+            result["rtf"] = round(total / duration, 4)
+        result.update(self.info)
+        return result
+
+    def write(self, log_file):
+        """Дописать метрики задачи одной JSON-строкой в лог"""
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_dict(), ensure_ascii=False) + "\n")
+
 
 class AudioTranscriber(ctk.CTk):
-    def __init__(self):
+    def __init__(self, overrides=None):
         super().__init__()
+        self.overrides = overrides or {}  # Настройки из командной строки (не сохраняются)
 
         # Создание структуры папок в документах
-        self.user_data_dir = os.path.join(os.path.expanduser("~"), "Documents", "VoiceScribePro")
+        self.user_data_dir = USER_DATA_DIR
         self.models_dir = os.path.join(self.user_data_dir, "models")
         self.recordings_dir = os.path.join(self.user_data_dir, "recordings")
         self.settings_dir = os.path.join(self.user_data_dir, "settings")
+        self.logs_dir = os.path.join(self.user_data_dir, "logs")
+        self.cache_dir = os.path.join(self.user_data_dir, "cache")
+        self.index_file = os.path.join(self.user_data_dir, "transcripts.db")
+        self.feature_cache = None
         
         # Создаем папки если их нет
-        for directory in [self.user_data_dir, self.models_dir, self.recordings_dir, self.settings_dir]:
+        for directory in [self.user_data_dir, self.models_dir, self.recordings_dir, self.settings_dir, self.logs_dir]:
             os.makedirs(directory, exist_ok=True)
 
         # Настройка основного окна
@@ -60,10 +2286,15 @@ class AudioTranscriber(ctk.CTk):
 
         # Загрузка настроек
         self.settings = self.load_settings()
+        self.apply_cpu_affinity()
+        self.language_memory_file = os.path.join(self.settings_dir, "language_memory.json")
         
-        # Проверка и установка PyTorch с CUDA
-        if self.settings.get("show_pytorch_dialog", True):
-            self.check_pytorch_cuda()
+        # Проверка GPU и библиотек CUDA в фоне (результат кэшируется между запусками)
+        self.environment = None
+        self.environment_cache_file = os.path.join(self.settings_dir, "environment.json")
+        self.after(200, lambda: self.start_environment_check(
+            show_dialog=self.settings.get("show_pytorch_dialog", True)
+        ))
         
         # Настройка сетки
         self.grid_columnconfigure(0, weight=1)
@@ -72,7 +2303,8 @@ class AudioTranscriber(ctk.CTk):
         # Параметры записи
         self.fs = 44100
         self.recording = False
-        self.audio_data = []
+        self.paused = False
+        self.wav_writer = None
         self.record_time = 0
         self.timer_running = False
         self.is_recorded_file = False
@@ -82,53 +2314,31 @@ class AudioTranscriber(ctk.CTk):
         
         # Инициализация модели
         self.model = None
+        self.loaded_models = {}  # Загруженные модели: (имя, тип вычислений, потоки, рабочие) -> модель
+        self.model_refresh_requested = None  # Имя модели, которую нужно скачать заново
+        self.models_last_used = time.time()
+        self.model_substitutions = {}  # Замены моделей при нехватке памяти: запрошенная -> загруженная
+        self.unload_pending = False  # Выгрузка, отложенная до конца текущей задачи
         self.is_transcribing = False
         
         # Модели Whisper с информацией
-        self.available_models = {
-            "Tiny (быстрая, менее точная)": {
-                "name": "tiny",
-                "params": "78M",
-                "vram": "~1 GB",
-                "speed": "~10x быстрее large",
-                "installed": False
-            },
-            "Base (средняя)": {
-                "name": "base",
-                "params": "148M",
-                "vram": "~1 GB",
-                "speed": "~7x быстрее large",
-                "installed": False
-            },
-            "Small (точная)": {
-                "name": "small",
-                "params": "488M",
-                "vram": "~2 GB",
-                "speed": "~4x быстрее large",
-                "installed": False
-            },
-            "Medium (очень точная)": {
-                "name": "medium",
-                "params": "1538M",
-                "vram": "~5 GB",
-                "speed": "~2x быстрее large",
-                "installed": False
-            },
-            "Large (самая точная)": {
-                "name": "large-v3",
-                "params": "3158M",
-                "vram": "~10 GB",
-                "speed": "базовая скорость",
-                "installed": False
-            },
-            "Turbo (быстрая и точная)": {
-                "name": "turbo",
-                "params": "1618M",
-                "vram": "~6 GB",
-                "speed": "~8x быстрее large",
-                "installed": False
-            }
-        }
+        self.available_models = copy.deepcopy(load_model_catalog(self.settings_dir))
+
+        # Фоновая загрузка библиотек распознавания после появления окна
+        self.after(500, self.preload_backends)
+
+        # Выгрузка моделей при простое и нехватке памяти
+        self.after(MODEL_WATCH_INTERVAL_MS, self.watch_models)
+
+    def preload_backends(self):
+        """Импорт faster_whisper в фоне, чтобы первая задача не ждала его"""
+        def preload():
+            try:
+                import faster_whisper  # noqa: F401
+            except Exception as e:
+                print(f"Ошибка загрузки faster_whisper: {str(e)}")
+
+        threading.Thread(target=preload, name="preload-backends", daemon=True).start()
 
     def load_settings(self):
         try:
@@ -142,12 +2352,19 @@ class AudioTranscriber(ctk.CTk):
                 "device": "cpu",
                 "use_gpu": False,
                 "show_pytorch_dialog": True,
+                "profile": False,  # cProfile каждой задачи в папку logs
                 "save_path": self.user_data_dir,  # Путь сохранения по умолчанию
-                "recording": {
-                    "sample_rate": 44100,
-                    "channels": 1,
-                    "bit_depth": 16
-                }
+                "language": "auto",
+                "remember_language": True,  # Запоминать определённый язык для папки
+                "target_rtf": AUTO_TARGET_RTF,  # Цель автоматического выбора модели
+                "idle_unload_minutes": IDLE_UNLOAD_MINUTES,  # Выгрузка моделей после простоя
+                "min_free_memory_mb": MIN_FREE_MEMORY_MB,  # Порог нехватки ОЗУ
+                "cpu_threads": 0,  # Потоки CTranslate2 на CPU (0 - по замеру или все доступные)
+                "num_workers": 1,  # Параллельных вызовов transcribe на одну модель
+                "cpu_affinity": "",  # Ядра процесса, например "0-7" (пусто - все)
+                "split_channels": False,  # Каналы - разные говорящие, распознаются отдельно
+                "channel_labels": [],  # Имена говорящих по каналам (по умолчанию «Спикер N»)
+                "recording": dict(RECORDING_DEFAULTS)
             }
             self.save_settings(default_settings)
             return default_settings
@@ -217,6 +2434,9 @@ class AudioTranscriber(ctk.CTk):
         # Секция результатов
         self.create_results_section()
 
+        # Секция текста расшифровки
+        self.create_transcript_section()
+
     def create_source_section(self):
         # Фрейм выбора источника
         self.source_frame = ctk.CTkFrame(
@@ -298,6 +2518,25 @@ class AudioTranscriber(ctk.CTk):
         )
         self.record_label.pack(side="left")
 
+        # Диктовка: распознавание фраз по ходу записи
+        dictation = {**DICTATION_DEFAULTS, **self.settings.get("dictation", {})}
+        self.dictation_var = ctk.BooleanVar(value=dictation["enabled"])
+
+        def toggle_dictation():
+            self.settings["dictation"] = {**dictation, "enabled": self.dictation_var.get()}
+            self.save_settings(self.settings)
+
+        self.dictation_checkbox = ctk.CTkCheckBox(
+            header_frame,
+            text="Диктовка (распознавать по ходу записи)",
+            variable=self.dictation_var,
+            command=toggle_dictation,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        self.dictation_checkbox.pack(side="right")
+
         # Таймер записи
         self.timer_label = ctk.CTkLabel(
             self.record_frame,
@@ -333,7 +2572,22 @@ class AudioTranscriber(ctk.CTk):
             font=ctk.CTkFont(size=13),
             text_color=self.colors["text_secondary"]
         )
-        self.record_status.grid(row=3, column=0, pady=(0, 20))
+        self.record_status.grid(row=3, column=0, pady=(0, 10))
+
+        # Пауза: поток записи остаётся открытым, запись продолжается в тот же файл
+        self.pause_button = ctk.CTkButton(
+            self.record_frame,
+            text="ПАУЗА",
+            command=self.toggle_pause,
+            state="disabled",
+            width=160,
+            height=35,
+            font=ctk.CTkFont(size=13, weight="bold"),
+            fg_color=self.colors["secondary"],
+            hover_color=self.colors["secondary_hover"],
+            corner_radius=17
+        )
+        self.pause_button.grid(row=4, column=0, pady=(0, 20))
 
     def create_results_section(self):
         # Фрейм результатов
@@ -427,20 +2681,109 @@ class AudioTranscriber(ctk.CTk):
         )
         self.start_button.grid(row=4, column=0, pady=20, padx=20, sticky="ew")
 
+    def create_transcript_section(self):
+        # Фрейм текста
+        self.transcript_frame = ctk.CTkFrame(
+            self.main_scroll,
+            corner_radius=20,
+            fg_color=self.colors["primary"],
+            border_color=self.colors["border"],
+            border_width=2
+        )
+        self.transcript_frame.grid(row=3, column=0, sticky="ew", padx=30, pady=20)
+        self.transcript_frame.grid_columnconfigure(0, weight=1)
+
+        # Заголовок секции с иконкой
+        header_frame = ctk.CTkFrame(
+            self.transcript_frame,
+            fg_color="transparent"
+        )
+        header_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=20)
+
+        self.transcript_label = ctk.CTkLabel(
+            header_frame,
+            text="📄 ТЕКСТ",
+            font=ctk.CTkFont(family="Roboto", size=16, weight="bold"),
+            text_color=self.colors["text_primary"]
+        )
+        self.transcript_label.pack(side="left")
+
+        search_button = ctk.CTkButton(
+            header_frame,
+            text="🔍 ПОИСК ПО РАСШИФРОВКАМ",
+            command=self.show_search_window,
+            width=200,
+            height=30,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        search_button.pack(side="right")
+
+        self.transcript_box = ctk.CTkTextbox(
+            self.transcript_frame,
+            height=250,
+            wrap="word",
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["secondary"],
+            border_color=self.colors["border"],
+            border_width=1,
+            corner_radius=15,
+            state="disabled"
+        )
+        self.transcript_box.grid(row=1, column=0, sticky="ew", padx=20, pady=(0, 20))
+        # Черновые сегменты выделяются цветом до замены итоговыми
+        self.transcript_box.tag_config("preview", foreground=self.colors["text_secondary"])
+
+        self.transcript_view = TranscriptView(
+            render=self.render_transcript,
+            schedule=lambda callback: self.after(100, callback)
+        )
+
+    def render_transcript(self, items):
+        """Отрисовка текста: итоговые сегменты обычным цветом, черновые - серым"""
+        self.transcript_box.configure(state="normal")
+        self.transcript_box.delete("1.0", "end")
+        for segment, final in items:
+            self.transcript_box.insert("end", format_segment_line(segment) + "\n", () if final else ("preview",))
+        self.transcript_box.configure(state="disabled")
+        self.transcript_box.see("end")
+
     def update_timer(self):
         if self.timer_running:
-            self.record_time += 1
+            if not self.paused:
+                self.record_time += 1
             minutes = self.record_time // 60
             seconds = self.record_time % 60
             self.timer_label.configure(text=f"{minutes:02d}:{seconds:02d}")
+            dropouts = self.capture_stats["input_overflow"] + self.capture_stats["input_underflow"]
+            if dropouts:
+                self.record_status.configure(
+                    text=f"Идёт запись... ⚠️ Пропусков звука: {dropouts} "
+                         f"(переполнений {self.capture_stats['input_overflow']}, "
+                         f"опустошений {self.capture_stats['input_underflow']})",
+                    text_color=self.colors["error"]
+                )
             self.after(1000, self.update_timer)
 
-    def update_level_indicator(self, indata):
-        if len(indata) > 0:
-            level = np.abs(indata).mean()
-            normalized_level = min(1.0, level * 10)
-            self.level_bar.set(normalized_level)
-            self.update()
+    def update_level_indicator(self):
+        """Уровень звука из потока записи (опрос из главного потока)"""
+        if self.recording:
+            self.level_bar.set(0 if self.paused else min(1.0, self.input_level * 10))
+            self.after(100, self.update_level_indicator)
+
+    def get_input_device(self):
+        """Индекс устройства ввода из настроек (None - устройство по умолчанию)"""
+        import sounddevice as sd
+
+        name = self.settings["recording"].get("device", "")
+        if not name:
+            return None
+        for index, device in enumerate(sd.query_devices()):
+            if device["name"] == name and device["max_input_channels"] > 0:
+                return index
+        print(f"Устройство записи «{name}» не найдено, используется устройство по умолчанию")
+        return None
 
     def toggle_recording(self):
         if not self.recording:
@@ -448,13 +2791,77 @@ class AudioTranscriber(ctk.CTk):
         else:
             self.stop_recording()
 
+    def toggle_pause(self):
+        """Пауза и продолжение записи без закрытия потока и нового файла"""
+        if not self.recording:
+            return
+        self.paused = not self.paused
+        self.pause_button.configure(text="ПРОДОЛЖИТЬ" if self.paused else "ПАУЗА")
+        self.record_status.configure(
+            text="⏸️ Запись на паузе" if self.paused else "Идёт запись...",
+            text_color=self.colors["text_secondary"] if self.paused else self.colors["error"]
+        )
+
     def start_recording(self):
-        self.recording = True
-        self.audio_data = []
+        self.paused = False
+        # Счётчики сбоев захвата: переполнение буфера означает потерянный звук
+        self.capture_stats = {"callbacks": 0, "input_overflow": 0, "input_underflow": 0}
+        self.input_level = 0.0
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.recording_file = os.path.join(self.recordings_dir, f"recording_{timestamp}.wav")
+        self.dictation_queue = None
         self.record_time = 0
+
+        # В обратном вызове PortAudio - только копирование блока, без обращений к окну.
+        # На паузе блоки отбрасываются, но поток остаётся открытым
+        def audio_callback(indata, frames, time, status):
+            if status:
+                self.capture_stats["input_overflow"] += bool(status.input_overflow)
+                self.capture_stats["input_underflow"] += bool(status.input_underflow)
+            if self.recording and not self.paused:
+                self.capture_stats["callbacks"] += 1
+                block = indata.copy()
+                self.wav_writer.write(block)
+                dictation_queue = self.dictation_queue
+                if dictation_queue is not None:
+                    dictation_queue.put(block)
+                self.input_level = float(np.abs(indata).mean())
+
+        # Устройство открывается до того, как меняется состояние окна: при ошибке
+        # (нет PortAudio или устройства, неверная задержка или частота) запись не начинается
+        recording = {**RECORDING_DEFAULTS, **self.settings["recording"]}
+        self.stream = None
+        self.wav_writer = None
+        try:
+            import sounddevice as sd
+
+            latency = recording["latency"]
+            self.stream = sd.InputStream(
+                device=self.get_input_device(),
+                channels=recording["channels"],
+                samplerate=recording["sample_rate"],
+                blocksize=recording["blocksize"],
+                latency=float(latency) if latency not in RECORDING_LATENCIES else latency,
+                callback=audio_callback
+            )
+            # Файл пишется по ходу записи, а не собирается в памяти к остановке
+            self.wav_writer = IncrementalWavWriter(
+                self.recording_file,
+                recording["sample_rate"],
+                recording["channels"],
+                sample_width={24: 3, 32: 4}.get(recording["bit_depth"], 2)
+            )
+            self.recording = True
+            self.stream.start()
+        except Exception as e:
+            self.abort_recording(e)
+            return
+
+        if self.dictation_var.get() and not self.is_transcribing:
+            self.start_dictation()
         self.timer_running = True
         self.update_timer()
-        
+
         self.record_button.configure(
             text="ОСТАНОВИТЬ ЗАПИСЬ",
             fg_color=self.colors["error"],
@@ -462,30 +2869,49 @@ class AudioTranscriber(ctk.CTk):
         )
         self.select_button.configure(state="disabled")
         self.start_button.configure(state="disabled")
+        self.pause_button.configure(text="ПАУЗА", state="normal")
         self.record_status.configure(
             text="Идёт запись...",
             text_color=self.colors["error"]
         )
-        
-        def audio_callback(indata, frames, time, status):
-            if self.recording:
-                self.audio_data.append(indata.copy())
-                self.after(10, lambda: self.update_level_indicator(indata))
-        
-        # Используем настройки записи из settings
-        self.stream = sd.InputStream(
-            channels=self.settings["recording"]["channels"],
-            samplerate=self.settings["recording"]["sample_rate"],
-            callback=audio_callback
+        self.update_level_indicator()
+
+    def abort_recording(self, error):
+        """Откат начатой записи, если устройство ввода не удалось открыть"""
+        self.recording = False
+        self.paused = False
+        self.timer_running = False
+        if self.stream is not None:
+            try:
+                self.stream.close()
+            except Exception:
+                pass
+            self.stream = None
+        if self.wav_writer is not None:
+            try:
+                self.wav_writer.close()
+            except Exception:
+                pass
+            self.wav_writer = None
+            try:
+                os.remove(self.recording_file)
+            except OSError:
+                pass
+        self.record_status.configure(
+            text=f"❌ Не удалось начать запись: {str(error)}",
+            text_color=self.colors["error"]
         )
-        self.stream.start()
 
     def stop_recording(self):
         self.recording = False
+        self.paused = False
         self.timer_running = False
         self.stream.stop()
         self.stream.close()
+        recorded_frames = self.wav_writer.close()
         self.level_bar.set(0)
+        self.pause_button.configure(text="ПАУЗА", state="disabled")
+        self.log_capture_stats()
         
         self.record_button.configure(
             text="НАЧАТЬ ЗАПИСЬ",
@@ -493,16 +2919,17 @@ class AudioTranscriber(ctk.CTk):
             hover_color=self.colors["secondary_hover"]
         )
         
-        if len(self.audio_data) > 0:
-            audio = np.concatenate(self.audio_data, axis=0)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            # Используем os.path.join для корректного формирования пути
-            filename = os.path.join(self.recordings_dir, f"recording_{timestamp}.wav")
-            os.makedirs(os.path.dirname(filename), exist_ok=True)  # Создаем директорию если её нет
-            
-            # Сохраняем с настройками из settings
-            write(filename, self.settings["recording"]["sample_rate"], audio)
+        # Диктовка: дораспознать последнюю фразу и сохранить текст
+        if self.dictation_queue is not None:
+            self.dictation_queue.put(None)
+
+        if recorded_frames == 0:
+            try:
+                os.remove(self.recording_file)
+            except OSError:
+                pass
+        else:
+            filename = self.recording_file
             
             self.selected_file = filename
             self.is_recorded_file = True
@@ -532,6 +2959,23 @@ class AudioTranscriber(ctk.CTk):
         
         self.select_button.configure(state="normal")
 
+    def log_capture_stats(self):
+        """Запись параметров потока и счётчиков сбоев захвата в logs/metrics.jsonl"""
+        metrics = JobMetrics("recording")
+        recording = {**RECORDING_DEFAULTS, **self.settings["recording"]}
+        metrics.info.update({
+            "device": recording["device"] or "default",
+            "blocksize": recording["blocksize"],
+            "latency_setting": recording["latency"],
+            "latency_s": round(self.stream.latency, 4),
+            "record_time_s": self.record_time,
+            **self.capture_stats
+        })
+        try:
+            metrics.write(os.path.join(self.logs_dir, "metrics.jsonl"))
+        except Exception as e:
+            print(f"Ошибка записи метрик: {str(e)}")
+
     def select_file(self):
         file_path = filedialog.askopenfilename(
             filetypes=[
@@ -575,6 +3019,8 @@ class AudioTranscriber(ctk.CTk):
             model_name = self.settings.get("model", "base")
             model_display = next((k for k, v in self.available_models.items() 
                                 if v["name"] == model_name), "Модель не выбрана")
+            if model_name == AUTO_MODEL:
+                model_display = AUTO_MODEL_LABEL
             
             self.status_label.configure(
                 text=f"🤖 Модель распознавания: {model_display}",
@@ -604,9 +3050,21 @@ class AudioTranscriber(ctk.CTk):
         self.is_transcribing = True
         self.disable_interface()
         
+        metrics = JobMetrics(self.selected_file)
+        job = {"source": self.selected_file}
+
         def transcribe():
+            # Профилирование задачи: включается в настройках или переменной окружения
+            profiler = None
+            if self.settings.get("profile", False) or os.environ.get("VOICESCRIBE_PROFILE"):
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+
             try:
                 start_time = time.time()
+                # Отпечаток снимается до распознавания: запись потом удаляется
+                job["source_info"] = file_fingerprint(self.selected_file)
                 
                 # Начало процесса
                 self.progress_bar.set(0)
@@ -617,17 +3075,7 @@ class AudioTranscriber(ctk.CTk):
                 self.update()
 
                 # Проверка CUDA для настроек
-                cuda_available = False
-                gpu_name = "Неизвестно"
-                try:
-                    import torch
-                    if torch.cuda.is_available():
-                        cuda_available = True
-                        gpu_name = torch.cuda.get_device_name(0)
-                except Exception:
-                    pass
-
-                device_var = ctk.StringVar(value="gpu" if self.settings.get("use_gpu", False) else "cpu")
+                cuda_available = probe_devices()["cuda_devices"] > 0
                 
                 if self.settings.get("use_gpu", False) and not cuda_available:
                     self.settings["use_gpu"] = False
@@ -640,51 +3088,92 @@ class AudioTranscriber(ctk.CTk):
                     self.update()
                     time.sleep(2)
                 
+                # Авто: модель, тип вычислений и число потоков под ресурсы компьютера
+                main_model, main_options, choice = self.resolve_main_model(cuda_available)
+                auto_note = ""
+                if choice:
+                    metrics.info["auto_selection"] = choice
+                    auto_note = f" Модель: {main_model} (авто)."
+                    self.status_label.configure(
+                        text=f"🤖 {choice['reason']}",
+                        text_color=self.colors["text_primary"]
+                    )
+                    self.update()
+
+                # Раздельные каналы: каждый канал - отдельный говорящий (без каскада и черновика)
+                cascade = {**CASCADE_DEFAULTS, **self.settings.get("cascade", {})}
+                preview = {**PREVIEW_DEFAULTS, **self.settings.get("preview", {})}
+                channel_count = 1
+                if self.settings.get("split_channels", False):
+                    channel_count = get_channel_count(self.selected_file)
+                if channel_count > 1:
+                    cascade["enabled"] = preview["enabled"] = False
+                    main_options = self.get_channel_options(main_model, main_options, channel_count)
+                    metrics.info["channels"] = channel_count
+                # В журнал пишется модель, которая фактически работала (см. ниже),
+                # запрошенная хранится в настройках задачи
+                job["model"] = main_model
+                job["settings"] = {
+                    "requested_model": main_model,
+                    "device": "cuda" if self.settings.get("use_gpu", False) and cuda_available else "cpu",
+                    "model_options": main_options,
+                    "language": self.settings.get("language", "auto"),
+                    "cascade": cascade["fast_model"] if cascade["enabled"] else None,
+                    "split_channels": channel_count > 1,
+                    "preprocess": self.get_preprocess_options(),
+                    "loop_guard": {**LOOP_GUARD_DEFAULTS, **self.settings.get("loop_guard", {})}
+                }
+
+                # В режиме каскада сначала работает быстрая модель
+                model_name = cascade["fast_model"] if cascade["enabled"] else main_model
+
                 # Загрузка модели
-                if not self.model:
-                    device = "cuda" if self.settings.get("use_gpu", False) and cuda_available else "cpu"
-                    model_name = self.settings["model"]
-                    
-                    # Проверяем наличие модели
-                    if not self.check_model_installed(model_name):
-                        self.status_label.configure(
-                            text="⬇️ Скачивание модели...",
-                            text_color=self.colors["text_primary"]
-                        )
-                        self.progress_bar.set(0.1)
-                        self.update()
-                    
-                    try:
-                        self.model = WhisperModel(
-                            model_name,
-                            device=device,
-                            compute_type="float16" if device == "cuda" else "int8",
-                            download_root=self.models_dir,
-                            local_files_only=False
+                with metrics.stage("model_load"):
+                    if cascade["enabled"]:
+                        self.model = self.get_model(model_name, cuda_available)
+                    else:
+                        self.model = self.get_model(model_name, cuda_available, **main_options)
+                metrics.info["model"] = model_name
+                
+                # Декодирование и ресэмплинг аудио
+                with metrics.stage("audio_decode"):
+                    if channel_count > 1:
+                        channel_audio = decode_channels(
+                            self.selected_file,
+                            self.model.feature_extractor.sampling_rate
                         )
-                        self.progress_bar.set(0.3)
-                        self.update()
-                    except Exception as e:
-                        if "not found" in str(e).lower():
-                            # Модель не найдена, пробуем скачать
-                            self.status_label.configure(
-                                text="⬇️ Скачивание модели...",
-                                text_color=self.colors["text_primary"]
-                            )
-                            self.progress_bar.set(0.1)
-                            self.update()
-                            
-                            self.model = WhisperModel(
-                                model_name,
-                                device=device,
-                                compute_type="float16" if device == "cuda" else "int8",
-                                download_root=self.models_dir,
-                                local_files_only=False
+                        audio = channel_audio.mean(axis=0)
+                    else:
+                        # Повторный запуск того же файла берёт аудио из кэша
+                        cache = self.get_feature_cache()
+                        audio_name = f"audio_{self.model.feature_extractor.sampling_rate}"
+                        audio = None
+                        if cache:
+                            source_key = cache.file_key(self.selected_file)
+                            audio = cache.load(source_key, audio_name)
+                            metrics.info["audio_cache"] = "hit" if audio is not None else "miss"
+                        if audio is None:
+                            audio = load_audio(
+                                self.selected_file,
+                                self.model.feature_extractor.sampling_rate
                             )
-                            self.progress_bar.set(0.3)
-                            self.update()
+                            if cache:
+                                cache.save(source_key, audio_name, audio)
+
+                # Признаки кэшируются для аудио после предобработки с этими параметрами
+                features_cache = None
+                if channel_count == 1 and self.get_feature_cache():
+                    features_cache = (self.get_feature_cache(),
+                                      f"{source_key}_{json.dumps(self.get_preprocess_options(), sort_keys=True)}")
+
+                # Предобработка: фильтр гула и выравнивание громкости
+                if self.get_preprocess_options():
+                    with metrics.stage("preprocess"):
+                        if channel_count > 1:
+                            for channel in channel_audio:
+                                self.preprocess(channel, self.model.feature_extractor.sampling_rate)
                         else:
-                            raise e
+                            audio = self.preprocess(audio, self.model.feature_extractor.sampling_rate)
                 
                 # Сброс времени распознавания
                 self.transcription_start_time = time.time()
@@ -695,30 +3184,147 @@ class AudioTranscriber(ctk.CTk):
                 )
                 self.update()
 
-                # Распознавание
-                segments, info = self.model.transcribe(
-                    self.selected_file,
-                    beam_size=5
-                )
+                # Фиксированный или запомненный язык избавляет от прохода определения языка
+                language = self.get_job_language(self.selected_file, main_model)
+                metrics.info["language_detected"] = language is None
+                self.transcript_view.clear()
+
+                # Черновик: быстрая модель на том же декодированном аудио
+                if preview["enabled"]:
+                    with metrics.stage("model_load"):
+                        preview_model = self.get_model(preview["model"], cuda_available)
+                    with metrics.stage("preview"), self.cached_features(features_cache, preview_model, audio, {}):
+                        preview_segments, preview_info = preview_model.transcribe(
+                            audio,
+                            beam_size=1,
+                            language=language
+                        )
+                        for segment in preview_segments:
+                            if "time_to_first_preview_s" not in metrics.info:
+                                metrics.info["time_to_first_preview_s"] = round(time.perf_counter() - metrics.started, 4)
+                            self.transcript_view.add_preview(to_transcript_segment(segment))
+                    # Язык, определённый черновиком, экономит определение в точном проходе
+                    if language is None:
+                        language = preview_info.language
+                        self.remember_language(self.selected_file, preview_info)
+                    self.status_label.configure(
+                        text="🎯 Черновик готов, идёт точное распознавание...",
+                        text_color=self.colors["text_primary"]
+                    )
+                    self.update()
+
+                # Оборванные зацикливания (тишина, музыка, повторы фразы)
+                suppressed = []
+                if channel_count > 1:
+                    # Каналы распознаются параллельно и сливаются по времени
+                    with metrics.stage("decode"):
+                        segments, info = self.transcribe_channels(channel_audio, language, suppressed)
+                    metrics.info["language"] = info.language
+                    if language is None:
+                        self.remember_language(self.selected_file, info)
+                    metrics.info["audio_duration_s"] = info.duration
+                else:
+                    # Извлечение признаков (и определение языка, если он не задан)
+                    with metrics.stage("feature_extraction"), \
+                            self.cached_features(features_cache, self.model, audio, metrics.info):
+                        segments_generator, info = self.model.transcribe(
+                            audio,
+                            beam_size=5,
+                            language=language
+                        )
+                    metrics.info["language"] = info.language
+                    if language is None:
+                        self.remember_language(self.selected_file, info)
+                    metrics.info["audio_duration_s"] = info.duration
+
+                    # Распознавание (итоговые сегменты заменяют черновые по мере готовности)
+                    with metrics.stage("decode"):
+                        segments = []
+                        for segment in metrics.track_segments(
+                                self.guard_segments(segments_generator, audio, info.language, suppressed)):
+                            segments.append(segment)
+                            self.transcript_view.add_final(segment)
+
+                loop_note = ""
+                if suppressed:
+                    metrics.info["suppressed_loops"] = suppressed
+                    skipped = sum(item["end"] - item["start"] for item in suppressed)
+                    loop_note = f" Пропущено зацикливаний: {len(suppressed)} ({skipped:.0f} сек)."
+
+                # Каскад: неуверенные фрагменты перераспознаются выбранной моделью
+                cascade_note = ""
+                if cascade["enabled"]:
+                    ranges = find_low_confidence_ranges(segments, cascade)
+                    escalated = sum(end - start for start, end in ranges)
+                    if ranges:
+                        self.status_label.configure(
+                            text=f"🎯 Уточнение {len(ranges)} фрагментов точной моделью...",
+                            text_color=self.colors["text_primary"]
+                        )
+                        self.update()
+                        with metrics.stage("model_load"):
+                            accurate_model = self.get_model(main_model, cuda_available, **main_options)
+                        with metrics.stage("cascade_redecode"):
+                            segments = redecode_ranges(
+                                segments, ranges, accurate_model, audio,
+                                self.model.feature_extractor.sampling_rate,
+                                on_refined=self.transcript_view.replace_range,
+                                beam_size=5,
+                                language=info.language
+                            )
+                    fraction = escalated / info.duration if info.duration else 0
+                    metrics.info["cascade"] = {
+                        "fast_model": model_name,
+                        "accurate_model": main_model,
+                        "ranges": len(ranges),
+                        "escalated_s": round(escalated, 3),
+                        "escalated_fraction": round(fraction, 4)
+                    }
+                    cascade_note = f" Уточнено точной моделью: {fraction:.0%} аудио."
+
+                # Модели, заменённые меньшими из-за нехватки памяти
+                substitutions = {name: self.model_substitutions[name]
+                                 for name in (model_name, main_model, preview["model"] if preview["enabled"] else None)
+                                 if name in self.model_substitutions}
+                if substitutions:
+                    metrics.info["model_substitutions"] = substitutions
+                    cascade_note += " Мало памяти, использованы меньшие модели: " + ", ".join(
+                        f"{name} → {smaller}" for name, smaller in substitutions.items()) + "."
+
+                # Модель, которая фактически дала текст: в каскаде без уточнений - быстрая,
+                # с уточнениями - метка "быстрая+точная", не совпадающая ни с одной из них
+                result_model = substitutions.get(model_name, model_name)
+                if cascade["enabled"] and ranges:
+                    result_model += "+" + substitutions.get(main_model, main_model)
+                metrics.info["model"] = result_model
+                job["model"] = result_model
                 
                 # Сохранение результата
                 self.progress_bar.set(0.9)
                 self.update()
                 
-                base_name = os.path.splitext(os.path.basename(self.selected_file))[0]
-                output_file = os.path.join(self.settings["save_path"], f"{base_name}_trsc.txt")
-                os.makedirs(os.path.dirname(output_file), exist_ok=True)
-                
-                with open(output_file, "w", encoding="utf-8") as f:
-                    for segment in segments:
-                        f.write(segment.text + "\n")
+                with metrics.stage("output_write"):
+                    base_name = os.path.splitext(os.path.basename(self.selected_file))[0]
+                    output_file = os.path.join(self.settings["save_path"], f"{base_name}_trsc.txt")
+                    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                    
+                    with open(output_file, "w", encoding="utf-8") as f:
+                        for segment in segments:
+                            f.write((format_segment_line(segment) if segment.speaker else segment.text) + "\n")
+
+                job["output"] = output_file
+
+                with metrics.stage("index"):
+                    self.index_transcript(self.selected_file, output_file, segments,
+                                          result_model, info.language, info.duration)
 
                 # Удаление записанного файла, если это была запись
-                if self.is_recorded_file and os.path.exists(self.selected_file):
-                    try:
-                        os.remove(self.selected_file)
-                    except Exception:
-                        pass  # Игнорируем ошибки при удалении
+                with metrics.stage("cleanup"):
+                    if self.is_recorded_file and os.path.exists(self.selected_file):
+                        try:
+                            os.remove(self.selected_file)
+                        except Exception:
+                            pass  # Игнорируем ошибки при удалении
 
                 # Вычисление времени обработки
                 end_time = time.time()
@@ -737,11 +3343,12 @@ class AudioTranscriber(ctk.CTk):
                 # Завершение
                 self.progress_bar.set(1.0)
                 self.status_label.configure(
-                    text=f"✅ Готово за {time_str}! Результат сохранён в {output_file}",
+                    text=f"✅ Готово за {time_str}! Результат сохранён в {output_file}.{auto_note}{loop_note}{cascade_note}",
                     text_color=self.colors["success"]
                 )
 
             except Exception as e:
+                metrics.info["error"] = str(e)
                 self.status_label.configure(
                     text=f"❌ Ошибка: {str(e)}",
                     text_color=self.colors["error"]
@@ -749,13 +3356,501 @@ class AudioTranscriber(ctk.CTk):
                 self.progress_bar.set(0)
                 
             finally:
+                if profiler:
+                    profiler.disable()
+                    profiler.dump_stats(os.path.join(self.logs_dir, f"{metrics.job_id}.prof"))
+                try:
+                    metrics.write(os.path.join(self.logs_dir, "metrics.jsonl"))
+                except Exception as e:
+                    print(f"Ошибка записи метрик: {str(e)}")
+                self.record_job("transcribe", metrics, **job)
+                self.models_last_used = time.time()
                 self.is_transcribing = False
+                self.after(0, self.run_pending_unload)
                 self.enable_interface()
 
-        # Запускаем в отдельном потоке
-        thread = threading.Thread(target=transcribe)
+        # Запускаем в отдельном потоке (имя потока видно в py-spy dump)
+        thread = threading.Thread(target=transcribe, name=f"transcribe-{metrics.job_id}")
+        thread.start()
+
+    def get_model(self, model_name, cuda_available, compute_type=None, cpu_threads=None, num_workers=None,
+                  progress=None):
+        """Загруженная модель по имени; загружается при первом обращении
+
+        progress(доля, текст) - вывод хода загрузки для вызовов из фоновых
+        потоков, которым нельзя обращаться к окну напрямую.
+        """
+        device = "cuda" if self.settings.get("use_gpu", False) and cuda_available else "cpu"
+        compute_type = compute_type or ("float16" if device == "cuda" else "int8")
+        if cpu_threads is None:
+            cpu_threads = self.get_cpu_threads(model_name)
+        if num_workers is None:
+            num_workers = self.get_setting("num_workers", 1)
+        self.models_last_used = time.time()
+        key = (model_name, compute_type, cpu_threads, num_workers)
+        if key in self.loaded_models:
+            return self.loaded_models[key]
+
+        from faster_whisper import WhisperModel
+
+        # Не хватает памяти: выгружаем неиспользуемые модели, затем берём модель поменьше
+        entry = get_model_entry(model_name) or {}
+        required_mb = estimate_model_memory(entry, device, compute_type)
+        min_free_mb = self.settings.get("min_free_memory_mb", MIN_FREE_MEMORY_MB)
+        free_mb = get_free_memory_mb(device)
+        if required_mb is not None and free_mb is not None and free_mb - required_mb < min_free_mb:
+            self.unload_models(keep=self.model)
+            free_mb = get_free_memory_mb(device) or free_mb
+            if free_mb - required_mb < min_free_mb:
+                smaller = find_smaller_model(self.available_models, model_name, device,
+                                             compute_type, free_mb - min_free_mb)
+                if smaller:
+                    print(f"Мало памяти ({free_mb} МБ): вместо {model_name} загружается {smaller}")
+                    self.model_substitutions[model_name] = smaller
+                    model = self.get_model(smaller, cuda_available, compute_type, cpu_threads, num_workers,
+                                           progress=progress)
+                    self.loaded_models[key] = model
+                    return model
+
+        refresh = self.model_refresh_requested == model_name
+        model_path = self.resolve_model(model_name, refresh=refresh, progress=progress)
+        
+        model = WhisperModel(
+            model_path,
+            device=device,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            num_workers=num_workers
+        )
+        if refresh:
+            self.model_refresh_requested = None
+        self.loaded_models[key] = model
+        self.show_progress(0.3, progress=progress)
+        return model
+
+    def show_progress(self, fraction=None, text=None, progress=None):
+        """Ход загрузки модели: в окно напрямую или через progress(доля, текст)"""
+        if progress is not None:
+            progress(fraction, text)
+            return
+        if text is not None:
+            self.status_label.configure(text=text, text_color=self.colors["text_primary"])
+        if fraction is not None:
+            self.progress_bar.set(fraction)
+        self.update()
+
+    def get_setting(self, key, default=None):
+        """Значение настройки с учётом параметров командной строки"""
+        if key in self.overrides:
+            return self.overrides[key]
+        return self.settings.get(key, default)
+
+    def get_cpu_threads(self, model_name):
+        """Потоки CPU для модели: из настроек, из замера benchmark.py sweep или 0 (по умолчанию)"""
+        configured = self.get_setting("cpu_threads", 0)
+        if configured:
+            return configured
+        measured = (get_model_entry(model_name) or {}).get("measured", {}).get("cpu", {})
+        return measured.get("cpu_threads", 0)
+
+    def apply_cpu_affinity(self):
+        """Привязка к ядрам из настроек или командной строки"""
+        affinity = self.get_setting("cpu_affinity", "")
+        if not affinity:
+            return
+        try:
+            set_cpu_affinity(parse_cpu_list(affinity))
+        except (OSError, ValueError) as e:
+            print(f"Ошибка привязки к ядрам {affinity}: {str(e)}")
+
+    def resolve_main_model(self, cuda_available):
+        """Основная модель и параметры её загрузки (с учётом режима «Авто»)"""
+        if self.settings["model"] != AUTO_MODEL:
+            return self.settings["model"], {}, None
+        choice = self.get_auto_choice(cuda_available)
+        options = {"compute_type": choice["compute_type"], "cpu_threads": choice["cpu_threads"]}
+        return choice["model"], options, choice
+
+    def get_feature_cache(self):
+        """Кэш аудио и признаков или None, если он выключен"""
+        options = {**FEATURE_CACHE_DEFAULTS, **self.settings.get("feature_cache", {})}
+        if not options["enabled"]:
+            return None
+        if self.feature_cache is None or self.feature_cache.max_size != options["max_size_mb"] * 1024 * 1024:
+            self.feature_cache = FeatureCache(self.cache_dir, options["max_size_mb"])
+        return self.feature_cache
+
+    def cached_features(self, features_cache, model, audio, stats):
+        """Контекст model.transcribe с признаками из кэша (или пустой, если кэш выключен)"""
+        if features_cache is None:
+            return nullcontext()
+        cache, key = features_cache
+        import hashlib
+        return cache.features(model, audio, hashlib.blake2b(key.encode(), digest_size=16).hexdigest(), stats)
+
+    def get_preprocess_options(self):
+        """Параметры предобработки или None, если она выключена"""
+        preprocess = {**PREPROCESS_DEFAULTS, **self.settings.get("preprocess", {})}
+        if not preprocess.pop("enabled"):
+            return None
+        return preprocess
+
+    def preprocess(self, audio, sample_rate):
+        """Предобработка аудио по настройкам (без изменений, если выключена)"""
+        options = self.get_preprocess_options()
+        if options is None:
+            return audio
+        return preprocess_audio(audio, sample_rate, **options)
+
+    def get_channel_options(self, model_name, options, channel_count):
+        """Параметры модели для параллельного распознавания каналов
+
+        Каждому каналу - свой рабочий CTranslate2, а потоки CPU делятся
+        между рабочими, чтобы не перегружать ядра.
+        """
+        workers = max(self.get_setting("num_workers", 1), channel_count)
+        cpu_threads = options.get("cpu_threads") or self.get_cpu_threads(model_name) or get_system_resources()["cpu_threads"]
+        return {**options, "num_workers": workers, "cpu_threads": max(1, cpu_threads // workers)}
+
+    def record_job(self, kind, metrics, source=None, source_info=None, model=None, settings=None, output=None):
+        """Записать задачу в журнал (ошибка журнала не срывает задачу)"""
+        try:
+            if source_info is None and source and os.path.exists(source):
+                source_info = file_fingerprint(source)
+            JobLedger(self.index_file).record(kind, metrics, source, source_info, model, settings, output)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Ошибка записи журнала задач: {str(e)}")
+
+    def index_transcript(self, source, output_file, segments, model_name, language, duration_s):
+        """Добавить расшифровку в поисковый индекс (ошибка индекса не срывает задачу)"""
+        try:
+            TranscriptIndex(self.index_file).add(source, output_file, segments, model_name, language, duration_s)
+        except sqlite3.Error as e:
+            print(f"Ошибка индексации расшифровки: {str(e)}")
+
+    def guard_segments(self, segments_generator, audio, language, suppressed):
+        """Сегменты self.model.transcribe(audio) с обрывом зацикливаний (если включено)"""
+        options = {**LOOP_GUARD_DEFAULTS, **self.settings.get("loop_guard", {})}
+        if not options["enabled"]:
+            return (to_transcript_segment(segment) for segment in segments_generator)
+        return guard_segments(
+            segments_generator, self.model, audio, self.model.feature_extractor.sampling_rate,
+            options, suppressed, beam_size=5, language=language
+        )
+
+    def transcribe_channels(self, channel_audio, language, suppressed):
+        """Параллельное распознавание каналов; сегменты помечаются говорящим
+
+        Возвращает сегменты всех каналов, упорядоченные по времени, и
+        сведения о распознавании первого канала. Оборванные зацикливания
+        дописываются в suppressed с именем говорящего.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        labels = self.settings.get("channel_labels", [])
+
+        def transcribe_channel(index):
+            speaker = labels[index] if index < len(labels) else f"Спикер {index + 1}"
+            segments_generator, info = self.model.transcribe(
+                channel_audio[index],
+                beam_size=5,
+                language=language
+            )
+            segments = []
+            channel_suppressed = []
+            for segment in self.guard_segments(segments_generator, channel_audio[index],
+                                               info.language, channel_suppressed):
+                segment = segment._replace(speaker=speaker)
+                segments.append(segment)
+                self.transcript_view.add_final(segment)
+            suppressed.extend({**item, "speaker": speaker} for item in channel_suppressed)
+            return segments, info
+
+        with ThreadPoolExecutor(max_workers=len(channel_audio), thread_name_prefix="channel") as pool:
+            results = list(pool.map(transcribe_channel, range(len(channel_audio))))
+
+        segments = sorted((segment for channel_segments, _ in results for segment in channel_segments),
+                          key=lambda segment: segment.start)
+        return segments, results[0][1]
+
+    def start_dictation(self):
+        """Распознавание фраз по ходу записи в фоновом потоке
+
+        Блоки записи передаются через очередь; фразы, отрезанные по паузам,
+        сразу распознаются загруженной моделью и дописываются в текст.
+        После остановки остаётся распознать только последнюю фразу.
+        """
+        dictation = {**DICTATION_DEFAULTS, **self.settings.get("dictation", {})}
+        sample_rate = self.settings["recording"]["sample_rate"]
+        segmenter = UtteranceSegmenter(
+            sample_rate,
+            silence_threshold=dictation["silence_threshold"],
+            min_silence_s=dictation["min_silence_s"],
+            min_utterance_s=dictation["min_utterance_s"],
+            max_utterance_s=dictation["max_utterance_s"]
+        )
+        dictation_queue = queue.Queue()
+        recording_file = self.recording_file
+        metrics = JobMetrics("dictation")
+        self.dictation_queue = dictation_queue
+        self.is_transcribing = True
+        self.transcript_view.clear()
+
+        def set_status(text, color):
+            self.after(0, lambda: self.status_label.configure(text=text, text_color=color))
+
+        def dictate():
+            segments = []
+            utterances = 0
+            job = {"source": recording_file}
+            try:
+                cuda_available = probe_devices()["cuda_devices"] > 0
+                model_name, options, choice = self.resolve_main_model(cuda_available)
+                if choice:
+                    metrics.info["auto_selection"] = choice
+                with metrics.stage("model_load"):
+                    # Окно живо (идёт запись), поэтому ход загрузки - только через self.after
+                    model = self.get_model(
+                        model_name, cuda_available, **options,
+                        progress=lambda fraction, text: text and set_status(
+                            f"🎙️ Диктовка: {text}", self.colors["text_primary"])
+                    )
+                metrics.info["model"] = model_name
+                model_rate = model.feature_extractor.sampling_rate
+                language = self.get_job_language(recording_file, model_name)
+                job["model"] = self.model_substitutions.get(model_name, model_name)
+                job["settings"] = {
+                    "requested_model": model_name,
+                    "device": "cuda" if self.settings.get("use_gpu", False) and cuda_available else "cpu",
+                    "model_options": options,
+                    "language": self.settings.get("language", "auto"),
+                    "preprocess": self.get_preprocess_options(),
+                    "dictation": dictation
+                }
+                set_status("🎙️ Диктовка: модель загружена, фразы распознаются по ходу записи",
+                           self.colors["text_primary"])
+
+                from scipy.signal import resample_poly
+
+                stop_time = None
+                while stop_time is None:
+                    block = dictation_queue.get()
+                    if block is None:
+                        stop_time = time.perf_counter()
+                        found = segmenter.flush()
+                    else:
+                        found = segmenter.feed(block.mean(axis=1) if block.ndim > 1 else block)
+                    for start, audio in found:
+                        audio = self.preprocess(resample_poly(audio, model_rate, sample_rate).astype(np.float32),
+                                                model_rate)
+                        with metrics.stage("decode"):
+                            segments_generator, info = model.transcribe(audio, beam_size=5, language=language)
+                            for segment in metrics.track_segments(segments_generator):
+                                segment = to_transcript_segment(segment, offset=start)
+                                segments.append(segment)
+                                self.transcript_view.add_final(segment)
+                        if language is None:
+                            language = info.language
+                            self.remember_language(recording_file, info)
+                        utterances += 1
+                        metrics.info["dictated_audio_s"] = round(
+                            metrics.info.get("dictated_audio_s", 0) + len(audio) / model_rate, 3)
+                        if stop_time is None:
+                            set_status(f"🎙️ Диктовка: распознано фраз - {utterances}",
+                                       self.colors["text_primary"])
+
+                with metrics.stage("output_write"):
+                    base_name = os.path.splitext(os.path.basename(recording_file))[0]
+                    output_file = os.path.join(self.settings["save_path"], f"{base_name}_trsc.txt")
+                    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                    with open(output_file, "w", encoding="utf-8") as f:
+                        for segment in segments:
+                            f.write(segment.text + "\n")
+
+                job["output"] = output_file
+
+                with metrics.stage("index"):
+                    self.index_transcript(recording_file, output_file, segments, job["model"], language,
+                                          metrics.info.get("dictated_audio_s"))
+
+                # Время от остановки записи до готового текста
+                latency = time.perf_counter() - stop_time
+                metrics.info["language"] = language
+                metrics.info["utterances"] = utterances
+                metrics.info["finalize_latency_s"] = round(latency, 3)
+                set_status(f"✅ Диктовка: текст готов через {latency:.1f} сек после остановки. "
+                           f"Результат сохранён в {output_file}.", self.colors["success"])
+            except Exception as e:
+                metrics.info["error"] = str(e)
+                set_status(f"❌ Ошибка диктовки: {str(e)}", self.colors["error"])
+            finally:
+                self.dictation_queue = None
+                try:
+                    metrics.write(os.path.join(self.logs_dir, "metrics.jsonl"))
+                except Exception as e:
+                    print(f"Ошибка записи метрик: {str(e)}")
+                self.record_job("dictation", metrics, **job)
+                self.models_last_used = time.time()
+                self.is_transcribing = False
+                self.after(0, self.run_pending_unload)
+
+        thread = threading.Thread(target=dictate, name=f"dictation-{metrics.job_id}")
         thread.start()
 
+    def get_auto_choice(self, cuda_available):
+        """Автоматический выбор модели для текущих настроек"""
+        device = "cuda" if self.settings.get("use_gpu", False) and cuda_available else "cpu"
+        resources = get_system_resources()
+        configured_threads = self.get_setting("cpu_threads", 0)
+        if configured_threads:
+            resources["cpu_threads"] = configured_threads
+        choice = choose_auto_model(
+            self.available_models,
+            resources,
+            device,
+            target_rtf=self.settings.get("target_rtf", AUTO_TARGET_RTF),
+            language=self.settings.get("language", "auto")
+        )
+        # Лучшее число потоков из benchmark.py sweep, если пользователь его не задал
+        if not configured_threads:
+            measured = (get_model_entry(choice["model"]) or {}).get("measured", {}).get("cpu", {})
+            choice["cpu_threads"] = measured.get("cpu_threads", choice["cpu_threads"])
+        return choice
+
+    def unload_models(self, keep=None):
+        """Выгрузка загруженных моделей (кроме keep) с освобождением памяти"""
+        import gc
+
+        for key, model in list(self.loaded_models.items()):
+            if model is keep:
+                continue
+            del self.loaded_models[key]
+            self.model_substitutions.pop(key[0], None)
+            if model not in self.loaded_models.values():
+                release_model(model)
+        if self.model is not keep:
+            self.model = None
+        gc.collect()
+
+    def request_unload_models(self):
+        """Выгрузка моделей после смены настроек; во время задачи - по её окончании
+
+        Работающая задача продолжает пользоваться своей моделью: освобождение
+        весов посреди распознавания оборвало бы его ошибкой.
+        """
+        if self.is_transcribing:
+            self.unload_pending = True
+        else:
+            self.unload_models()
+
+    def run_pending_unload(self):
+        """Отложенная выгрузка моделей (вызывается в главном потоке после задачи)"""
+        if self.unload_pending and not self.is_transcribing:
+            self.unload_pending = False
+            self.unload_models()
+
+    def watch_models(self):
+        """Проверка по таймеру: выгрузка моделей при простое и нехватке ОЗУ
+
+        Во время распознавания модели не трогаются; выгруженные модели
+        загружаются заново при следующем запуске.
+        """
+        try:
+            if self.loaded_models and not self.is_transcribing:
+                idle_minutes = self.settings.get("idle_unload_minutes", IDLE_UNLOAD_MINUTES)
+                memory = get_memory_info()
+                min_free_mb = self.settings.get("min_free_memory_mb", MIN_FREE_MEMORY_MB)
+                if idle_minutes and time.time() - self.models_last_used > idle_minutes * 60:
+                    self.unload_models()
+                    print(f"Модели выгружены после {idle_minutes} мин простоя")
+                elif memory and memory["available_mb"] < min_free_mb:
+                    self.unload_models()
+                    self.status_label.configure(
+                        text=f"⚠️ Мало памяти ({memory['available_mb']} МБ): модели выгружены "
+                             f"и загрузятся при следующем запуске",
+                        text_color=self.colors["error"]
+                    )
+        finally:
+            self.after(MODEL_WATCH_INTERVAL_MS, self.watch_models)
+
+    def resolve_model(self, model_name, refresh=False, progress=None):
+        """Путь к локальному снимку модели; сеть - только если его нет
+
+        Проверенный снимок из models_dir загружается напрямую, без обращения
+        к Hugging Face Hub. Скачивание выполняется, если снимка нет или
+        пользователь явно запросил обновление модели.
+        """
+        if not refresh:
+            model_path = find_model_snapshot(self.models_dir, model_name)
+            if model_path:
+                return model_path
+
+        repo_id = get_model_repo(model_name)
+        if repo_id is None:
+            raise RuntimeError(f"Модель {model_name} не найдена по пути из каталога")
+
+        self.show_progress(0, "⬇️ Скачивание модели...", progress)
+
+        last_update = [0.0]
+
+        def on_progress(downloaded, total):
+            # Не чаще пяти обновлений интерфейса в секунду
+            now = time.monotonic()
+            if now - last_update[0] < 0.2 and downloaded < total:
+                return
+            last_update[0] = now
+            fraction = downloaded / total if total else 0
+            text = (f"⬇️ Скачивание модели... {fraction:.0%} "
+                    f"({downloaded / 1024 ** 3:.2f} из {total / 1024 ** 3:.2f} ГБ)")
+            if progress is not None:
+                progress(0.3 * fraction, text)
+                return
+            self.after(0, lambda: (
+                self.progress_bar.set(0.3 * fraction),
+                self.status_label.configure(text=text)
+            ))
+
+        downloader = ModelDownloader(self.models_dir, progress_callback=on_progress)
+        return downloader.download(repo_id)
+
+    def load_language_memory(self):
+        """Запомненные языки по папкам источников"""
+        try:
+            with open(self.language_memory_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get_job_language(self, file_path, model_name):
+        """Язык для задачи: из настроек, из памяти папки или None (определять)"""
+        # Модели *.en распознают только английский
+        if (get_model_entry(model_name) or {}).get("english_only"):
+            return "en"
+        language = self.settings.get("language", "auto")
+        if language != "auto":
+            return language
+        if not self.settings.get("remember_language", True):
+            return None
+        folder = os.path.dirname(os.path.abspath(file_path))
+        return self.load_language_memory().get(folder, {}).get("language")
+
+    def remember_language(self, file_path, info):
+        """Запомнить уверенно определённый язык для папки источника"""
+        if not self.settings.get("remember_language", True):
+            return
+        if info.language_probability < LANGUAGE_MEMORY_MIN_PROBABILITY:
+            return
+        memory = self.load_language_memory()
+        memory[os.path.dirname(os.path.abspath(file_path))] = {
+            "language": info.language,
+            "probability": round(info.language_probability, 3)
+        }
+        try:
+            with open(self.language_memory_file, "w", encoding="utf-8") as f:
+                json.dump(memory, f, indent=4, ensure_ascii=False)
+        except OSError as e:
+            print(f"Ошибка сохранения языка: {str(e)}")
+
     def get_audio_info(self, file_path):
         """Получение информации об аудиофайле"""
         try:
@@ -769,24 +3864,54 @@ class AudioTranscriber(ctk.CTk):
             
             # Получение длительности и других параметров
             if ext == ".mp3":
+                from mutagen.mp3 import MP3
                 audio = MP3(file_path)
                 info["duration"] = f"{int(audio.info.length // 60)}:{int(audio.info.length % 60):02d}"
                 info["bitrate"] = f"{audio.info.bitrate // 1000} кбит/с"
                 info["sample_rate"] = f"{audio.info.sample_rate // 1000} кГц"
             elif ext == ".wav":
-                with wave.open(file_path, "rb") as wav:
-                    frames = wav.getnframes()
-                    rate = wav.getframerate()
-                    duration = frames / float(rate)
+                # Только заголовок: данные большого файла не читаются
+                header = read_wav_header(file_path)
+                if header is not None:
+                    duration = header["frames"] / float(header["sample_rate"])
                     info["duration"] = f"{int(duration // 60)}:{int(duration % 60):02d}"
-                    info["channels"] = wav.getnchannels()
-                    info["sample_rate"] = f"{rate // 1000} кГц"
-                    info["bit_depth"] = f"{wav.getsampwidth() * 8} бит"
+                    info["channels"] = header["channels"]
+                    info["sample_rate"] = f"{header['sample_rate'] // 1000} кГц"
+                    info["bit_depth"] = f"{header['bits']} бит" + (" float" if header["format"] == WAV_FORMAT_FLOAT else "")
+                else:
+                    # Форматы, которые не читаются напрямую (8 бит, ADPCM и т.п.)
+                    info.update(self.get_wav_info_fallback(file_path))
             
             return info
         except:
             return {"error": "Не удалось получить информацию о файле"}
 
+    def get_wav_info_fallback(self, file_path):
+        """Параметры WAV через модуль wave (PCM любой разрядности) или PyAV (сжатые форматы)"""
+        info = {}
+        try:
+            with wave.open(file_path, "rb") as wav:
+                frames = wav.getnframes()
+                rate = wav.getframerate()
+                duration = frames / float(rate)
+                info["channels"] = wav.getnchannels()
+                info["bit_depth"] = f"{wav.getsampwidth() * 8} бит"
+        except (wave.Error, EOFError):
+            import av
+
+            with av.open(file_path, metadata_errors="ignore") as container:
+                stream = container.streams.audio[0]
+                rate = stream.rate
+                if stream.duration is not None:
+                    duration = float(stream.duration * stream.time_base)
+                else:
+                    duration = container.duration / av.time_base
+                info["channels"] = stream.channels
+                info["codec"] = stream.codec_context.name
+        info["duration"] = f"{int(duration // 60)}:{int(duration % 60):02d}"
+        info["sample_rate"] = f"{rate // 1000} кГц"
+        return info
+
     def show_settings(self):
         """Показать окно настроек"""
         settings_window = ctk.CTkToplevel(self)
@@ -848,14 +3973,68 @@ class AudioTranscriber(ctk.CTk):
             fg_color=self.colors["accent"],
             hover_color=self.colors["accent_hover"]
         )
-        info_button.pack(side="right")
+        info_button.pack(side="right")
+
+        def refresh_model():
+            if selected_model.get() == AUTO_MODEL_LABEL:
+                return
+            self.model_refresh_requested = self.available_models[selected_model.get()]["name"]
+            self.request_unload_models()
+            refresh_button.configure(text="✅ ОБНОВИТСЯ ПРИ ЗАПУСКЕ", state="disabled")
+
+        refresh_button = ctk.CTkButton(
+            model_header,
+            text="🔄 ОБНОВИТЬ МОДЕЛЬ",
+            command=refresh_model,
+            width=180,
+            height=25,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["secondary_hover"],
+            hover_color=self.colors["accent"]
+        )
+        refresh_button.pack(side="right", padx=(0, 10))
 
         # Проверяем установленные модели
         for model_info in self.available_models.values():
             model_info["installed"] = self.check_model_installed(model_info["name"])
         
-        selected_model = ctk.StringVar(value=[k for k, v in self.available_models.items() 
-                                            if v["name"] == self.settings["model"]][0])
+        selected_model = ctk.StringVar(value=next((k for k, v in self.available_models.items() 
+                                                  if v["name"] == self.settings["model"]),
+                                                 next(iter(self.available_models))))
+        if self.settings["model"] == AUTO_MODEL:
+            selected_model.set(AUTO_MODEL_LABEL)
+
+        # Авто: выбор по свободной памяти, числу ядер и замерам benchmark.py
+        auto_row = ctk.CTkFrame(
+            model_frame,
+            fg_color="transparent"
+        )
+        auto_row.pack(fill="x", padx=15, pady=5)
+
+        auto_radio = ctk.CTkRadioButton(
+            auto_row,
+            text=AUTO_MODEL_LABEL,
+            variable=selected_model,
+            value=AUTO_MODEL_LABEL,
+            font=ctk.CTkFont(size=14),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        auto_radio.pack(side="left")
+
+        try:
+            auto_choice = self.get_auto_choice(probe_devices()["cuda_devices"] > 0)["reason"]
+        except Exception as e:
+            auto_choice = f"Не удалось оценить ресурсы: {str(e)}"
+        auto_hint = ctk.CTkLabel(
+            model_frame,
+            text=f"Сейчас будет выбрано: {auto_choice}",
+            font=ctk.CTkFont(size=12),
+            text_color=self.colors["text_secondary"],
+            wraplength=500,
+            justify="left"
+        )
+        auto_hint.pack(fill="x", padx=40, pady=(0, 5))
         
         for name, info in self.available_models.items():
             model_row = ctk.CTkFrame(
@@ -884,6 +4063,76 @@ class AudioTranscriber(ctk.CTk):
             )
             status_label.pack(side="right")
 
+        # Каскад: быстрая модель + уточнение выбранной
+        cascade = {**CASCADE_DEFAULTS, **self.settings.get("cascade", {})}
+        cascade_row = ctk.CTkFrame(
+            model_frame,
+            fg_color="transparent"
+        )
+        cascade_row.pack(fill="x", padx=15, pady=(10, 5))
+
+        cascade_var = ctk.BooleanVar(value=cascade["enabled"])
+        cascade_checkbox = ctk.CTkCheckBox(
+            cascade_row,
+            text="Каскад: сначала быстрая модель, неуверенные фрагменты - выбранной",
+            variable=cascade_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        cascade_checkbox.pack(side="left")
+
+        fast_model_var = ctk.StringVar(value=next(
+            (k for k, v in self.available_models.items() if v["name"] == cascade["fast_model"]),
+            next(iter(self.available_models))
+        ))
+        fast_model_menu = ctk.CTkOptionMenu(
+            cascade_row,
+            values=list(self.available_models),
+            variable=fast_model_var,
+            width=200,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"]
+        )
+        fast_model_menu.pack(side="right")
+
+        # Черновик: быстрый проход перед точным
+        preview = {**PREVIEW_DEFAULTS, **self.settings.get("preview", {})}
+        preview_row = ctk.CTkFrame(
+            model_frame,
+            fg_color="transparent"
+        )
+        preview_row.pack(fill="x", padx=15, pady=(0, 15))
+
+        preview_var = ctk.BooleanVar(value=preview["enabled"])
+        preview_checkbox = ctk.CTkCheckBox(
+            preview_row,
+            text="Черновик: сразу показать быстрый результат, затем уточнить",
+            variable=preview_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        preview_checkbox.pack(side="left")
+
+        preview_model_var = ctk.StringVar(value=next(
+            (k for k, v in self.available_models.items() if v["name"] == preview["model"]),
+            next(iter(self.available_models))
+        ))
+        preview_model_menu = ctk.CTkOptionMenu(
+            preview_row,
+            values=list(self.available_models),
+            variable=preview_model_var,
+            width=200,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"]
+        )
+        preview_model_menu.pack(side="right")
+
         # 2. Выбор устройства
         device_frame = ctk.CTkFrame(
             settings_scroll,
@@ -903,15 +4152,9 @@ class AudioTranscriber(ctk.CTk):
         device_label.pack(anchor="w", padx=15, pady=10)
 
         # Проверка CUDA для настроек
-        cuda_available = False
-        gpu_name = "Неизвестно"
-        try:
-            import torch
-            if torch.cuda.is_available():
-                cuda_available = True
-                gpu_name = torch.cuda.get_device_name(0)
-        except Exception:
-            pass
+        devices = probe_devices()
+        cuda_available = devices["cuda_devices"] > 0
+        gpu_name = devices["gpu_names"][0] if devices["gpu_names"] else "Неизвестно"
 
         device_var = ctk.StringVar(value="gpu" if self.settings.get("use_gpu", False) else "cpu")
         
@@ -937,24 +4180,113 @@ class AudioTranscriber(ctk.CTk):
             state="normal" if cuda_available else "disabled"
         )
         gpu_radio.pack(anchor="w", padx=25, pady=5)
+
+        # Потоки и привязка к ядрам для CPU
+        threads_row = ctk.CTkFrame(
+            device_frame,
+            fg_color="transparent"
+        )
+        threads_row.pack(fill="x", padx=25, pady=5)
+
+        threads_entries = {}
+        for key, caption, width in [
+            ("cpu_threads", "Потоков CPU (0 - авто):", 50),
+            ("num_workers", "Параллельных задач:", 50),
+            ("cpu_affinity", "Ядра (напр. 0-7):", 90)
+        ]:
+            threads_label = ctk.CTkLabel(
+                threads_row,
+                text=caption,
+                font=ctk.CTkFont(size=13),
+                text_color=self.colors["text_primary"]
+            )
+            threads_label.pack(side="left", padx=(0, 5))
+            entry = ctk.CTkEntry(
+                threads_row,
+                width=width,
+                font=ctk.CTkFont(size=13)
+            )
+            entry.insert(0, str(self.settings.get(key, "")))
+            entry.pack(side="left", padx=(0, 15))
+            threads_entries[key] = entry
         
-        # Кнопка настройки PyTorch/CUDA
-        def configure_pytorch():
-            self.check_pytorch_cuda()
+        # Кнопка проверки GPU/CUDA
+        def check_gpu():
+            self.start_environment_check(refresh=True)
 
-        pytorch_button = ctk.CTkButton(
+        gpu_check_button = ctk.CTkButton(
                 device_frame,
-            text="⚙️ НАСТРОИТЬ PYTORCH/CUDA",
-            command=configure_pytorch,
+            text="⚙️ ПРОВЕРИТЬ GPU/CUDA",
+            command=check_gpu,
             width=200,
             height=30,
                 font=ctk.CTkFont(size=12),
             fg_color=self.colors["secondary_hover"],
             hover_color=self.colors["accent"]
         )
-        pytorch_button.pack(anchor="w", padx=25, pady=(5, 15))
+        gpu_check_button.pack(anchor="w", padx=25, pady=(5, 15))
+
+        # 3. Язык распознавания
+        language_frame = ctk.CTkFrame(
+            settings_scroll,
+            fg_color=self.colors["secondary"],
+            border_color=self.colors["border"],
+            border_width=2,
+            corner_radius=15
+        )
+        language_frame.pack(fill="x", pady=10)
+
+        language_label = ctk.CTkLabel(
+            language_frame,
+            text="🌍 Язык распознавания",
+            font=ctk.CTkFont(size=16, weight="bold"),
+            text_color=self.colors["text_primary"]
+        )
+        language_label.pack(anchor="w", padx=15, pady=10)
+
+        language_var = ctk.StringVar(value=LANGUAGES.get(self.settings.get("language", "auto"), LANGUAGES["auto"]))
+        language_menu = ctk.CTkOptionMenu(
+            language_frame,
+            values=list(LANGUAGES.values()),
+            variable=language_var,
+            font=ctk.CTkFont(size=14),
+            fg_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"]
+        )
+        language_menu.pack(anchor="w", padx=25, pady=5)
+
+        remember_language_var = ctk.BooleanVar(value=self.settings.get("remember_language", True))
+        remember_language_checkbox = ctk.CTkCheckBox(
+            language_frame,
+            text="В режиме «Авто» запоминать язык для папки с файлами",
+            variable=remember_language_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        remember_language_checkbox.pack(anchor="w", padx=25, pady=5)
+
+        def forget_languages():
+            try:
+                os.remove(self.language_memory_file)
+            except OSError:
+                pass
+            forget_button.configure(text="✅ ЯЗЫКИ СБРОШЕНЫ", state="disabled")
+
+        forget_button = ctk.CTkButton(
+            language_frame,
+            text="СБРОСИТЬ ЗАПОМНЕННЫЕ ЯЗЫКИ",
+            command=forget_languages,
+            width=200,
+            height=30,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["secondary_hover"],
+            hover_color=self.colors["accent"]
+        )
+        forget_button.pack(anchor="w", padx=25, pady=(5, 15))
 
-        # 3. Путь сохранения
+        # 4. Путь сохранения
         save_path_frame = ctk.CTkFrame(
             settings_scroll,
             fg_color=self.colors["secondary"],
@@ -1006,13 +4338,206 @@ class AudioTranscriber(ctk.CTk):
         )
         change_path_button.pack(side="right")
 
+        # 5. Запись
+        recording = {**RECORDING_DEFAULTS, **self.settings["recording"]}
+        recording_frame = ctk.CTkFrame(
+            settings_scroll,
+            fg_color=self.colors["secondary"],
+            border_color=self.colors["border"],
+            border_width=2,
+            corner_radius=15
+        )
+        recording_frame.pack(fill="x", pady=10)
+
+        recording_label = ctk.CTkLabel(
+            recording_frame,
+            text="🎙️ Запись",
+            font=ctk.CTkFont(size=16, weight="bold"),
+            text_color=self.colors["text_primary"]
+        )
+        recording_label.pack(anchor="w", padx=15, pady=10)
+
+        default_device = "По умолчанию"
+        try:
+            import sounddevice as sd
+            input_devices = [device["name"] for device in sd.query_devices() if device["max_input_channels"] > 0]
+        except Exception as e:
+            print(f"Не удалось получить список устройств записи: {str(e)}")
+            input_devices = []
+        input_device_var = ctk.StringVar(value=recording["device"] or default_device)
+        input_device_menu = ctk.CTkOptionMenu(
+            recording_frame,
+            values=[default_device] + list(dict.fromkeys(input_devices)),
+            variable=input_device_var,
+            width=400,
+            font=ctk.CTkFont(size=14),
+            fg_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"]
+        )
+        input_device_menu.pack(anchor="w", padx=25, pady=5)
+
+        capture_row = ctk.CTkFrame(
+            recording_frame,
+            fg_color="transparent"
+        )
+        capture_row.pack(fill="x", padx=25, pady=(5, 15))
+
+        blocksize_label = ctk.CTkLabel(
+            capture_row,
+            text="Размер блока (0 - авто):",
+            font=ctk.CTkFont(size=13),
+            text_color=self.colors["text_primary"]
+        )
+        blocksize_label.pack(side="left", padx=(0, 5))
+        blocksize_entry = ctk.CTkEntry(
+            capture_row,
+            width=70,
+            font=ctk.CTkFont(size=13)
+        )
+        blocksize_entry.insert(0, str(recording["blocksize"]))
+        blocksize_entry.pack(side="left", padx=(0, 15))
+
+        latency_var = ctk.StringVar(value=RECORDING_LATENCIES.get(recording["latency"], str(recording["latency"])))
+        latency_menu = ctk.CTkOptionMenu(
+            capture_row,
+            values=list(RECORDING_LATENCIES.values()),
+            variable=latency_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            button_color=self.colors["accent"],
+            button_hover_color=self.colors["accent_hover"]
+        )
+        latency_menu.pack(side="left")
+
+        channels_row = ctk.CTkFrame(
+            recording_frame,
+            fg_color="transparent"
+        )
+        channels_row.pack(fill="x", padx=25, pady=(0, 15))
+
+        channels_label = ctk.CTkLabel(
+            channels_row,
+            text="Каналов:",
+            font=ctk.CTkFont(size=13),
+            text_color=self.colors["text_primary"]
+        )
+        channels_label.pack(side="left", padx=(0, 5))
+        channels_entry = ctk.CTkEntry(
+            channels_row,
+            width=50,
+            font=ctk.CTkFont(size=13)
+        )
+        channels_entry.insert(0, str(recording["channels"]))
+        channels_entry.pack(side="left", padx=(0, 15))
+
+        split_channels_var = ctk.BooleanVar(value=self.settings.get("split_channels", False))
+        split_channels_checkbox = ctk.CTkCheckBox(
+            channels_row,
+            text="Каждый канал - отдельный говорящий",
+            variable=split_channels_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        split_channels_checkbox.pack(side="left")
+
+        preprocess = {**PREPROCESS_DEFAULTS, **self.settings.get("preprocess", {})}
+        preprocess_var = ctk.BooleanVar(value=preprocess["enabled"])
+        preprocess_checkbox = ctk.CTkCheckBox(
+            recording_frame,
+            text="Предобработка звука перед распознаванием (фильтр гула, выравнивание громкости)",
+            variable=preprocess_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        preprocess_checkbox.pack(anchor="w", padx=25, pady=(0, 15))
+
+        feature_cache = {**FEATURE_CACHE_DEFAULTS, **self.settings.get("feature_cache", {})}
+        cache_row = ctk.CTkFrame(
+            recording_frame,
+            fg_color="transparent"
+        )
+        cache_row.pack(fill="x", padx=25, pady=(0, 15))
+
+        feature_cache_var = ctk.BooleanVar(value=feature_cache["enabled"])
+        feature_cache_checkbox = ctk.CTkCheckBox(
+            cache_row,
+            text=f"Кэш аудио и признаков для повторных запусков (до {feature_cache['max_size_mb']} МБ)",
+            variable=feature_cache_var,
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        feature_cache_checkbox.pack(side="left")
+
+        def clear_cache():
+            FeatureCache(self.cache_dir).clear()
+            clear_cache_button.configure(text="✅ КЭШ ОЧИЩЕН", state="disabled")
+
+        clear_cache_button = ctk.CTkButton(
+            cache_row,
+            text="ОЧИСТИТЬ КЭШ",
+            command=clear_cache,
+            width=140,
+            height=30,
+            font=ctk.CTkFont(size=12),
+            fg_color=self.colors["secondary_hover"],
+            hover_color=self.colors["accent"]
+        )
+        clear_cache_button.pack(side="right")
+
         # Кнопка сохранения
         def save_settings():
-            self.settings["model"] = self.available_models[selected_model.get()]["name"]
+            if selected_model.get() == AUTO_MODEL_LABEL:
+                self.settings["model"] = AUTO_MODEL
+            else:
+                self.settings["model"] = self.available_models[selected_model.get()]["name"]
             self.settings["use_gpu"] = device_var.get() == "gpu"
             self.settings["device"] = "cuda" if self.settings["use_gpu"] else "cpu"
+            for key in ("cpu_threads", "num_workers"):
+                try:
+                    self.settings[key] = max(0, int(threads_entries[key].get()))
+                except ValueError:
+                    pass
+            self.settings["num_workers"] = max(1, self.settings.get("num_workers", 1))
+            affinity = threads_entries["cpu_affinity"].get().strip()
+            try:
+                parse_cpu_list(affinity)
+                if affinity != self.settings.get("cpu_affinity", ""):
+                    self.settings["cpu_affinity"] = affinity
+                    self.apply_cpu_affinity()
+            except ValueError:
+                pass
+            self.settings["language"] = next(code for code, name in LANGUAGES.items() if name == language_var.get())
+            self.settings["remember_language"] = remember_language_var.get()
+            self.settings["recording"] = {
+                **recording,
+                "device": "" if input_device_var.get() == default_device else input_device_var.get(),
+                "latency": next((key for key, name in RECORDING_LATENCIES.items()
+                                 if name == latency_var.get()), recording["latency"])
+            }
+            for key, entry, minimum in [("blocksize", blocksize_entry, 0), ("channels", channels_entry, 1)]:
+                try:
+                    self.settings["recording"][key] = max(minimum, int(entry.get()))
+                except ValueError:
+                    pass
+            self.settings["split_channels"] = split_channels_var.get()
+            self.settings["preprocess"] = {**preprocess, "enabled": preprocess_var.get()}
+            self.settings["feature_cache"] = {**feature_cache, "enabled": feature_cache_var.get()}
+            self.settings["cascade"] = {
+                **cascade,
+                "enabled": cascade_var.get(),
+                "fast_model": self.available_models[fast_model_var.get()]["name"]
+            }
+            self.settings["preview"] = {
+                **preview,
+                "enabled": preview_var.get(),
+                "model": self.available_models[preview_model_var.get()]["name"]
+            }
             self.save_settings(self.settings)
-            self.model = None  # Сброс текущей модели
+            self.request_unload_models()  # Сброс текущих моделей (после текущей задачи)
             settings_window.destroy()
         
         save_button = ctk.CTkButton(
@@ -1026,6 +4551,86 @@ class AudioTranscriber(ctk.CTk):
         )
         save_button.pack(pady=20)
 
+    def show_search_window(self):
+        """Окно поиска фразы по всем сохранённым расшифровкам"""
+        search_window = ctk.CTkToplevel(self)
+        search_window.title("Поиск по расшифровкам")
+        search_window.geometry("900x600")
+
+        container = ctk.CTkFrame(
+            search_window,
+            fg_color=self.colors["primary"]
+        )
+        container.pack(fill="both", expand=True, padx=20, pady=20)
+
+        query_row = ctk.CTkFrame(
+            container,
+            fg_color="transparent"
+        )
+        query_row.pack(fill="x", padx=15, pady=(15, 10))
+
+        query_entry = ctk.CTkEntry(
+            query_row,
+            placeholder_text="Слова для поиска (слово* - по началу слова)",
+            height=35,
+            font=ctk.CTkFont(size=13)
+        )
+        query_entry.pack(side="left", fill="x", expand=True, padx=(0, 10))
+
+        status_label = ctk.CTkLabel(
+            container,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color=self.colors["text_secondary"]
+        )
+        status_label.pack(anchor="w", padx=15)
+
+        results_box = ctk.CTkTextbox(
+            container,
+            wrap="word",
+            font=ctk.CTkFont(size=13),
+            fg_color=self.colors["secondary"],
+            border_color=self.colors["border"],
+            border_width=1,
+            corner_radius=15,
+            state="disabled"
+        )
+        results_box.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+
+        def search(event=None):
+            try:
+                index = TranscriptIndex(self.index_file)
+                started = time.perf_counter()
+                results = index.search(query_entry.get(), limit=200)
+                elapsed = time.perf_counter() - started
+                documents, _ = index.stats()
+            except sqlite3.Error as e:
+                status_label.configure(text=f"❌ Ошибка поиска: {str(e)}", text_color=self.colors["error"])
+                return
+            status_label.configure(
+                text=f"Найдено сегментов: {len(results)} за {elapsed * 1000:.0f} мс (расшифровок в индексе: {documents})",
+                text_color=self.colors["text_secondary"]
+            )
+            results_box.configure(state="normal")
+            results_box.delete("1.0", "end")
+            for result in results:
+                results_box.insert("end", format_search_result(result) + "\n\n")
+            results_box.configure(state="disabled")
+
+        search_button = ctk.CTkButton(
+            query_row,
+            text="НАЙТИ",
+            command=search,
+            width=100,
+            height=35,
+            font=ctk.CTkFont(size=13, weight="bold"),
+            fg_color=self.colors["accent"],
+            hover_color=self.colors["accent_hover"]
+        )
+        search_button.pack(side="right")
+        query_entry.bind("<Return>", search)
+        query_entry.focus()
+
     def show_models_info_window(self):
         """Показать окно с информацией о моделях"""
         info_window = ctk.CTkToplevel(self)
@@ -1124,7 +4729,7 @@ class AudioTranscriber(ctk.CTk):
             # VRAM
             vram_label = ctk.CTkLabel(
                 row_frame,
-                text=info["vram"],
+                text=self.describe_model_memory(info),
                 font=ctk.CTkFont(size=13),
                 text_color=self.colors["text_secondary"],
                 width=column_widths[2]
@@ -1134,7 +4739,7 @@ class AudioTranscriber(ctk.CTk):
             # Скорость
             speed_label = ctk.CTkLabel(
                 row_frame,
-                text=info["speed"],
+                text=self.describe_model_speed(info),
                 font=ctk.CTkFont(size=13),
                 text_color=self.colors["text_secondary"],
                 width=column_widths[3]
@@ -1173,69 +4778,64 @@ class AudioTranscriber(ctk.CTk):
         )
         close_button.pack(pady=20)
 
-    def check_pytorch_cuda(self):
-        """Проверка и установка PyTorch с CUDA"""
-        try:
-            import torch
-            pytorch_installed = True
-            cuda_available = torch.cuda.is_available()
-        except ImportError:
-            pytorch_installed = False
-            cuda_available = False
-            
-        # Проверяем наличие NVIDIA GPU через subprocess
-        import subprocess
-        has_gpu = False
-        try:
-            nvidia_smi = subprocess.check_output(['nvidia-smi'])
-            has_gpu = True
-        except:
-            pass
+    def start_environment_check(self, refresh=False, show_dialog=True):
+        """Фоновая проверка GPU и библиотек CUDA"""
+        def check():
+            try:
+                environment = probe_environment(self.environment_cache_file, refresh=refresh)
+            except Exception as e:
+                print(f"Ошибка проверки окружения: {str(e)}")
+                return
+            self.after(0, lambda: self.on_environment_checked(environment, show_dialog))
+
+        threading.Thread(target=check, name="environment-check", daemon=True).start()
+
+    def on_environment_checked(self, environment, show_dialog):
+        """Результат фоновой проверки окружения"""
+        self.environment = environment
+        if show_dialog:
+            self.check_gpu_environment()
 
-        if not pytorch_installed:
-            # Если PyTorch не установлен
-            self.show_pytorch_install_dialog(
-                "PyTorch не установлен",
-                "PyTorch не установлен.\nВыберите версию для установки:"
+    def check_gpu_environment(self):
+        """Показать результат проверки GPU и библиотек CUDA"""
+        devices = self.environment["devices"]
+        missing_libs = self.environment["missing_cuda_libraries"]
+
+        if devices["cuda_devices"] > 0:
+            # CTranslate2 видит GPU - можно работать на видеокарте
+            self.show_environment_dialog(
+                "GPU доступен",
+                f"Доступная видеокарта: {devices['gpu_names'][0] if devices['gpu_names'] else 'Неизвестно'}\n" +
+                "Включите GPU в настройках для ускорения распознавания."
             )
-        elif has_gpu and not cuda_available:
-            # Если есть GPU, но CUDA недоступна
-            self.show_pytorch_install_dialog(
-                "PyTorch установлен без поддержки CUDA",
-                "У вас установлен PyTorch, но без поддержки CUDA.\n" +
-                "Вы можете продолжить работу с текущей версией\n" +
-                "или переустановить с поддержкой CUDA для ускорения работы на GPU."
+        elif missing_libs:
+            self.show_cuda_install_dialog(missing_libs)
+        elif devices["gpu_names"]:
+            self.show_environment_dialog(
+                "GPU недоступен",
+                f"Видеокарта {devices['gpu_names'][0]} обнаружена, но не может использоваться.\n" +
+                f"Версия драйвера: {devices['driver_version'] or 'Неизвестно'}\n" +
+                "Обновите драйвер NVIDIA или продолжайте работу на CPU."
             )
-        elif not has_gpu and not cuda_available:
+        else:
             # Если нет GPU, показываем информацию
-            self.show_pytorch_install_dialog(
-                "PyTorch установлен для CPU",
-                "У вас установлен PyTorch для работы на CPU.\n" +
+            self.show_environment_dialog(
+                "Работа на CPU",
                 "Видеокарта NVIDIA не обнаружена.\n" +
-                "Можно продолжить работу с текущей версией.",
-                show_install_buttons=False
-            )
-        elif cuda_available:
-            # Если CUDA доступна, показываем информацию
-            self.show_pytorch_install_dialog(
-                "PyTorch установлен с CUDA",
-                f"У вас установлен PyTorch с поддержкой CUDA.\n" +
-                f"Доступная видеокарта: {torch.cuda.get_device_name(0)}\n" +
-                "Можно продолжить работу с текущей версией.",
-                show_install_buttons=False
+                "Распознавание будет выполняться на CPU."
             )
 
-    def show_pytorch_install_dialog(self, title, message, show_install_buttons=True):
-        """Показать диалог установки PyTorch"""
+    def show_environment_dialog(self, title, message):
+        """Показать диалог с результатом проверки GPU"""
         try:
             choice_window = ctk.CTkToplevel(self)
-            choice_window.title("Установка PyTorch")
-            choice_window.geometry("500x450")
+            choice_window.title("Проверка GPU")
+            choice_window.geometry("500x300")
             choice_window.grab_set()
             
             # Центрируем окно на экране
             window_width = 500
-            window_height = 450
+            window_height = 300
             screen_width = choice_window.winfo_screenwidth()
             screen_height = choice_window.winfo_screenheight()
             
@@ -1262,61 +4862,17 @@ class AudioTranscriber(ctk.CTk):
             )
             description.pack(pady=10)
             
-            if show_install_buttons:
-                def install_with_cuda():
-                    choice_window.destroy()
-                    self._perform_pytorch_install(with_cuda=True)
-                    
-                def install_without_cuda():
-                    choice_window.destroy()
-                    self._perform_pytorch_install(with_cuda=False)
-                
-                # Кнопки выбора
-                cuda_button = ctk.CTkButton(
-                    choice_window,
-                    text="ПЕРЕУСТАНОВИТЬ С CUDA (GPU)",
-                    command=install_with_cuda,
-                    height=45,
-                    font=ctk.CTkFont(size=15, weight="bold"),
-                    fg_color=self.colors["accent"],
-                    hover_color=self.colors["accent_hover"]
-                )
-                cuda_button.pack(pady=10, padx=20, fill="x")
-                
-                cpu_button = ctk.CTkButton(
-                    choice_window,
-                    text="ПЕРЕУСТАНОВИТЬ БЕЗ CUDA (CPU)",
-                    command=install_without_cuda,
-                    height=45,
-                    font=ctk.CTkFont(size=15, weight="bold"),
-                    fg_color=self.colors["secondary"],
-                    hover_color=self.colors["secondary_hover"]
-                )
-                cpu_button.pack(pady=10, padx=20, fill="x")
-
-                # Кнопка продолжения с текущей версией
-                continue_button = ctk.CTkButton(
-                    choice_window,
-                    text="ПРОДОЛЖИТЬ С ТЕКУЩЕЙ ВЕРСИЕЙ",
-                    command=choice_window.destroy,
-                    height=45,
-                    font=ctk.CTkFont(size=15, weight="bold"),
-                    fg_color=self.colors["success"],
-                    hover_color="#5BBF60"
-                )
-                continue_button.pack(pady=10, padx=20, fill="x")
-            else:
-                # Кнопка продолжения
-                continue_button = ctk.CTkButton(
-                    choice_window,
-                    text="ПРОДОЛЖИТЬ",
-                    command=choice_window.destroy,
-                    height=45,
-                    font=ctk.CTkFont(size=15, weight="bold"),
-                    fg_color=self.colors["success"],
-                    hover_color="#5BBF60"
-                )
-                continue_button.pack(pady=10, padx=20, fill="x")
+            # Кнопка продолжения
+            continue_button = ctk.CTkButton(
+                choice_window,
+                text="ПРОДОЛЖИТЬ",
+                command=choice_window.destroy,
+                height=45,
+                font=ctk.CTkFont(size=15, weight="bold"),
+                fg_color=self.colors["success"],
+                hover_color="#5BBF60"
+            )
+            continue_button.pack(pady=10, padx=20, fill="x")
             
             # Чекбокс "Больше не показывать"
             show_var = ctk.BooleanVar(value=self.settings.get("show_pytorch_dialog", True))
@@ -1337,150 +4893,30 @@ class AudioTranscriber(ctk.CTk):
             checkbox.pack(pady=20)
             
         except Exception as e:
-            print(f"Ошибка создания окна выбора: {str(e)}")
+            print(f"Ошибка создания окна проверки GPU: {str(e)}")
 
-    def _perform_pytorch_install(self, with_cuda=True):
-        """Выполнение установки PyTorch"""
-        try:
-            import subprocess
-            import sys
-            
-            # Создаем окно с информацией
-            info_window = ctk.CTkToplevel(self)
-            info_window.title("Установка PyTorch")
-            info_window.geometry("400x200")
-            info_window.grab_set()
-            
-            info_label = ctk.CTkLabel(
-                info_window,
-                text=f"Установка PyTorch {'с поддержкой CUDA' if with_cuda else 'без CUDA'}...\n" +
-                     "Это может занять несколько минут.",
-                font=ctk.CTkFont(size=14),
-                wraplength=350
-            )
-            info_label.pack(pady=20)
-            
-            progress = ctk.CTkProgressBar(
-                info_window,
-                width=300,
-                height=20,
-                corner_radius=10,
-                mode="indeterminate"
-            )
-            progress.pack(pady=20)
-            progress.start()
-            
-            def install():
-                try:
-                    # Устанавливаем в пользовательскую директорию
-                    if with_cuda:
-                        # Устанавливаем PyTorch с CUDA
-                        subprocess.check_call([
-                            sys.executable, "-m", "pip", "install", "--user", "--upgrade", "--no-cache-dir",
-                            "torch", "torchvision", "torchaudio", 
-                            "--index-url", "https://download.pytorch.org/whl/cu118"
-                        ])
-                    else:
-                        # Устанавливаем PyTorch без CUDA
-                        subprocess.check_call([
-                            sys.executable, "-m", "pip", "install", "--user", "--upgrade", "--no-cache-dir",
-                            "torch", "torchvision", "torchaudio"
-                        ])
-                    
-                    info_label.configure(
-                        text=f"✅ PyTorch успешно установлен {'с CUDA' if with_cuda else 'без CUDA'}!\n" +
-                             "Перезапустите приложение."
-                    )
+    def get_measured(self, info):
+        """Замеры benchmark.py для текущего устройства или None"""
+        device = "cuda" if self.settings.get("use_gpu", False) else "cpu"
+        return info.get("measured", {}).get(device)
 
-                    # Добавляем кнопку для закрытия окна
-                    close_button = ctk.CTkButton(
-                        info_window,
-                        text="ЗАКРЫТЬ",
-                        command=info_window.destroy,
-                        height=35,
-                        font=ctk.CTkFont(size=13, weight="bold"),
-                        fg_color=self.colors["accent"],
-                        hover_color=self.colors["accent_hover"]
-                    )
-                    close_button.pack(pady=10)
+    def describe_model_speed(self, info):
+        """Скорость модели: замеренный RTF или ориентировочная оценка"""
+        measured = self.get_measured(info)
+        if measured and measured.get("rtf") is not None:
+            return f"RTF {measured['rtf']:.2f}"
+        return info["speed"]
 
-                except Exception as e:
-                    error_msg = str(e)
-                    if "PermissionError" in error_msg:
-                        error_msg = "Ошибка доступа. Попробуйте запустить приложение от имени администратора."
-                    
-                    info_label.configure(
-                        text=f"❌ Ошибка установки: {error_msg}\n" +
-                             "Попробуйте установить PyTorch вручную или запустите приложение от имени администратора."
-                    )
-                    
-                    # Добавляем кнопку для закрытия окна при ошибке
-                    close_button = ctk.CTkButton(
-                        info_window,
-                        text="ЗАКРЫТЬ",
-                        command=info_window.destroy,
-                        height=35,
-                        font=ctk.CTkFont(size=13, weight="bold"),
-                        fg_color=self.colors["error"],
-                        hover_color="#FF6B6B"
-                    )
-                    close_button.pack(pady=10)
-                
-                finally:
-                    progress.stop()
-                    progress.pack_forget()
-            
-            # Запускаем установку в отдельном потоке
-            import threading
-            thread = threading.Thread(target=install)
-            thread.start()
-            
-        except Exception as e:
-            print(f"Ошибка установки PyTorch: {str(e)}")
+    def describe_model_memory(self, info):
+        """Память модели: замеренный пиковый RSS или ориентировочная оценка"""
+        measured = self.get_measured(info)
+        if measured and measured.get("peak_rss_mb") is not None:
+            return f"{measured['peak_rss_mb'] / 1024:.1f} GB"
+        return info["vram"]
 
     def check_model_installed(self, model_name):
         """Проверка установки модели"""
-        if model_name == "turbo":
-            model_path = os.path.join(self.models_dir, "models--mobiuslabsgmbh--faster-whisper-large-v3-turbo")
-        elif model_name == "large-v3":
-            model_path = os.path.join(self.models_dir, "models--Systran--faster-whisper-large-v3")
-        else:
-            model_path = os.path.join(self.models_dir, f"models--Systran--faster-whisper-{model_name}")
-        return os.path.exists(model_path)
-
-    def check_cuda_libraries(self):
-        """Проверка и установка библиотек CUDA"""
-        cuda_libs = {
-            "cublas64_12.dll": "CUDA Runtime",
-            "cudart64_12.dll": "CUDA Runtime",
-            "cublasLt64_12.dll": "CUDA Runtime",
-            "cufft64_11.dll": "CUDA Runtime",
-            "curand64_10.dll": "CUDA Runtime",
-            "cusolver64_11.dll": "CUDA Runtime",
-            "cusparse64_12.dll": "CUDA Runtime",
-            "cudnn64_8.dll": "cuDNN",
-            "cudnn_ops_infer64_8.dll": "cuDNN",
-            "cudnn_ops_train64_8.dll": "cuDNN",
-            "cudnn_adv_infer64_8.dll": "cuDNN",
-            "cudnn_adv_train64_8.dll": "cuDNN",
-            "cudnn_cnn_infer64_8.dll": "cuDNN",
-            "cudnn_cnn_train64_8.dll": "cuDNN"
-        }
-        
-        missing_libs = {}
-        for lib, package in cuda_libs.items():
-            try:
-                import ctypes
-                ctypes.CDLL(lib)
-            except OSError:
-                if package not in missing_libs:
-                    missing_libs[package] = []
-                missing_libs[package].append(lib)
-        
-        if missing_libs:
-            self.show_cuda_install_dialog(missing_libs)
-            return False
-        return True
+        return find_model_snapshot(self.models_dir, model_name) is not None
 
     def show_cuda_install_dialog(self, missing_libs):
         """Показать диалог установки CUDA библиотек"""
@@ -1658,6 +5094,79 @@ class AudioTranscriber(ctk.CTk):
         )
         close_button.pack(pady=20)
 
-if __name__ == "__main__":
-    app = AudioTranscriber()
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="VoiceScribe Pro")
+    subparsers = parser.add_subparsers(dest="command")
+
+    export_parser = subparsers.add_parser("export-models", help="упаковать установленные модели в архив")
+    export_parser.add_argument("bundle", help="путь к архиву (.tar)")
+    export_parser.add_argument("--models", nargs="+", help="имена моделей, по умолчанию все установленные")
+
+    import_parser = subparsers.add_parser("import-models", help="установить модели из архива")
+    import_parser.add_argument("bundle", help="путь к архиву (.tar)")
+    import_parser.add_argument("--no-verify", action="store_true", help="не проверять sha256 (быстрее)")
+
+    search_parser = subparsers.add_parser("search", help="найти фразу во всех расшифровках")
+    search_parser.add_argument("query", help="слова для поиска (слово* - по началу слова)")
+    search_parser.add_argument("--limit", type=int, default=50, help="сколько сегментов вывести")
+    search_parser.add_argument("--json", action="store_true", help="вывод в JSON")
+
+    history_parser = subparsers.add_parser("history", help="журнал задач распознавания")
+    history_parser.add_argument("--limit", type=int, default=20, help="сколько последних задач вывести")
+    history_parser.add_argument("--failed", action="store_true", help="только задачи с ошибкой")
+    history_parser.add_argument("--pending", nargs="+", metavar="PATH",
+                                help="вывести файлы (и файлы в папках), ещё не распознанные моделью --model "
+                                     "или изменившиеся после распознавания")
+    history_parser.add_argument("--model", default="large-v3", help="модель для --pending")
+
+    parser.add_argument("--cpu-threads", type=int, help="потоков CTranslate2 на CPU (0 - по умолчанию)")
+    parser.add_argument("--num-workers", type=int, help="параллельных вызовов transcribe на модель")
+    parser.add_argument("--cpu-affinity", help="привязать процесс к ядрам, например 0-7,16")
+
+    args = parser.parse_args()
+    models_dir = os.path.join(USER_DATA_DIR, "models")
+    settings_dir = os.path.join(USER_DATA_DIR, "settings")
+    os.makedirs(settings_dir, exist_ok=True)
+    load_model_catalog(settings_dir)
+
+    if args.command == "export-models":
+        export_model_bundle(models_dir, args.bundle, args.models)
+        return 0
+    if args.command == "import-models":
+        os.makedirs(models_dir, exist_ok=True)
+        import_model_bundle(models_dir, args.bundle, verify=not args.no_verify)
+        return 0
+    if args.command == "history":
+        ledger = JobLedger(os.path.join(USER_DATA_DIR, "transcripts.db"))
+        if args.pending:
+            for path in ledger.pending(find_audio_files(args.pending), args.model):
+                print(path)
+        else:
+            for job in ledger.recent(args.limit, "error" if args.failed else None):
+                print(format_job(job))
+        return 0
+    if args.command == "search":
+        results = TranscriptIndex(os.path.join(USER_DATA_DIR, "transcripts.db")).search(args.query, args.limit)
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for result in results:
+                print(format_search_result(result))
+        return 0
+
+    overrides = {
+        key: value for key, value in [
+            ("cpu_threads", args.cpu_threads),
+            ("num_workers", args.num_workers),
+            ("cpu_affinity", args.cpu_affinity)
+        ] if value is not None
+    }
+    app = AudioTranscriber(overrides)
     app.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
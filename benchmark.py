@@ -0,0 +1,701 @@
+"""Бенчмарк скорости и точности распознавания VoiceScribe Pro.
+
+Каждая модель из каталога приложения прогоняется на фиксированном наборе
+аудиофайлов со всеми типами вычислений и профилями декодирования.
+Для каждой комбинации измеряются время загрузки модели, коэффициент
+реального времени (RTF = время распознавания / длительность аудио),
+пиковое потребление памяти (RSS) и WER относительно эталонных текстов.
+Результаты сохраняются в JSON, чтобы сравнивать версии между собой.
+
+Примеры:
+    python benchmark.py fixtures
+    python benchmark.py run --models tiny base --output results.json
+    python benchmark.py compare old.json results.json
+    python benchmark.py sweep --models small --threads 2 4 8 16
+    python benchmark.py preprocess --model small
+    python benchmark.py startup --limit 1.0
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import wave
+from datetime import datetime
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES_DIR = os.path.join(SCRIPT_DIR, "benchmark_fixtures")
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".ogg", ".flac")
+
+# Типы вычислений для каждого устройства
+COMPUTE_TYPES = {
+    "cpu": ["int8", "float32"],
+    "cuda": ["float16", "int8_float16"],
+}
+
+# Библиотеки, которые не должны загружаться до появления окна
+HEAVY_MODULES = ["torch", "faster_whisper", "ctranslate2", "scipy", "sounddevice", "mutagen", "tqdm"]
+
+# Профили декодирования (параметры model.transcribe)
+DECODING_PROFILES = {
+    "greedy": {"beam_size": 1},
+    "beam5": {"beam_size": 5},  # Как в приложении
+    "beam5_no_fallback": {"beam_size": 5, "temperature": 0.0},
+}
+
+
+def peak_rss_mb():
+    """Пиковый объём резидентной памяти текущего процесса в МБ"""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux значение в КБ, в macOS - в байтах
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def normalize_text(text):
+    """Приведение текста к виду для подсчёта WER"""
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return text.split()
+
+
+def word_error_rate(reference, hypothesis):
+    """WER: расстояние Левенштейна по словам, делённое на длину эталона"""
+    ref = normalize_text(reference)
+    hyp = normalize_text(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def list_fixtures(fixtures_dir):
+    """Список аудиофайлов набора и эталонных текстов к ним (если есть)"""
+    fixtures = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        path = os.path.join(fixtures_dir, name)
+        base, ext = os.path.splitext(path)
+        if ext.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference = None
+        if os.path.exists(base + ".txt"):
+            with open(base + ".txt", "r", encoding="utf-8") as f:
+                reference = f.read()
+        fixtures.append({"name": name, "path": path, "reference": reference})
+    return fixtures
+
+
+def generate_fixtures(fixtures_dir, duration=30, sample_rate=16000):
+    """Создание детерминированного синтетического набора для замера RTF.
+
+    У синтетических файлов нет эталонного текста, поэтому WER для них
+    не считается. Для оценки точности положите рядом записи речи
+    с одноимёнными .txt файлами.
+    """
+    import numpy as np
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    rng = np.random.default_rng(2024)
+    t = np.arange(duration * sample_rate) / sample_rate
+
+    # Тональные посылки с паузами, похожие по огибающей на речь
+    envelope = (np.sin(2 * np.pi * 0.5 * t) > 0).astype(np.float32)
+    tones = 0.3 * np.sin(2 * np.pi * (200 + 150 * np.sin(2 * np.pi * 3 * t)) * t) * envelope
+    tones += 0.01 * rng.standard_normal(t.size)
+
+    signals = {
+        "synthetic_tones.wav": tones,
+        "synthetic_noise.wav": 0.05 * rng.standard_normal(t.size),
+    }
+    for name, signal in signals.items():
+        path = os.path.join(fixtures_dir, name)
+        pcm = (np.clip(signal, -1.0, 1.0) * 32767).astype("<i2")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(pcm.tobytes())
+        print(f"Создан {path}")
+
+
+def get_environment():
+    """Сведения об окружении для сопоставления результатов"""
+    environment = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+    for package in ("faster_whisper", "ctranslate2"):
+        try:
+            module = __import__(package)
+            environment[package] = getattr(module, "__version__", None)
+        except ImportError:
+            environment[package] = None
+    try:
+        environment["git_commit"] = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=SCRIPT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        environment["git_commit"] = None
+    return environment
+
+
+def get_devices():
+    """Доступные устройства для CTranslate2"""
+    devices = ["cpu"]
+    try:
+        import ctranslate2
+        if ctranslate2.get_cuda_device_count() > 0:
+            devices.append("cuda")
+    except Exception:
+        pass
+    return devices
+
+
+def run_single(args):
+    """Прогон одной комбинации модели и настроек (в дочернем процессе)"""
+    from faster_whisper import WhisperModel, decode_audio
+
+    result = {
+        "model": args.model,
+        "device": args.device,
+        "compute_type": args.compute_type,
+        "profile": args.profile,
+        "cpu_threads": args.cpu_threads,
+        "num_workers": args.num_workers,
+    }
+    try:
+        load_start = time.perf_counter()
+        model = WhisperModel(
+            args.model_source or args.model,
+            device=args.device,
+            compute_type=args.compute_type,
+            cpu_threads=args.cpu_threads,
+            num_workers=args.num_workers,
+            download_root=args.models_dir
+        )
+        result["load_time_s"] = time.perf_counter() - load_start
+
+        fixtures_results = []
+        for fixture in list_fixtures(args.fixtures):
+            audio = decode_audio(fixture["path"], sampling_rate=16000)
+            duration = len(audio) / 16000
+            best_time = None
+            text = ""
+            for _ in range(args.repeat):
+                transcribe_start = time.perf_counter()
+                segments, _info = model.transcribe(audio, **DECODING_PROFILES[args.profile])
+                text = " ".join(segment.text.strip() for segment in segments)
+                elapsed = time.perf_counter() - transcribe_start
+                best_time = elapsed if best_time is None else min(best_time, elapsed)
+
+            fixtures_results.append({
+                "name": fixture["name"],
+                "duration_s": duration,
+                "transcribe_time_s": best_time,
+                "rtf": best_time / duration if duration else None,
+                "wer": word_error_rate(fixture["reference"], text) if fixture["reference"] is not None else None,
+            })
+
+        result["fixtures"] = fixtures_results
+        rtfs = [f["rtf"] for f in fixtures_results if f["rtf"] is not None]
+        wers = [f["wer"] for f in fixtures_results if f["wer"] is not None]
+        result["mean_rtf"] = sum(rtfs) / len(rtfs) if rtfs else None
+        result["mean_wer"] = sum(wers) / len(wers) if wers else None
+    except Exception as e:
+        result["error"] = str(e)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(result, ensure_ascii=False))
+
+
+def run_child(args, model_name, model_source, device, compute_type, profile, cpu_threads=0):
+    """Запуск одной комбинации в отдельном процессе, чтобы пиковый RSS и кэши не смешивались"""
+    command = [
+        sys.executable, os.path.abspath(__file__), "_single",
+        "--model", model_name,
+        "--model-source", model_source,
+        "--device", device,
+        "--compute-type", compute_type,
+        "--profile", profile,
+        "--fixtures", args.fixtures,
+        "--models-dir", args.models_dir,
+        "--repeat", str(args.repeat),
+        "--cpu-threads", str(cpu_threads),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, encoding="utf-8")
+    try:
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    except (IndexError, json.JSONDecodeError):
+        return {
+            "model": model_name,
+            "device": device,
+            "compute_type": compute_type,
+            "profile": profile,
+            "cpu_threads": cpu_threads,
+            "error": completed.stderr.strip()[-500:],
+        }
+
+
+def run_benchmark(args):
+    """Прогон всех комбинаций, каждая в отдельном процессе"""
+    # Импорт приложения только в родительском процессе, чтобы не влиять на RSS замеров
+    from audio_to_text import USER_DATA_DIR, find_model_snapshot, get_model_repo, load_model_catalog
+
+    if args.models_dir is None:
+        args.models_dir = os.path.join(USER_DATA_DIR, "models")
+    if not os.path.isdir(args.fixtures) or not list_fixtures(args.fixtures):
+        print(f"Нет аудиофайлов в {args.fixtures}. Запустите: python benchmark.py fixtures")
+        return 1
+
+    catalog = load_model_catalog(os.path.join(USER_DATA_DIR, "settings"))
+    models = args.models or [info["name"] for info in catalog.values()]
+    devices = args.devices or get_devices()
+    profiles = args.profiles or list(DECODING_PROFILES)
+
+    results = []
+    for model_name in models:
+        # Локальный снимок или репозиторий на хабе (для моделей вне списка faster_whisper)
+        model_source = find_model_snapshot(args.models_dir, model_name) or get_model_repo(model_name)
+        if model_source is None:
+            # Модель задана локальным путём, но снимок по нему неполный
+            print(f"⚠️ {model_name}: локальный снимок неполный или не найден, пропускаем")
+            continue
+        for device in devices:
+            for compute_type in args.compute_types or COMPUTE_TYPES[device]:
+                for profile in profiles:
+                    print(f"▶ {model_name} / {device} / {compute_type} / {profile}", flush=True)
+                    result = run_child(args, model_name, model_source, device, compute_type, profile,
+                                       cpu_threads=args.cpu_threads)
+                    results.append(result)
+                    if "error" in result:
+                        print(f"  ❌ {result['error']}")
+                    else:
+                        wer = f"{result['mean_wer']:.3f}" if result["mean_wer"] is not None else "н/д"
+                        print(f"  загрузка {result['load_time_s']:.2f} с, RTF {result['mean_rtf']:.3f}, "
+                              f"RSS {result['peak_rss_mb']:.0f} МБ, WER {wer}")
+
+    report = {
+        "schema": 1,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": get_environment(),
+        "fixtures": [f["name"] for f in list_fixtures(args.fixtures)],
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4, ensure_ascii=False)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.update_catalog:
+        update_catalog(results)
+    return 0
+
+
+def sweep_threads(args):
+    """Подбор числа потоков CPU для каждой модели (int8, профиль beam5)
+
+    Лучшим считается наименьшее число потоков, RTF которого не более чем на
+    5% хуже минимального: лишние потоки только мешают соседним процессам.
+    """
+    from audio_to_text import USER_DATA_DIR, find_model_snapshot, get_model_repo, load_model_catalog
+
+    if args.models_dir is None:
+        args.models_dir = os.path.join(USER_DATA_DIR, "models")
+    if not os.path.isdir(args.fixtures) or not list_fixtures(args.fixtures):
+        print(f"Нет аудиофайлов в {args.fixtures}. Запустите: python benchmark.py fixtures")
+        return 1
+
+    catalog = load_model_catalog(os.path.join(USER_DATA_DIR, "settings"))
+    models = args.models or [info["name"] for info in catalog.values()]
+    threads = args.threads
+    if not threads:
+        cpu_count = os.cpu_count() or 1
+        threads = sorted({2 ** power for power in range(cpu_count.bit_length()) if 2 ** power <= cpu_count} | {cpu_count})
+
+    best_threads = {}
+    results = []
+    for model_name in models:
+        model_source = find_model_snapshot(args.models_dir, model_name) or get_model_repo(model_name)
+        if model_source is None:
+            print(f"⚠️ {model_name}: локальный снимок неполный или не найден, пропускаем")
+            continue
+        model_results = []
+        for cpu_threads in threads:
+            print(f"▶ {model_name} / {cpu_threads} потоков", flush=True)
+            result = run_child(args, model_name, model_source, "cpu", "int8", "beam5", cpu_threads=cpu_threads)
+            results.append(result)
+            if "error" in result or result["mean_rtf"] is None:
+                print(f"  ❌ {result.get('error', 'нет данных')}")
+                continue
+            model_results.append(result)
+            print(f"  RTF {result['mean_rtf']:.3f}, RSS {result['peak_rss_mb']:.0f} МБ")
+        if not model_results:
+            continue
+        fastest = min(r["mean_rtf"] for r in model_results)
+        best = min((r for r in model_results if r["mean_rtf"] <= fastest * 1.05), key=lambda r: r["cpu_threads"])
+        best_threads[model_name] = best["cpu_threads"]
+        print(f"✅ {model_name}: {best['cpu_threads']} потоков (RTF {best['mean_rtf']:.3f})")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "schema": 1,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "environment": get_environment(),
+            "best_cpu_threads": best_threads,
+            "results": results,
+        }, f, indent=4, ensure_ascii=False)
+    print(f"Результаты сохранены в {args.output}")
+
+    if args.update_catalog:
+        from audio_to_text import save_model_catalog
+
+        settings_dir = os.path.join(USER_DATA_DIR, "settings")
+        for info in catalog.values():
+            if info["name"] in best_threads:
+                info.setdefault("measured", {}).setdefault("cpu", {})["cpu_threads"] = best_threads[info["name"]]
+        save_model_catalog(settings_dir, catalog)
+        print(f"Число потоков записано в каталог моделей: {len(best_threads)}")
+    return 0
+
+
+def degrade_audio(audio, sample_rate=16000):
+    """Тихая запись с гулом сети 50 Гц и смещением постоянной составляющей"""
+    import numpy as np
+
+    t = np.arange(len(audio)) / sample_rate
+    return (audio * 0.03 + 0.02 * np.sin(2 * np.pi * 50 * t) + 0.02).astype(np.float32)
+
+
+def benchmark_preprocessing(args):
+    """Затраты на предобработку и повторные декодирования, которых она избегает
+
+    Каждый файл набора прогоняется как есть и в испорченном виде (тихо,
+    с гулом и смещением), без предобработки и с ней. Повторным
+    декодированием считается сегмент, распознанный с температурой выше нуля.
+    """
+    from faster_whisper import WhisperModel, decode_audio
+    from audio_to_text import (USER_DATA_DIR, PREPROCESS_DEFAULTS, find_model_snapshot,
+                               get_model_repo, load_model_catalog, preprocess_audio)
+
+    if args.models_dir is None:
+        args.models_dir = os.path.join(USER_DATA_DIR, "models")
+    if not os.path.isdir(args.fixtures) or not list_fixtures(args.fixtures):
+        print(f"Нет аудиофайлов в {args.fixtures}. Запустите: python benchmark.py fixtures")
+        return 1
+
+    load_model_catalog(os.path.join(USER_DATA_DIR, "settings"))
+    model_source = find_model_snapshot(args.models_dir, args.model) or get_model_repo(args.model)
+    model = WhisperModel(
+        model_source or args.model,
+        device=args.device,
+        compute_type=COMPUTE_TYPES[args.device][0],
+        download_root=args.models_dir
+    )
+    options = {key: value for key, value in PREPROCESS_DEFAULTS.items() if key != "enabled"}
+
+    results = []
+    for fixture in list_fixtures(args.fixtures):
+        clean = decode_audio(fixture["path"], sampling_rate=16000)
+        for variant, audio in [("clean", clean), ("degraded", degrade_audio(clean))]:
+            for enabled in (False, True):
+                data = audio.copy()
+                preprocess_start = time.perf_counter()
+                if enabled:
+                    preprocess_audio(data, 16000, **options)
+                preprocess_time = time.perf_counter() - preprocess_start
+
+                transcribe_start = time.perf_counter()
+                segments, _info = model.transcribe(data, **DECODING_PROFILES["beam5"])
+                segments = list(segments)
+                transcribe_time = time.perf_counter() - transcribe_start
+
+                text = " ".join(segment.text.strip() for segment in segments)
+                result = {
+                    "name": fixture["name"],
+                    "variant": variant,
+                    "preprocess": enabled,
+                    "preprocess_time_s": preprocess_time,
+                    "transcribe_time_s": transcribe_time,
+                    "fallback_segments": sum(1 for segment in segments if (getattr(segment, "temperature", 0) or 0) > 0),
+                    "segments": len(segments),
+                    "wer": word_error_rate(fixture["reference"], text) if fixture["reference"] is not None else None,
+                }
+                results.append(result)
+                wer = f"{result['wer']:.3f}" if result["wer"] is not None else "н/д"
+                print(f"{fixture['name']} / {variant} / {'с предобработкой' if enabled else 'без'}: "
+                      f"предобработка {preprocess_time:.3f} с, распознавание {transcribe_time:.2f} с, "
+                      f"повторных декодирований {result['fallback_segments']}/{len(segments)}, WER {wer}")
+
+    for variant in ("clean", "degraded"):
+        off = [r for r in results if r["variant"] == variant and not r["preprocess"]]
+        on = [r for r in results if r["variant"] == variant and r["preprocess"]]
+        saved = sum(r["transcribe_time_s"] for r in off) - sum(r["transcribe_time_s"] for r in on)
+        overhead = sum(r["preprocess_time_s"] for r in on)
+        print(f"Итого {variant}: предобработка {overhead:.2f} с, экономия распознавания {saved:+.2f} с, "
+              f"повторных декодирований {sum(r['fallback_segments'] for r in off)} → "
+              f"{sum(r['fallback_segments'] for r in on)}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "schema": 1,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "environment": get_environment(),
+            "model": args.model,
+            "device": args.device,
+            "preprocess_options": options,
+            "results": results,
+        }, f, indent=4, ensure_ascii=False)
+    print(f"Результаты сохранены в {args.output}")
+    return 0
+
+
+def update_catalog(results):
+    """Запись замеров в каталог моделей приложения (settings/models.json)
+
+    В каталог попадают прогоны с настройками приложения: профиль beam5,
+    int8 на CPU и float16 на GPU.
+    """
+    from audio_to_text import USER_DATA_DIR, load_model_catalog, save_model_catalog
+
+    app_compute_types = {"cpu": "int8", "cuda": "float16"}
+    settings_dir = os.path.join(USER_DATA_DIR, "settings")
+    catalog = load_model_catalog(settings_dir)
+    updated = 0
+    for result in results:
+        if "error" in result or result["profile"] != "beam5":
+            continue
+        if app_compute_types.get(result["device"]) != result["compute_type"]:
+            continue
+        for info in catalog.values():
+            if info["name"] == result["model"]:
+                # Число потоков из sweep сохраняется
+                info.setdefault("measured", {}).setdefault(result["device"], {}).update({
+                    "rtf": result["mean_rtf"],
+                    "peak_rss_mb": result["peak_rss_mb"],
+                    "load_time_s": result["load_time_s"],
+                    "wer": result["mean_wer"],
+                    "compute_type": result["compute_type"],
+                    "date": datetime.now().isoformat(timespec="seconds")
+                })
+                updated += 1
+    save_model_catalog(settings_dir, catalog)
+    print(f"Замеры записаны в каталог моделей: {updated}")
+
+
+def compare_reports(args):
+    """Сравнение двух отчётов: ищем регрессии RTF и WER"""
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+
+    def key(result):
+        return (result["model"], result["device"], result["compute_type"], result["profile"])
+
+    baseline_results = {key(r): r for r in baseline["results"] if "error" not in r}
+    regressions = 0
+    for result in current["results"]:
+        old = baseline_results.get(key(result))
+        if old is None or "error" in result:
+            continue
+        name = " / ".join(key(result))
+        if old["mean_rtf"] and result["mean_rtf"] is not None:
+            change = result["mean_rtf"] / old["mean_rtf"] - 1
+            marker = "⚠️" if change > args.tolerance else "  "
+            regressions += change > args.tolerance
+            print(f"{marker} {name}: RTF {old['mean_rtf']:.3f} → {result['mean_rtf']:.3f} ({change:+.1%})")
+        if old.get("mean_wer") is not None and result.get("mean_wer") is not None:
+            change = result["mean_wer"] - old["mean_wer"]
+            marker = "⚠️" if change > args.wer_tolerance else "  "
+            regressions += change > args.wer_tolerance
+            print(f"{marker} {name}: WER {old['mean_wer']:.3f} → {result['mean_wer']:.3f} ({change:+.3f})")
+
+    print(f"Регрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+def measure_startup_child(args):
+    """Замер запуска приложения до интерактивного окна (в дочернем процессе)"""
+    start = time.perf_counter()
+    sys.path.insert(0, SCRIPT_DIR)
+    import audio_to_text
+    imported = time.perf_counter()
+
+    app = audio_to_text.AudioTranscriber()
+    app.update()
+    shown = time.perf_counter()
+
+    loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+    app.destroy()
+    print(json.dumps({
+        "import_s": imported - start,
+        "window_s": shown - start,
+        "heavy_modules": loaded,
+    }))
+
+
+def measure_startup(args):
+    """Время запуска GUI: медиана нескольких холодных запусков"""
+    runs = []
+    for _ in range(args.repeat):
+        process_start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "_startup"],
+            capture_output=True, text=True, encoding="utf-8"
+        )
+        process_time = time.perf_counter() - process_start
+        try:
+            run = json.loads(completed.stdout.strip().splitlines()[-1])
+        except (IndexError, json.JSONDecodeError):
+            print(f"❌ Не удалось запустить приложение:\n{completed.stderr.strip()}")
+            return 1
+        run["process_s"] = process_time
+        runs.append(run)
+        print(f"импорт {run['import_s']:.3f} с, окно {run['window_s']:.3f} с, процесс {process_time:.3f} с")
+
+    window_times = sorted(run["window_s"] for run in runs)
+    median = window_times[len(window_times) // 2]
+    heavy = sorted({module for run in runs for module in run["heavy_modules"]})
+    print(f"Медиана до интерактивного окна: {median:.3f} с (лимит {args.limit:.3f} с)")
+    if heavy:
+        print(f"⚠️ При запуске загружены тяжёлые библиотеки: {', '.join(heavy)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "schema": 1,
+                "created": datetime.now().isoformat(timespec="seconds"),
+                "environment": get_environment(),
+                "median_window_s": median,
+                "runs": runs,
+            }, f, indent=4, ensure_ascii=False)
+
+    return 1 if median > args.limit or heavy else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк моделей VoiceScribe Pro")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fixtures_parser = subparsers.add_parser("fixtures", help="создать синтетический набор аудио")
+    fixtures_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    fixtures_parser.add_argument("--duration", type=int, default=30)
+
+    run_parser = subparsers.add_parser("run", help="прогнать модели и сохранить JSON")
+    run_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    run_parser.add_argument("--models", nargs="+", help="по умолчанию все модели каталога")
+    run_parser.add_argument("--devices", nargs="+", choices=list(COMPUTE_TYPES))
+    run_parser.add_argument("--compute-types", nargs="+")
+    run_parser.add_argument("--profiles", nargs="+", choices=list(DECODING_PROFILES))
+    run_parser.add_argument("--repeat", type=int, default=1, help="повторов на файл, берётся лучший")
+    run_parser.add_argument("--models-dir", help="по умолчанию папка моделей приложения")
+    run_parser.add_argument("--output", default="benchmark_results.json")
+    run_parser.add_argument("--update-catalog", action="store_true",
+                            help="записать RTF и память в каталог моделей приложения")
+    run_parser.add_argument("--cpu-threads", type=int, default=0, help="потоков CPU (0 - по умолчанию)")
+
+    sweep_parser = subparsers.add_parser("sweep", help="подобрать число потоков CPU для моделей")
+    sweep_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    sweep_parser.add_argument("--models", nargs="+", help="по умолчанию все модели каталога")
+    sweep_parser.add_argument("--threads", nargs="+", type=int, help="по умолчанию степени двойки до числа ядер")
+    sweep_parser.add_argument("--repeat", type=int, default=1, help="повторов на файл, берётся лучший")
+    sweep_parser.add_argument("--models-dir", help="по умолчанию папка моделей приложения")
+    sweep_parser.add_argument("--output", default="benchmark_threads.json")
+    sweep_parser.add_argument("--update-catalog", action="store_true",
+                              help="записать лучшее число потоков в каталог моделей приложения")
+
+    preprocess_parser = subparsers.add_parser("preprocess", help="оценить пользу предобработки звука")
+    preprocess_parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    preprocess_parser.add_argument("--model", default="small")
+    preprocess_parser.add_argument("--device", default="cpu", choices=list(COMPUTE_TYPES))
+    preprocess_parser.add_argument("--models-dir", help="по умолчанию папка моделей приложения")
+    preprocess_parser.add_argument("--output", default="benchmark_preprocess.json")
+
+    single_parser = subparsers.add_parser("_single")
+    single_parser.add_argument("--model", required=True)
+    single_parser.add_argument("--model-source")
+    single_parser.add_argument("--device", required=True)
+    single_parser.add_argument("--compute-type", required=True)
+    single_parser.add_argument("--profile", required=True)
+    single_parser.add_argument("--fixtures", required=True)
+    single_parser.add_argument("--models-dir", required=True)
+    single_parser.add_argument("--repeat", type=int, default=1)
+    single_parser.add_argument("--cpu-threads", type=int, default=0)
+    single_parser.add_argument("--num-workers", type=int, default=1)
+
+    compare_parser = subparsers.add_parser("compare", help="сравнить два отчёта")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1, help="допустимый рост RTF (доля)")
+    compare_parser.add_argument("--wer-tolerance", type=float, default=0.01)
+
+    startup_parser = subparsers.add_parser("startup", help="замерить время запуска приложения")
+    startup_parser.add_argument("--repeat", type=int, default=5)
+    startup_parser.add_argument("--limit", type=float, default=1.0, help="допустимое время до окна, с")
+    startup_parser.add_argument("--output", help="сохранить замеры в JSON")
+
+    subparsers.add_parser("_startup")
+
+    args = parser.parse_args()
+    if args.command == "fixtures":
+        generate_fixtures(args.fixtures, duration=args.duration)
+        return 0
+    if args.command == "run":
+        return run_benchmark(args)
+    if args.command == "sweep":
+        return sweep_threads(args)
+    if args.command == "preprocess":
+        return benchmark_preprocessing(args)
+    if args.command == "_single":
+        run_single(args)
+        return 0
+    if args.command == "startup":
+        return measure_startup(args)
+    if args.command == "_startup":
+        measure_startup_child(args)
+        return 0
+    return compare_reports(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
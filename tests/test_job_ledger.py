@@ -0,0 +1,115 @@
+"""Журнал задач: какие файлы ещё не распознаны нужной моделью"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import JobLedger, JobMetrics, file_fingerprint, find_audio_files  # noqa: E402
+
+
+class JobLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.ledger = JobLedger(os.path.join(self.root, "transcripts.db"))
+        self.audio_dir = os.path.join(self.root, "audio")
+        os.makedirs(self.audio_dir)
+        self.path = self.write_audio("lecture.mp3", b"\x01" * 5000)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write_audio(self, name, data):
+        path = os.path.join(self.audio_dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def record(self, path, model, error=None):
+        metrics = JobMetrics(path)
+        metrics.info["audio_duration_s"] = 60.0
+        if error:
+            metrics.info["error"] = error
+        self.ledger.record("file", metrics, source=path, source_info=file_fingerprint(path), model=model,
+                           settings={"beam_size": 5}, output=path + ".txt")
+
+    def pending(self, model, paths):
+        return list(self.ledger.pending(paths, model))
+
+    def test_new_file_is_pending_until_recorded(self):
+        self.assertEqual(self.pending("small", [self.path]), [self.path])
+        self.record(self.path, "small")
+        self.assertEqual(self.pending("small", [self.path]), [])
+
+    def test_other_model_and_failed_job_stay_pending(self):
+        self.record(self.path, "small", error="CUDA out of memory")
+        self.assertEqual(self.pending("small", [self.path]), [self.path])
+        self.record(self.path, "small")
+        self.assertEqual(self.pending("large-v3", [self.path]), [self.path])
+
+    def test_cascade_marker_is_not_the_accurate_model(self):
+        self.record(self.path, "base+large-v3")
+        self.assertEqual(self.pending("large-v3", [self.path]), [self.path])
+        self.assertEqual(self.pending("base+large-v3", [self.path]), [])
+
+    def test_moved_file_is_recognized_by_fingerprint(self):
+        self.record(self.path, "small")
+        moved_dir = os.path.join(self.root, "archive")
+        os.makedirs(moved_dir)
+        moved = os.path.join(moved_dir, "renamed.mp3")
+        os.rename(self.path, moved)
+        self.assertEqual(self.pending("small", [moved]), [])
+
+    def test_touched_file_with_same_content_is_done(self):
+        self.record(self.path, "small")
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.pending("small", [self.path]), [])
+
+    def test_modified_file_is_pending(self):
+        self.record(self.path, "small")
+        stat = os.stat(self.path)
+        with open(self.path, "r+b") as f:
+            f.write(b"\x02")  # Тот же размер, другое содержимое
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.pending("small", [self.path]), [self.path])
+
+    def test_large_file_change_in_tail_is_detected(self):
+        size = 3 * 1024 * 1024
+        path = self.write_audio("long.wav", b"\0" * size)
+        self.record(path, "small")
+        with open(path, "r+b") as f:
+            f.seek(size - 10)
+            f.write(b"\x05")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(self.pending("small", [path]), [path])
+
+    def test_folders_are_walked_for_audio_files(self):
+        nested = os.path.join(self.audio_dir, "day 2")
+        os.makedirs(nested)
+        second = os.path.join(nested, "talk.WAV")
+        with open(second, "wb") as f:
+            f.write(b"\x03" * 100)
+        with open(os.path.join(nested, "notes.txt"), "w", encoding="utf-8") as f:
+            f.write("не аудио")
+        files = list(find_audio_files([self.audio_dir]))
+        self.assertEqual(sorted(files), sorted([self.path, second]))
+        self.record(self.path, "small")
+        self.assertEqual(list(self.ledger.pending(files, "small")), [second])
+
+    def test_recent_filters_by_outcome(self):
+        self.record(self.path, "small", error="Файл не найден")
+        self.record(self.path, "medium")
+        jobs = self.ledger.recent()
+        self.assertEqual(len(jobs), 2)
+        failed = self.ledger.recent(outcome="error")
+        self.assertEqual([job["model"] for job in failed], ["small"])
+        self.assertEqual(failed[0]["error"], "Файл не найден")
+        self.assertEqual(failed[0]["source"], os.path.abspath(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
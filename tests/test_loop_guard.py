@@ -0,0 +1,83 @@
+"""Обнаружение зацикливания декодера: обычный диалог не режется, петли обрываются"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import LOOP_GUARD_DEFAULTS, LoopGuard, TranscriptSegment  # noqa: E402
+
+
+def make_segments(texts, avg_logprob=-0.2, compression_ratio=1.2, no_speech_prob=0.05):
+    return [TranscriptSegment(index * 2.0, index * 2.0 + 2.0, text, avg_logprob, compression_ratio, no_speech_prob)
+            for index, text in enumerate(texts)]
+
+
+def run_guard(segments):
+    guard = LoopGuard(**LOOP_GUARD_DEFAULTS)
+    accepted = []
+    for segment in segments:
+        emitted, reason = guard.feed(segment)
+        accepted.extend(emitted)
+        if reason:
+            return accepted, reason, guard.pending
+    return accepted + guard.flush(), None, []
+
+
+class LoopGuardTest(unittest.TestCase):
+    def test_short_dialogue_is_kept(self):
+        segments = make_segments([" Да.", " Нет.", " Да.", " Нет.", " Да."])
+        accepted, reason, _ = run_guard(segments)
+        self.assertIsNone(reason)
+        self.assertEqual(accepted, segments)
+
+    def test_confident_short_repeats_are_kept(self):
+        segments = make_segments([" Да.", " Да.", " Да.", " Да.", " Да."])
+        accepted, reason, _ = run_guard(segments)
+        self.assertIsNone(reason)
+        self.assertEqual(accepted, segments)
+
+    def test_phrase_reused_later_is_kept(self):
+        texts = [" Давайте начнём совещание.", " Первый вопрос бюджет.", " Давайте начнём совещание.",
+                 " Второй вопрос сроки.", " Давайте начнём совещание.", " Третий вопрос люди."]
+        guard = LoopGuard(**LOOP_GUARD_DEFAULTS)
+        for segment in make_segments(texts):
+            accepted, reason = guard.feed(segment)
+            # Ни один сегмент не придерживается: это не повтор и не чередование
+            self.assertEqual(accepted, [segment])
+            self.assertIsNone(reason)
+            self.assertEqual(guard.pending, [])
+
+    def test_repeated_phrase_is_suppressed(self):
+        segments = make_segments([" Привет всем."] + [" Спасибо за просмотр!"] * 10)
+        accepted, reason, dropped = run_guard(segments)
+        self.assertEqual(reason, "repetition")
+        self.assertEqual([segment.text for segment in accepted], [" Привет всем.", " Спасибо за просмотр!"])
+        self.assertEqual(len(dropped), LOOP_GUARD_DEFAULTS["max_repeats"])
+
+    def test_uncertain_short_repeats_are_suppressed(self):
+        segments = make_segments([" Спасибо."] * 6, avg_logprob=-1.2)
+        _, reason, _ = run_guard(segments)
+        self.assertEqual(reason, "repetition")
+
+    def test_alternating_phrases_are_suppressed(self):
+        texts = [" Продолжение следует...", " Субтитры сделал редактор."] * 5
+        accepted, reason, _ = run_guard(make_segments(texts))
+        self.assertEqual(reason, "repetition")
+        self.assertEqual(len(accepted), 4)
+
+    def test_interrupted_series_is_released(self):
+        texts = [" Повторите, пожалуйста.", " Повторите, пожалуйста.", " Хорошо, повторяю условия."]
+        accepted, reason, _ = run_guard(make_segments(texts))
+        self.assertIsNone(reason)
+        self.assertEqual(len(accepted), 3)
+
+    def test_no_speech_run_is_suppressed(self):
+        segments = make_segments([" Музыка"] + [" ♪"] * 4, avg_logprob=-1.5, no_speech_prob=0.9)
+        _, reason, dropped = run_guard(segments)
+        self.assertEqual(reason, "no_speech")
+        self.assertEqual(len(dropped), LOOP_GUARD_DEFAULTS["max_no_speech_run"])
+
+
+if __name__ == "__main__":
+    unittest.main()
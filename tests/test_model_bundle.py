@@ -0,0 +1,73 @@
+"""Импорт архива моделей: пути из манифеста архива не выходят за папку моделей"""
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import MODEL_BUNDLE_MANIFEST, import_model_bundle  # noqa: E402
+
+DATA = b"weights"
+
+
+class ImportModelBundleTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.models_dir = os.path.join(self.root, "models")
+        os.makedirs(self.models_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def write_bundle(self, repo, revision, name):
+        import hashlib
+
+        manifest = {"format": 1, "models": [{
+            "name": "test",
+            "repo": repo,
+            "revision": revision,
+            "files": {name: {"size": len(DATA), "sha256": hashlib.sha256(DATA).hexdigest()}}
+        }]}
+        bundle_path = os.path.join(self.root, "bundle.tar")
+        with tarfile.open(bundle_path, "w") as tar:
+            for member_name, data in [(MODEL_BUNDLE_MANIFEST, json.dumps(manifest).encode()),
+                                      (f"models--{repo.replace('/', '--')}/snapshots/{revision}/{name}", DATA)]:
+                member = tarfile.TarInfo(member_name)
+                member.size = len(data)
+                tar.addfile(member, io.BytesIO(data))
+        return bundle_path
+
+    def entries_outside_models_dir(self):
+        return sorted(name for name in os.listdir(self.root) if name not in ("models", "bundle.tar"))
+
+    def test_valid_bundle(self):
+        import_model_bundle(self.models_dir, self.write_bundle("org/model", "abc123", "model.bin"))
+        path = os.path.join(self.models_dir, "models--org--model", "snapshots", "abc123", "model.bin")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), DATA)
+
+    def test_rejects_traversal(self):
+        cases = [
+            ("org/model", "abc123", "../../../escaped.bin"),
+            ("org/model", "abc123", os.path.join(self.root, "escaped.bin")),
+            ("org/model", "../../..", "escaped.bin"),
+            ("org/model", "abc/../../x", "model.bin"),
+            ("org\\..\\..\\..", "abc123", "model.bin"),
+            ("../..", "abc123", "model.bin"),
+        ]
+        for repo, revision, name in cases:
+            with self.subTest(repo=repo, revision=revision, name=name):
+                bundle_path = self.write_bundle(repo, revision, name)
+                with self.assertRaisesRegex(RuntimeError, "Недопустимый путь|за пределами"):
+                    import_model_bundle(self.models_dir, bundle_path)
+                self.assertEqual(self.entries_outside_models_dir(), [])
+                self.assertEqual(os.listdir(self.models_dir), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
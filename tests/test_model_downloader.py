@@ -0,0 +1,192 @@
+"""Загрузчик моделей против локального файлового сервера вместо Hugging Face Hub"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import (  # noqa: E402
+    MODEL_DOWNLOAD_MARKER,
+    MODEL_MANIFEST_FILE,
+    ModelDownloader,
+    get_model_cache_dir,
+    is_complete_snapshot,
+    read_model_manifest,
+)
+
+REPO = "test-org/faster-whisper-test"
+COMMIT = "0123456789abcdef0123456789abcdef01234567"
+
+
+class HubHandler(BaseHTTPRequestHandler):
+    """/api/models/... - список файлов, /resolve/... - файлы с поддержкой Range"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        api_prefix = f"/api/models/{REPO}/revision/"
+        resolve_prefix = f"/{REPO}/resolve/{COMMIT}/"
+        if self.path.startswith(api_prefix):
+            siblings = [
+                {"rfilename": name, "size": len(data), "lfs": {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}}
+                for name, data in server.files.items()
+            ]
+            body = json.dumps({"sha": COMMIT, "siblings": siblings}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if not self.path.startswith(resolve_prefix):
+            self.send_error(404)
+            return
+
+        name = self.path[len(resolve_prefix):]
+        data = server.served.get(name, server.files.get(name))
+        if data is None:
+            self.send_error(404)
+            return
+        with server.lock:
+            server.requests.append((name, self.headers.get("Range")))
+            truncate = server.truncate.get(name, 0)
+            if truncate:
+                server.truncate[name] = truncate - 1
+
+        offset = 0
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            offset = int(range_header[len("bytes="):].split("-")[0])
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[offset:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if truncate:
+            # Обрыв соединения посреди ответа
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class ModelDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), HubHandler)
+        self.server.files = {
+            "model.bin": os.urandom(300 * 1024),
+            "config.json": b'{"alignment_heads": []}',
+            "tokenizer.json": b'{"model": {}}',
+            "vocabulary.txt": b"a\nb\n",
+            "README.md": b"not a model file",
+        }
+        self.server.served = {}  # Подменённое содержимое, которое отдаёт сервер
+        self.server.truncate = {}  # Сколько следующих ответов оборвать
+        self.server.requests = []
+        self.server.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.downloader = ModelDownloader(self.models_dir, endpoint=f"http://{host}:{port}",
+                                          chunk_size=64 * 1024, timeout=5)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.models_dir, ignore_errors=True)
+
+    def snapshot_dir(self):
+        return os.path.join(get_model_cache_dir(self.models_dir, REPO), "snapshots", COMMIT)
+
+    def assert_installed(self, snapshot_dir):
+        self.assertEqual(snapshot_dir, self.snapshot_dir())
+        self.assertTrue(is_complete_snapshot(snapshot_dir))
+        self.assertFalse(os.path.exists(os.path.join(snapshot_dir, MODEL_DOWNLOAD_MARKER)))
+        for name, data in self.server.files.items():
+            path = os.path.join(snapshot_dir, name)
+            if name == "README.md":
+                self.assertFalse(os.path.exists(path))
+                continue
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), data)
+            self.assertFalse(os.path.exists(path + ".incomplete"))
+        manifest = read_model_manifest(snapshot_dir)
+        self.assertEqual(manifest["revision"], COMMIT)
+        self.assertEqual(manifest["files"]["model.bin"]["sha256"],
+                         hashlib.sha256(self.server.files["model.bin"]).hexdigest())
+
+    def test_full_download(self):
+        progress = []
+        self.downloader.progress_callback = lambda downloaded, total: progress.append((downloaded, total))
+
+        self.assert_installed(self.downloader.download(REPO))
+        total = sum(len(data) for name, data in self.server.files.items() if name != "README.md")
+        self.assertEqual(progress[-1], (total, total))
+        with open(os.path.join(get_model_cache_dir(self.models_dir, REPO), "refs", "main")) as f:
+            self.assertEqual(f.read(), COMMIT)
+
+    def test_resume_partial_file(self):
+        data = self.server.files["model.bin"]
+        os.makedirs(self.snapshot_dir())
+        with open(os.path.join(self.snapshot_dir(), "model.bin.incomplete"), "wb") as f:
+            f.write(data[:100 * 1024])
+
+        self.assert_installed(self.downloader.download(REPO))
+        self.assertIn(("model.bin", f"bytes={100 * 1024}-"), self.server.requests)
+
+    def test_malformed_manifest_is_incomplete(self):
+        snapshot_dir = self.downloader.download(REPO)
+        for content in ['{"files": 3}', '{"files": {"model.bin": {}}}', '[]', "{"]:
+            with self.subTest(content=content):
+                with open(os.path.join(snapshot_dir, MODEL_MANIFEST_FILE), "w") as f:
+                    f.write(content)
+                self.assertIsNone(read_model_manifest(snapshot_dir))
+                self.assertFalse(is_complete_snapshot(snapshot_dir))
+
+        # Повторное скачивание восстанавливает манифест
+        self.assert_installed(self.downloader.download(REPO))
+
+    def test_checksum_mismatch(self):
+        data = self.server.files["model.bin"]
+        self.server.served["model.bin"] = data[:-1] + bytes([data[-1] ^ 0xFF])
+
+        with self.assertRaisesRegex(RuntimeError, "Контрольная сумма"):
+            self.downloader.download(REPO)
+        snapshot_dir = self.snapshot_dir()
+        self.assertFalse(os.path.exists(os.path.join(snapshot_dir, "model.bin")))
+        self.assertFalse(os.path.exists(os.path.join(snapshot_dir, "model.bin.incomplete")))
+        self.assertFalse(is_complete_snapshot(snapshot_dir))
+        self.assertEqual(len([name for name, _ in self.server.requests if name == "model.bin"]),
+                         self.downloader.retries)
+
+    def test_truncated_response_is_resumed(self):
+        self.server.truncate["model.bin"] = 1
+
+        self.assert_installed(self.downloader.download(REPO))
+        ranges = [range_header for name, range_header in self.server.requests if name == "model.bin"]
+        self.assertEqual(ranges[0], None)
+        self.assertEqual(len(ranges), 2)
+        self.assertTrue(ranges[1].startswith("bytes="))
+
+    def test_truncated_responses_exhaust_retries(self):
+        self.server.truncate["model.bin"] = self.downloader.retries
+
+        with self.assertRaisesRegex(RuntimeError, "model.bin"):
+            self.downloader.download(REPO)
+        self.assertFalse(is_complete_snapshot(self.snapshot_dir()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Предобработка аудио: обработка кусками совпадает с обработкой целиком, усиление ограничено"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import preprocess_audio  # noqa: E402
+
+RATE = 16000
+
+
+def tone(amplitude, seconds=4.0, frequency=440.0, offset=0.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t) + offset).astype(np.float32)
+
+
+def loudness_db(audio):
+    return 10 * np.log10(np.mean(np.square(audio, dtype=np.float64)))
+
+
+class PreprocessAudioTest(unittest.TestCase):
+    def test_chunked_matches_whole(self):
+        rng = np.random.default_rng(1)
+        audio = (tone(0.05, seconds=7.3, offset=0.02) + rng.normal(0, 0.005, int(7.3 * RATE))).astype(np.float32)
+        whole = preprocess_audio(audio.copy(), RATE, chunk_s=60)
+        chunked = preprocess_audio(audio.copy(), RATE, chunk_s=1)
+        np.testing.assert_allclose(chunked, whole, atol=1e-6)
+
+    def test_works_in_place(self):
+        audio = tone(0.05)
+        self.assertIs(preprocess_audio(audio, RATE), audio)
+        self.assertEqual(audio.dtype, np.float32)
+
+    def test_dc_offset_is_removed(self):
+        audio = preprocess_audio(tone(0.05, offset=0.3), RATE, highpass_hz=0)
+        self.assertAlmostEqual(float(audio.mean()), 0.0, places=5)
+
+    def test_quiet_speech_is_brought_to_target(self):
+        audio = preprocess_audio(tone(0.01), RATE, target_db=-20.0)
+        self.assertAlmostEqual(loudness_db(audio), -20.0, delta=0.5)
+
+    def test_gain_is_capped(self):
+        audio = tone(0.003)
+        before = loudness_db(audio)
+        audio = preprocess_audio(audio, RATE, target_db=-20.0, max_gain_db=30.0)
+        self.assertAlmostEqual(loudness_db(audio) - before, 30.0, delta=0.5)
+
+    def test_peak_is_limited(self):
+        audio = tone(0.01)
+        audio[RATE] = 0.5  # Щелчок
+        audio = preprocess_audio(audio, RATE, target_db=-10.0)
+        self.assertLessEqual(float(np.abs(audio).max()), 0.99 + 1e-6)
+        self.assertLess(loudness_db(audio), -10.0)
+
+    def test_silence_is_left_alone(self):
+        silence = np.zeros(RATE, dtype=np.float32)
+        np.testing.assert_array_equal(preprocess_audio(silence.copy(), RATE), silence)
+        hiss = tone(0.0005)
+        np.testing.assert_allclose(preprocess_audio(hiss.copy(), RATE, highpass_hz=0), hiss, atol=1e-7)
+        self.assertEqual(len(preprocess_audio(np.zeros(0, dtype=np.float32), RATE)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Полнотекстовый индекс расшифровок: запросы по началу слова, замена и кавычки"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import TranscriptIndex, TranscriptSegment, fts_query  # noqa: E402
+
+
+def make_segments(texts, speaker=None):
+    return [TranscriptSegment(index * 2.0, index * 2.0 + 1.5, text, -0.2, 1.2, 0.05, speaker)
+            for index, text in enumerate(texts)]
+
+
+class FtsQueryTest(unittest.TestCase):
+    def test_terms_are_quoted_and_prefix_kept(self):
+        self.assertEqual(fts_query("бюджет отдел*"), '"бюджет" "отдел"*')
+
+    def test_quotes_and_operators_are_literal(self):
+        self.assertEqual(fts_query('say "hi" OR NOT'), '"say" """hi""" "OR" "NOT"')
+
+    def test_empty_terms_are_dropped(self):
+        self.assertEqual(fts_query("  *  ** "), "")
+
+
+class TranscriptIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.index = TranscriptIndex(os.path.join(self.root, "transcripts.db"))
+        self.source = os.path.join(self.root, "meeting.mp3")
+        self.output = os.path.join(self.root, "meeting.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_prefix_query_matches_word_forms(self):
+        self.index.add(self.source, self.output, make_segments([
+            " Обсудили бюджет отдела.", " Отделка офиса подождёт.", " Погода хорошая."
+        ]), model="small", language="ru", duration_s=6.0)
+        exact = self.index.search("отдел")
+        self.assertEqual(exact, [])
+        prefix = self.index.search("отдел*")
+        self.assertEqual(sorted(result["start_ms"] for result in prefix), [0, 2000])
+        result = [result for result in prefix if result["start_ms"] == 0][0]
+        self.assertEqual(result["text"], "Обсудили бюджет отдела.")
+        self.assertEqual(result["end_ms"], 1500)
+        self.assertEqual(result["model"], "small")
+        self.assertEqual(result["source"], os.path.abspath(self.source))
+        self.assertIn("[отдела]", result["snippet"])
+
+    def test_all_words_are_required(self):
+        self.index.add(self.source, self.output, make_segments([" Бюджет утвердили.", " Бюджет отклонили."]))
+        results = self.index.search("бюджет утвердили")
+        self.assertEqual([result["start_ms"] for result in results], [0])
+
+    def test_case_and_diacritics_are_ignored(self):
+        self.index.add(self.source, self.output, make_segments([" Café RÉSUMÉ."]))
+        self.assertEqual(len(self.index.search("cafe resume")), 1)
+
+    def test_reindexing_output_replaces_document(self):
+        self.index.add(self.source, self.output, make_segments([" Старый вариант текста.", " Ещё строка."]))
+        self.index.add(self.source, self.output, make_segments([" Новый вариант текста."]), model="large-v3")
+        self.assertEqual(self.index.stats(), (1, 1))
+        self.assertEqual(self.index.search("старый"), [])
+        results = self.index.search("вариант")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["text"], "Новый вариант текста.")
+        self.assertEqual(results[0]["model"], "large-v3")
+
+    def test_other_outputs_are_kept(self):
+        other = os.path.join(self.root, "meeting_2.txt")
+        self.index.add(self.source, self.output, make_segments([" Первый прогон."]))
+        self.index.add(self.source, other, make_segments([" Второй прогон."]))
+        self.assertEqual(self.index.stats(), (2, 2))
+        self.assertEqual(len(self.index.search("прогон")), 2)
+
+    def test_empty_segments_and_query(self):
+        self.index.add(self.source, self.output, make_segments([" Текст.", "   "], speaker="SPEAKER_00"))
+        self.assertEqual(self.index.stats(), (1, 1))
+        self.assertEqual(self.index.search("текст")[0]["speaker"], "SPEAKER_00")
+        self.assertEqual(self.index.search(" * "), [])
+
+    def test_quotes_in_query_do_not_break_search(self):
+        self.index.add(self.source, self.output, make_segments([' Он сказал "привет" и ушёл.']))
+        self.assertEqual(len(self.index.search('"привет"')), 1)
+        self.assertEqual(self.index.search('привет" OR "ушёл'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""Нарезка диктовки на фразы: границы по паузам, время начала и предел длины"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import UtteranceSegmenter  # noqa: E402
+
+RATE = 16000
+BLOCK = RATE // 10  # Блоки по 0,1 с, как у потока записи
+
+
+def speech(blocks):
+    t = np.arange(blocks * BLOCK) / RATE
+    return np.split((0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32), blocks)
+
+
+def silence(blocks):
+    return [np.zeros(BLOCK, dtype=np.float32) for _ in range(blocks)]
+
+
+def run_segmenter(blocks, **options):
+    segmenter = UtteranceSegmenter(RATE, **options)
+    utterances = []
+    for block in blocks:
+        utterances.extend(segmenter.feed(block))
+    return utterances, segmenter
+
+
+class UtteranceSegmenterTest(unittest.TestCase):
+    def test_pause_closes_utterance_with_preroll(self):
+        utterances, segmenter = run_segmenter(silence(5) + speech(10) + silence(7))
+        self.assertEqual(len(utterances), 1)
+        start, audio = utterances[0]
+        self.assertAlmostEqual(start, 0.4)  # Один тихий блок перед фразой
+        self.assertEqual(len(audio), 18 * BLOCK)
+        self.assertEqual(segmenter.flush(), [])
+
+    def test_short_pause_does_not_split(self):
+        utterances, segmenter = run_segmenter(speech(5) + silence(4) + speech(5))
+        self.assertEqual(utterances, [])
+        utterances = segmenter.flush()
+        self.assertEqual(len(utterances), 1)
+        self.assertEqual(utterances[0][0], 0.0)
+        self.assertEqual(len(utterances[0][1]), 14 * BLOCK)
+
+    def test_short_noise_is_dropped(self):
+        utterances, segmenter = run_segmenter(silence(3) + speech(2) + silence(10))
+        self.assertEqual(utterances, [])
+        self.assertEqual(segmenter.flush(), [])
+
+    def test_consecutive_utterances_keep_their_start(self):
+        blocks = silence(2) + speech(5) + silence(7) + silence(6) + speech(8) + silence(7)
+        utterances, _ = run_segmenter(blocks)
+        self.assertEqual([round(start, 3) for start, _ in utterances], [0.1, 1.9])  # Вторая фраза - с блока 20, предзапись с 19
+        self.assertEqual([len(audio) for _, audio in utterances], [13 * BLOCK, 16 * BLOCK])
+
+    def test_long_speech_is_cut_at_max_length(self):
+        utterances, segmenter = run_segmenter(speech(45), max_utterance_s=2.0)
+        utterances += segmenter.flush()
+        self.assertEqual([round(start, 3) for start, _ in utterances], [0.0, 2.0, 4.0])
+        self.assertEqual([len(audio) for _, audio in utterances], [20 * BLOCK, 20 * BLOCK, 5 * BLOCK])
+
+    def test_audio_is_not_altered(self):
+        blocks = speech(6)
+        utterances, segmenter = run_segmenter(blocks)
+        utterances += segmenter.flush()
+        np.testing.assert_array_equal(utterances[0][1], np.concatenate(blocks))
+
+
+if __name__ == "__main__":
+    unittest.main()
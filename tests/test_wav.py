@@ -0,0 +1,85 @@
+"""Чтение WAV: сборка 24-битных отсчётов, потоковый ресэмплинг и обрезанные файлы"""
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+from scipy.signal import resample_poly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_to_text import read_wav, read_wav_header  # noqa: E402
+
+
+def write_wav(path, frames, sample_rate, sample_width):
+    """frames - целые отсчёты формы (кадры, каналы)"""
+    frames = np.asarray(frames, dtype=np.int64)
+    if sample_width == 3:
+        data = frames.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3]
+    else:
+        data = frames.astype(f"<i{sample_width}")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(frames.shape[1])
+        wav.setsampwidth(sample_width)
+        wav.setframerate(sample_rate)
+        wav.writeframes(data.tobytes())
+
+
+class ReadWavTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "audio.wav")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_24_bit_samples_are_assembled_with_sign(self):
+        values = np.array([[0], [1], [-1], [2 ** 23 - 1], [-2 ** 23], [0x123456], [-0x123456]])
+        write_wav(self.path, values, 16000, 3)
+        audio = read_wav(self.path, 16000)
+        np.testing.assert_array_equal(audio, (values[:, 0] / 2 ** 23).astype(np.float32))
+
+    def test_stereo_is_kept_without_mono(self):
+        values = np.array([[1000, -2000], [3000, -4000], [5000, -6000]])
+        write_wav(self.path, values, 16000, 2)
+        audio = read_wav(self.path, 16000, mono=False)
+        np.testing.assert_array_equal(audio, (values.T / 2 ** 15).astype(np.float32))
+        np.testing.assert_allclose(read_wav(self.path, 16000), audio.mean(axis=0))
+
+    def test_streaming_resample_matches_whole_file(self):
+        rng = np.random.default_rng(0)
+        for rate, sample_width in ((44100, 2), (48000, 3), (8000, 2)):
+            with self.subTest(rate=rate, sample_width=sample_width):
+                scale = 2 ** (8 * sample_width - 1)
+                values = rng.integers(-scale // 2, scale // 2, size=(int(rate * 2.3), 2))
+                write_wav(self.path, values, rate, sample_width)
+                expected = resample_poly((values / scale).mean(axis=1), 16000, rate)
+                audio = read_wav(self.path, 16000, chunk_s=0.25)
+                self.assertEqual(len(audio), len(expected))
+                np.testing.assert_allclose(audio, expected, atol=1e-5)
+
+    def test_truncated_data_chunk_is_read_up_to_end_of_file(self):
+        values = np.arange(-500, 500).reshape(-1, 2) * 30
+        write_wav(self.path, values, 16000, 2)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 4 * 10 - 3)  # 10 кадров и часть следующего
+        header = read_wav_header(self.path)
+        self.assertEqual(header["frames"], len(values) - 11)
+        audio = read_wav(self.path, 16000, mono=False)
+        np.testing.assert_array_equal(audio, (values[:-11].T / 2 ** 15).astype(np.float32))
+
+    def test_short_fmt_chunk_is_rejected(self):
+        fmt = struct.pack("<HHIIH", 1, 1, 16000, 32000, 2)  # Без поля разрядности
+        data = b"\0\0" * 4
+        body = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt + b"data" + struct.pack("<I", len(data)) + data
+        with open(self.path, "wb") as f:
+            f.write(b"RIFF" + struct.pack("<I", len(body)) + body)
+        self.assertIsNone(read_wav_header(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()